@@ -12,5 +12,9 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+# Serve the brand/founder reads from the native async views.
+os.environ.setdefault("API_ASYNC_VIEWS", "1")
+# Server-sent change events are cheap on the event loop.
+os.environ.setdefault("CHANGES_STREAM", "1")
 
 application = get_asgi_application()
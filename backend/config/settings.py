@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -45,6 +46,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.middleware.MetricsMiddleware",
+    "core.middleware.CompressionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -79,13 +82,166 @@ WSGI_APPLICATION = "config.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+# Both can be pointed elsewhere, e.g. by manage.py benchmark_api to run
+# against scratch data without touching the real database or caches.
+SQLITE_PATH = Path(os.environ.get("SQLITE_PATH", BASE_DIR / "db.sqlite3"))
+CACHE_ROOT = Path(os.environ.get("CACHE_ROOT", BASE_DIR / "cache"))
+
+# Connections come from a bounded per-process pool (see core.pool) and go
+# back to it when the request ends, instead of being opened and closed per
+# request. MAX_SIZE should cover the threads that query at once: gunicorn
+# threads per worker, or the ASGI thread pool.
+DB_POOL = {
+    "MAX_SIZE": int(os.environ.get("DB_POOL_MAX_SIZE", 8)),
+    "TIMEOUT": float(os.environ.get("DB_POOL_TIMEOUT", 10)),
+    "MAX_IDLE": 5 * 60,
+    "MAX_LIFETIME": 60 * 60,
+    "HEALTH_CHECK_AFTER": 30,
+}
+
+if os.environ.get("POSTGRES_DB"):
+    # PostgreSQL, e.g. a local stand-in for trying the pool against a real
+    # server. There is no replica alias, every read uses "default".
+    DATABASES = {
+        "default": {
+            "ENGINE": "core.db_backends.postgresql",
+            "NAME": os.environ["POSTGRES_DB"],
+            "USER": os.environ.get("POSTGRES_USER", ""),
+            "PASSWORD": os.environ.get("POSTGRES_PASSWORD", ""),
+            "HOST": os.environ.get("POSTGRES_HOST", ""),
+            "PORT": os.environ.get("POSTGRES_PORT", ""),
+            "POOL": DB_POOL,
+        },
+    }
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": "core.db_backends.sqlite3",
+            "NAME": SQLITE_PATH,
+            "POOL": DB_POOL,
+        },
+        # Read-only connection to the same file. The public API reads through
+        # it (see core.db), so with WAL it never waits on admin writes.
+        "replica": {
+            "ENGINE": "core.db_backends.sqlite3",
+            "NAME": f"file:{SQLITE_PATH}?mode=ro",
+            "POOL": DB_POOL,
+            "TEST": {"MIRROR": "default"},
+        },
     }
+
+DATABASE_ROUTERS = ["core.db.ReadReplicaRouter"]
+
+# Applied to every new SQLite connection by core.db. Set to {} to use the
+# SQLite defaults.
+SQLITE_PRAGMAS = {
+    "journal_mode": "wal",
+    "synchronous": "normal",
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -32000,  # KiB, i.e. 32 MB per connection
+    "temp_store": "memory",
+}
+
+# Read the first row of the brand/founder list queries on every new pooled
+# connection of the alias the API reads from, so the schema is loaded and the
+# first index pages are cached before a request needs them.
+DB_WARM_STATEMENTS = True
+
+
+# Caches
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+#
+# The "api" cache holds content versions and rendered API responses. It has to
+# be shared by every gunicorn worker so an admin edit in one worker invalidates
+# the others, hence the file-based backend rather than per-process locmem.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "api": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": CACHE_ROOT / "api",
+        "OPTIONS": {"MAX_ENTRIES": 2000},
+    },
+    # Token buckets of throttled clients (see core.throttling), one per IP.
+    "throttle": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "throttle",
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    },
+}
+
+API_CACHE_ALIAS = "api"
+API_CACHE_TIMEOUT = 60 * 60
+
+# Concurrent misses for one response wait up to this many seconds for the
+# request (or worker) already rendering it before rendering it themselves.
+API_COALESCE_TIMEOUT = 5.0
+
+# Anonymous API clients get a token bucket per IP: "N/period" allows bursts
+# of N requests, refilled at N per period; an empty API_THROTTLE_ANON_RATE
+# turns throttling off. The locmem "throttle" cache makes the limit per
+# worker. Clients are identified by REMOTE_ADDR unless API_NUM_PROXIES is
+# set: behind nginx (or another proxy that appends to X-Forwarded-For) set it
+# to the number of proxy hops. The shipped gunicorn configs bind 0.0.0.0, so
+# trusting X-Forwarded-For by default would let a client reaching the port
+# directly pick a fresh bucket for every request.
+API_THROTTLE_CACHE_ALIAS = "throttle"
+
+REST_FRAMEWORK = {
+    "DEFAULT_THROTTLE_CLASSES": ["core.throttling.AnonTokenBucketThrottle"],
+    "DEFAULT_THROTTLE_RATES": {
+        "anon": os.environ.get("API_THROTTLE_ANON_RATE", "120/min") or None,
+    },
+    "NUM_PROXIES": int(os.environ.get("API_NUM_PROXIES", "0")),
 }
 
+# Smaller bodies are sent as-is, compression would not pay for its headers.
+COMPRESSION_MIN_SIZE = 512
+
+# Serve list endpoints through the compiled serializer in core.fastpath.
+API_FAST_SERIALIZER = True
+
+# Route the brand/founder read endpoints to the native async views in
+# core.async_views. Only worthwhile under ASGI; config/asgi.py turns it on.
+API_ASYNC_VIEWS = os.environ.get("API_ASYNC_VIEWS", "") == "1"
+
+# Prerendered landing snapshots (see core.snapshot)
+SNAPSHOT_ROOT = CACHE_ROOT / "snapshots"
+
+# Static API export for nginx/CDN serving (manage.py export_static_api).
+# With STATIC_EXPORT_ON_CHANGE the export is refreshed after every commit
+# that touches a Brand or Founder.
+STATIC_EXPORT_ROOT = BASE_DIR / "export"
+STATIC_EXPORT_BASE_URL = "https://api.alevate.space"
+STATIC_EXPORT_ON_CHANGE = False
+
+# Base URL the gunicorn warm-up renders the list endpoints for (see
+# core.warmup). Cached responses are keyed by absolute URL, so this should be
+# what requests look like once they reach Django behind the proxy.
+WARMUP_BASE_URL = os.environ.get("WARMUP_BASE_URL", "http://api.alevate.space")
+
+# Request metrics (see core.metrics), served at /api/metrics/ in the
+# Prometheus text format. Set METRICS_TOKEN to require
+# "Authorization: Bearer <token>" on scrapes. METRICS_SERVER_TIMING=1 adds a
+# Server-Timing header with DB and serialization times to every response;
+# anyone can read it, so only turn it on where clients are trusted.
+METRICS_ROOT = CACHE_ROOT / "metrics"
+METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+METRICS_FLUSH_INTERVAL = 1.0
+METRICS_SERVER_TIMING = os.environ.get("METRICS_SERVER_TIMING", "") == "1"
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+
+# Change feed (see core.changes). /api/changes/stream/ keeps each client's
+# connection open for up to CHANGES_STREAM_MAX_SECONDS, which ties up a
+# gunicorn thread per client under WSGI, so it is off unless CHANGES_STREAM=1;
+# config/asgi.py turns it on.
+CHANGES_STREAM = os.environ.get("CHANGES_STREAM", "") == "1"
+CHANGES_STREAM_POLL_INTERVAL = 1.0
+CHANGES_STREAM_HEARTBEAT = 15
+CHANGES_STREAM_MAX_SECONDS = 300
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -133,6 +289,41 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 CORS_ALLOW_ALL_ORIGINS = True
 
 # Media Files
-import os
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
+
+# Uploads are stored by content hash and deduplicated (see core.storage).
+STORAGES = {
+    "default": {"BACKEND": "core.storage.ContentAddressedStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
+# Media is served by core.media (conditional requests, byte ranges, immutable
+# caching for content-addressed uploads and derivatives). Set MEDIA_SENDFILE to hand the bytes to
+# the front-end server instead of streaming them from a worker:
+#   "x-accel-redirect": nginx, with
+#       location /protected-media/ { internal; alias <MEDIA_ROOT>/; }
+#   "x-sendfile": Apache mod_xsendfile or lighttpd.
+MEDIA_SERVE = True
+MEDIA_SENDFILE = os.environ.get("MEDIA_SENDFILE", "")
+MEDIA_ACCEL_REDIRECT_PREFIX = "/protected-media/"
+MEDIA_CACHE_MAX_AGE = 60 * 60
+
+# Responsive image derivatives (see core.images). Formats are tried in order
+# and skipped when Pillow lacks an encoder; JPEG/PNG is always added as the
+# fallback.
+IMAGE_DERIVATIVES_DIR = "derivatives"
+IMAGE_DERIVATIVE_FORMATS = ["avif", "webp"]
+IMAGE_DERIVATIVE_WIDTHS = {
+    "default": [320, 640, 1024],
+    "logo": [128, 256, 512],
+    "hero_image": [480, 768, 1280, 1920],
+    "photo": [320, 640, 960],
+}
+# Encode derivatives of newly saved images on a background thread of the
+# process that saved them (see core.signals.derivative_executor). Images whose
+# encode failed or was lost to a restart are picked up by
+# "manage.py generate_image_derivatives".
+IMAGE_DERIVATIVES_ON_SAVE = True
+# Longest edge, in pixels, of the inline LQIP placeholders stored on the models.
+IMAGE_PLACEHOLDER_SIZE = 16
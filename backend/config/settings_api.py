@@ -0,0 +1,45 @@
+"""
+API-only settings profile for the public JSON workers.
+
+Starts from config.settings and drops what only the admin needs: the admin,
+sessions, messages and staticfiles apps, their middleware, templates, and
+DRF's browsable API. Workers boot faster and import less, which matters for
+autoscaling and max_requests recycling. Run the admin, migrations and the
+other management commands with config.settings.
+
+    DJANGO_SETTINGS_MODULE=config.settings_api gunicorn -c gunicorn_config.py config.wsgi
+"""
+
+from .settings import *  # noqa: F401,F403
+
+INSTALLED_APPS = [
+    # DRF imports django.contrib.auth, whose models need contenttypes.
+    "django.contrib.auth",
+    "django.contrib.contenttypes",
+    "rest_framework",
+    "corsheaders",
+    "core",
+]
+
+# CORS stays: the landing page calls the API from another origin.
+MIDDLEWARE = [
+    "core.middleware.MetricsMiddleware",
+    "core.middleware.CompressionMiddleware",
+    "corsheaders.middleware.CorsMiddleware",
+    "django.middleware.security.SecurityMiddleware",
+    "django.middleware.common.CommonMiddleware",
+]
+
+ROOT_URLCONF = "config.urls_api"
+
+TEMPLATES = []
+
+# Anonymous, JSON-only reads, throttled as in config.settings. Staff-only
+# endpoints (e.g. reorder) answer 403 here since nothing authenticates.
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,  # noqa: F405
+    "DEFAULT_RENDERER_CLASSES": ["rest_framework.renderers.JSONRenderer"],
+    "DEFAULT_PARSER_CLASSES": ["rest_framework.parsers.JSONParser"],
+    "DEFAULT_AUTHENTICATION_CLASSES": [],
+    "UNAUTHENTICATED_USER": None,
+}
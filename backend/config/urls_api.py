@@ -0,0 +1,23 @@
+"""
+URL configuration for the API-only profile (config.settings_api): the
+public API and media, without the admin.
+"""
+import re
+
+from django.urls import path, include, re_path
+from django.conf import settings
+
+from core.views import serve_media
+
+urlpatterns = [
+    path("api/", include("core.urls")),
+]
+
+if settings.MEDIA_SERVE:
+    urlpatterns += [
+        re_path(
+            r"^%s(?P<path>.*)$" % re.escape(settings.MEDIA_URL.lstrip("/")),
+            serve_media,
+            name="media",
+        ),
+    ]
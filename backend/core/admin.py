@@ -1,14 +1,87 @@
-from django.contrib import admin
+import json
+
+from django.contrib import admin, messages
+from django.contrib.admin.models import CHANGE, LogEntry
+from django.db import router, transaction
+from django.utils.translation import ngettext
+from .bulk import bulk_save
 from .models import Brand, Founder
+from .search import fts_available, search_brands
+
+class BulkEditAdmin(admin.ModelAdmin):
+    """
+    Save ``list_editable`` changelist edits with one ``bulk_update`` and one
+    cache invalidation (see core.bulk) instead of a ``save()`` per row.
+    """
+
+    def changelist_view(self, request, extra_context=None):
+        if not (request.method == 'POST' and '_save' in request.POST and self.list_editable):
+            return super().changelist_view(request, extra_context)
+        # save_model() and log_change() queue their work here while Django
+        # walks the formset; the outer transaction covers both.
+        request._bulk_edits = {'objs': [], 'fields': set(), 'logs': {}}
+        with transaction.atomic(using=router.db_for_write(self.model)):
+            response = super().changelist_view(request, extra_context)
+            edits = request._bulk_edits
+            bulk_save(self.model, edits['objs'], sorted(edits['fields']))
+            for message, objs in edits['logs'].items():
+                LogEntry.objects.log_actions(request.user.pk, objs, CHANGE, message)
+        return response
+
+    def _bulk_edits(self, request, change):
+        return getattr(request, '_bulk_edits', None) if change else None
+
+    def save_model(self, request, obj, form, change):
+        edits = self._bulk_edits(request, change)
+        if edits is None:
+            return super().save_model(request, obj, form, change)
+        edits['objs'].append(obj)
+        # Rows keep their other editable values, so writing the union is safe.
+        edits['fields'].update(name for name in form.changed_data if name in self.list_editable)
+
+    def log_change(self, request, obj, message):
+        edits = self._bulk_edits(request, True)
+        if edits is None:
+            return super().log_change(request, obj, message)
+        key = message if isinstance(message, str) else json.dumps(message)
+        edits['logs'].setdefault(key, []).append(obj)
+
+def make_status_action(value, label):
+    def action(modeladmin, request, queryset):
+        changed = [obj for obj in queryset.only('pk', 'name', 'status') if obj.status != value]
+        for obj in changed:
+            obj.status = value
+        with transaction.atomic(using=router.db_for_write(queryset.model)):
+            bulk_save(queryset.model, changed, ['status'])
+            if changed:
+                LogEntry.objects.log_actions(
+                    request.user.pk, changed, CHANGE, [{'changed': {'fields': ['Status']}}],
+                )
+        modeladmin.message_user(request, ngettext(
+            '%(count)d brand moved to %(status)s.',
+            '%(count)d brands moved to %(status)s.',
+            len(changed),
+        ) % {'count': len(changed), 'status': label}, messages.SUCCESS)
+
+    action.__name__ = 'set_status_%s' % value
+    return admin.action(description='Set status to %s' % label)(action)
 
 @admin.register(Brand)
-class BrandAdmin(admin.ModelAdmin):
+class BrandAdmin(BulkEditAdmin):
     list_display = ('name', 'status', 'order')
     list_editable = ('status', 'order')
-    search_fields = ('name',)
+    search_fields = ('name', 'one_liner', 'description')
+    list_filter = ('status',)
+    actions = [make_status_action(value, label) for value, label in Brand.STATUS_CHOICES]
+
+    def get_search_results(self, request, queryset, search_term):
+        # Use the FTS5 index instead of the LIKE scan search_fields implies.
+        if search_term.strip() and fts_available(queryset.db):
+            return search_brands(queryset, search_term), False
+        return super().get_search_results(request, queryset, search_term)
 
 @admin.register(Founder)
-class FounderAdmin(admin.ModelAdmin):
+class FounderAdmin(BulkEditAdmin):
     list_display = ('name', 'role', 'order')
     list_editable = ('order',)
     search_fields = ('name',)
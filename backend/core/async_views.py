@@ -0,0 +1,132 @@
+"""
+Native async read path for the brand/founder API, used under ASGI.
+
+The async views cover the hot path: plain JSON lists (optionally with
+``?fields=``) and detail lookups. They reuse the versioned response cache and
+the compiled serializer, so responses are byte-identical to the DRF viewsets
+and share cache entries with them. Anything else (filters, pagination, the
+browsable API, errors) is handed to the regular viewset, and so is any
+request the viewset's throttles would turn away, to be answered by DRF.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from rest_framework import exceptions
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.request import Request
+
+from .cache import get_cached_response, not_modified_response, response_validators, set_validators, store_response
+from .coalesce import asingle_flight
+from .db import replica_reads
+from .fastpath import compile_serializer, fast_path_enabled, render_json
+from .metrics import timed_serialization
+from .views import BrandViewSet, FounderViewSet
+
+ASYNC_QUERY_PARAMS = {'fields'}
+
+
+def _negotiate(request, viewset):
+    drf_request = Request(request)
+    renderers = [renderer() for renderer in viewset.renderer_classes]
+    try:
+        drf_request.accepted_renderer, drf_request.accepted_media_type = (
+            DefaultContentNegotiation().select_renderer(drf_request, renderers)
+        )
+    except exceptions.NotAcceptable:
+        return None
+    return drf_request
+
+
+def _allowed(request, drf_request, viewset):
+    """
+    Whether the viewset's throttles let an anonymous ``request`` through.
+    Requests carrying credentials are left to the viewset, which
+    authenticates them (possibly with a query) before throttling.
+    """
+    if 'HTTP_AUTHORIZATION' in request.META or settings.SESSION_COOKIE_NAME in request.COOKIES:
+        return False
+    return all(throttle().allow_request(drf_request, None) for throttle in viewset.throttle_classes)
+
+
+def _compile(viewset, drf_request):
+    try:
+        serializer = viewset.serializer_class(context={'request': drf_request})
+    except exceptions.ValidationError:
+        return None
+    ordering = getattr(viewset.pagination_class, 'ordering', ())
+    return compile_serializer(serializer, extra_columns=ordering)
+
+
+def _finalize(response, etag, version):
+    # Match the headers DRF's finalize_response() adds.
+    response['Allow'] = 'GET, HEAD, OPTIONS'
+    patch_vary_headers(response, ('Accept',))
+    return set_validators(response, etag, version)
+
+
+def _lookup(request, models, media_type):
+    version, etag = response_validators(request, models, media_type)
+    response = not_modified_response(request, etag, version)
+    if response is None:
+        cached = get_cached_response(etag)
+        if cached is not None:
+            response = HttpResponse(cached[1], content_type=cached[0])
+    return version, etag, response
+
+
+# Cache lookups are file reads; keep them off the thread that runs ORM calls,
+# and do all of them in a single hop.
+_lookup_async = sync_to_async(_lookup, thread_sensitive=False)
+_store_async = sync_to_async(store_response, thread_sensitive=False)
+
+
+def make_async_view(viewset, action):
+    sync_view = sync_to_async(viewset.as_view({'get': action}))
+    model = viewset.queryset.model
+
+    async def view(request, **kwargs):
+        drf_request = None
+        if request.method in ('GET', 'HEAD') and set(request.GET) <= ASYNC_QUERY_PARAMS:
+            drf_request = _negotiate(request, viewset)
+        if drf_request is None or not fast_path_enabled(drf_request):
+            return await sync_view(request, **kwargs)
+        if not _allowed(request, drf_request, viewset):
+            return await sync_view(request, **kwargs)
+
+        version, etag, response = await _lookup_async(
+            request, (model,), drf_request.accepted_media_type,
+        )
+        if response is None:
+            compiled = _compile(viewset, drf_request)
+            if compiled is None:
+                return await sync_view(request, **kwargs)
+
+            async def render():
+                queryset = viewset.queryset.values(*compiled.columns)
+                with replica_reads(), timed_serialization():
+                    if action == 'list':
+                        body = compiled.render([row async for row in queryset])
+                    else:
+                        row = await queryset.filter(pk=kwargs['pk']).afirst()
+                        if row is None:
+                            return None
+                        body = render_json(compiled.to_representation([row])[0])
+                await _store_async(etag, 'application/json', body)
+                return body
+
+            # Concurrent misses on this event loop share one query and render.
+            body = await asingle_flight(etag, render)
+            if body is None:
+                return await sync_view(request, **kwargs)
+            response = HttpResponse(body, content_type='application/json')
+        return _finalize(response, etag, version)
+
+    view.csrf_exempt = True
+    return view
+
+
+brand_list = make_async_view(BrandViewSet, 'list')
+brand_detail = make_async_view(BrandViewSet, 'retrieve')
+founder_list = make_async_view(FounderViewSet, 'list')
+founder_detail = make_async_view(FounderViewSet, 'retrieve')
@@ -0,0 +1,53 @@
+"""
+Bulk edits for the admin and the reorder API.
+
+Changes are written with ``bulk_update`` inside one transaction and announced
+with a single ``content_changed`` call, instead of a ``save()`` per row with
+its own signals. The fields edited this way (``order``, ``status``, re-stored
+image names) change no image content, so skipping the per-row pre/post save
+hooks loses nothing; the rows are stamped for the change feed (see
+core.changes) here instead.
+"""
+from django.db import router, transaction
+
+from .changes import CHANGE_FIELDS, stamp
+from .signals import content_changed
+
+
+def bulk_save(model, objs, fields):
+    """Write ``fields`` of ``objs`` in one batch and invalidate ``model`` once."""
+    objs = list(objs)
+    if not objs:
+        return 0
+    with transaction.atomic(using=router.db_for_write(model)):
+        stamp(objs)
+        model._base_manager.bulk_update(objs, [*fields, *CHANGE_FIELDS])
+        content_changed(model)
+    return len(objs)
+
+
+def reorder(model, ids):
+    """
+    Put the rows ``ids`` in the given sequence and return how many moved.
+
+    The rows keep the set of ``order`` slots they already occupy, so
+    re-ranking a few rows leaves their position among the others alone.
+    Raises ``model.DoesNotExist`` if an id is unknown.
+    """
+    with transaction.atomic(using=router.db_for_write(model)):
+        rows = model._base_manager.only('pk', 'order').in_bulk(ids)
+        missing = [pk for pk in ids if pk not in rows]
+        if missing:
+            raise model.DoesNotExist('Unknown ids: %s' % ', '.join(map(str, missing)))
+        slots = sorted(row.order for row in rows.values())
+        if len(set(slots)) < len(slots):
+            # Ties (e.g. everything still at the default 0) cannot express a
+            # sequence, number consecutively from the lowest slot instead.
+            slots = range(slots[0], slots[0] + len(slots))
+        moved = []
+        for pk, slot in zip(ids, slots):
+            row = rows[pk]
+            if row.order != slot:
+                row.order = slot
+                moved.append(row)
+        return bulk_save(model, moved, ['order'])
@@ -0,0 +1,194 @@
+"""
+Versioned response cache for the read-only API.
+
+Every model the API exposes has a content version stored in the shared API
+cache. Rendered responses are cached under that version, so bumping it (see
+``core.signals``) invalidates every cached payload for the model at once
+without having to know which URLs were cached.
+"""
+import hashlib
+import os
+import time
+import uuid
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+from .coalesce import single_flight
+from .metrics import timed_serialization
+
+ContentVersion = namedtuple('ContentVersion', ['token', 'last_modified'])
+
+VERSION_KEY = 'core:version:%s'
+RESPONSE_KEY = 'core:response:%s'
+LEASE_KEY = 'core:rendering:%s'
+
+# How often a worker waiting on another worker's render checks for its result.
+LEASE_POLL_INTERVAL = 0.01
+
+
+def get_api_cache():
+    return caches[settings.API_CACHE_ALIAS]
+
+
+def _version_key(model):
+    return VERSION_KEY % model._meta.label_lower
+
+
+def _new_version():
+    return (uuid.uuid4().hex, time.time())
+
+
+def get_content_version(*models):
+    """
+    Return the combined ContentVersion of ``models``.
+
+    Versions are created lazily, so a cold or flushed cache simply starts a
+    new version instead of serving stale data.
+    """
+    cache = get_api_cache()
+    keys = [_version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _new_version(), None)
+            versions[key] = cache.get(key) or _new_version()
+    tokens = [versions[key][0] for key in keys]
+    last_modified = max(versions[key][1] for key in keys)
+    return ContentVersion('.'.join(tokens), last_modified)
+
+
+def bump_version(*models):
+    cache = get_api_cache()
+    cache.set_many({_version_key(model): _new_version() for model in models}, None)
+
+
+def make_etag(version, *parts):
+    digest = hashlib.md5(version.token.encode(), usedforsecurity=False)
+    for part in parts:
+        digest.update(b'\0' + str(part).encode())
+    return quote_etag(digest.hexdigest())
+
+
+def set_validators(response, etag, version):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(version.last_modified)
+    return response
+
+
+def response_validators(request, models, media_type):
+    """Return ``(version, etag)`` identifying the JSON response to ``request``."""
+    version = get_content_version(*models)
+    # Image URLs are absolute, so the host is part of the cache identity.
+    return version, make_etag(version, request.build_absolute_uri(), media_type)
+
+
+def get_cached_response(etag):
+    """Return the cached ``(content_type, body)`` for ``etag``, or None."""
+    return get_api_cache().get(RESPONSE_KEY % etag.strip('"'))
+
+
+def store_response(etag, content_type, body):
+    get_api_cache().set(RESPONSE_KEY % etag.strip('"'), (content_type, body), settings.API_CACHE_TIMEOUT)
+
+
+def _render_leased(etag, render):
+    # Best effort: cache.add() is not atomic on every backend, so two
+    # workers may occasionally both render, as they would without a lease.
+    cache = get_api_cache()
+    lease = LEASE_KEY % etag.strip('"')
+    timeout = settings.API_COALESCE_TIMEOUT
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and not cache.add(lease, os.getpid(), timeout):
+        time.sleep(LEASE_POLL_INTERVAL)
+        cached = get_cached_response(etag)
+        if cached is not None:
+            return cached
+    try:
+        return render()
+    finally:
+        cache.delete(lease)
+
+
+def render_once(etag, render):
+    """
+    Return ``render()``, the ``(content_type, body)`` to store under
+    ``etag``, rendering it once for all concurrent misses: once per process
+    (see core.coalesce), and while another worker holds the render lease,
+    by waiting for that worker's result in the cache.
+    """
+    return single_flight(etag, lambda: _render_leased(etag, render), settings.API_COALESCE_TIMEOUT)
+
+
+def not_modified_response(request, etag, version):
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(version.last_modified),
+    )
+    if response is not None:
+        set_validators(response, etag, version)
+    return response
+
+
+class CachedResponseMixin:
+    """
+    Serve ``list``/``retrieve`` from the API cache.
+
+    JSON responses are rendered once per content version and stored as bytes;
+    concurrent misses for the same response share one render (see
+    render_once). Conditional requests are answered from the version alone,
+    so a matching ``If-None-Match``/``If-Modified-Since`` never touches the
+    database.
+    """
+    cache_models = None
+
+    def get_cache_models(self):
+        return self.cache_models or (self.queryset.model,)
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(request, super().retrieve, *args, **kwargs)
+
+    def cached_response(self, request, handler, *args, **kwargs):
+        # The browsable API embeds per-user state, only plain JSON is shared.
+        if request.accepted_renderer.format != 'json':
+            return handler(request, *args, **kwargs)
+
+        version, etag = response_validators(
+            request, self.get_cache_models(), request.accepted_media_type,
+        )
+        not_modified = not_modified_response(request, etag, version)
+        if not_modified is not None:
+            return not_modified
+
+        cached = get_cached_response(etag)
+        if cached is None:
+            response = None
+
+            def render():
+                nonlocal response
+                with timed_serialization():
+                    response = handler(request, *args, **kwargs)
+                    if response.status_code != 200:
+                        return None
+                    if isinstance(response, Response):
+                        response.accepted_renderer = request.accepted_renderer
+                        response.accepted_media_type = request.accepted_media_type
+                        response.renderer_context = self.get_renderer_context()
+                        response.render()
+                rendered = (response['Content-Type'], response.content)
+                store_response(etag, *rendered)
+                return rendered
+
+            cached = render_once(etag, render)
+            if cached is None:
+                return response
+
+        content_type, body = cached
+        return set_validators(HttpResponse(body, content_type=content_type), etag, version)
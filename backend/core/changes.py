@@ -0,0 +1,252 @@
+"""
+Revisions and tombstones behind the change feed (``/api/changes/``).
+
+Every write to a Brand or Founder stamps the row with a revision drawn from a
+single counter row, and every delete leaves a Tombstone carrying one. A client
+keeps the revision of its last sync and asks only for what came after it.
+
+The counter is bumped with an UPDATE, whose lock is held until commit, so
+writers take revisions in commit order: once revision N is readable, every
+smaller one is committed too. All writes in one transaction share a single
+revision. Bulk writes that skip model signals must ``stamp()`` or ``touch()``
+their rows themselves.
+
+Replacing the data wholesale (``seed_data`` without ``--upsert``) records a
+single reset instead of a tombstone per row: clients that synced before it
+are told to drop their copy and take the full set.
+"""
+import asyncio
+import json
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.transaction import TransactionManagementError
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .cache import get_content_version
+from .db import api_read_alias, replica_reads
+from .models import Brand, Founder, RevisionCounter, Tombstone
+
+CHANGE_FIELDS = ['revision', 'updated_at']
+
+# Response key -> model, in the order the feed lists them.
+FEED_MODELS = {'brands': Brand, 'founders': Founder}
+
+_transaction_revisions = threading.local()
+
+
+class _RevisionMarker:
+    """
+    Queued with on_commit by the transaction that took ``revision``. A
+    rollback drops it from the queue, which tells a later transaction on the
+    same connection to take a fresh revision.
+    """
+
+    def __init__(self, revision):
+        self.revision = revision
+
+    def __call__(self):
+        pass
+
+
+def next_revision(using=None):
+    """Take a new revision from the counter."""
+    using = using or router.db_for_write(RevisionCounter)
+    counter = RevisionCounter.objects.using(using)
+    with transaction.atomic(using=using):
+        if not counter.filter(pk=1).update(value=F('value') + 1):
+            counter.create(pk=1, value=1)
+        return counter.values_list('value', flat=True).get(pk=1)
+
+
+def transaction_revision(using=None):
+    """
+    The revision of the current transaction, taken on first use. The rows it
+    stamps must be written in that same transaction, or a reader could see
+    the revision before the rows.
+    """
+    using = using or router.db_for_write(RevisionCounter)
+    connection = transaction.get_connection(using)
+    if not connection.in_atomic_block:
+        raise TransactionManagementError('Revisions can only be taken inside a transaction.')
+    marker = getattr(_transaction_revisions, using, None)
+    if marker is None or not any(queued[1] is marker for queued in connection.run_on_commit):
+        marker = _RevisionMarker(next_revision(using))
+        transaction.on_commit(marker, using=using)
+        setattr(_transaction_revisions, using, marker)
+    return marker.revision
+
+
+def current_revision():
+    """The newest committed revision, read from wherever reads are routed."""
+    return feed_state()[0]
+
+
+def feed_state():
+    """``(revision, reset_revision)`` as last committed."""
+    return RevisionCounter.objects.filter(pk=1).values_list('value', 'reset_revision').first() or (0, 0)
+
+
+def stamp(objs, using=None):
+    """Set CHANGE_FIELDS on ``objs`` before a bulk_create/bulk_update."""
+    if objs:
+        revision = transaction_revision(using)
+        now = timezone.now()
+        for obj in objs:
+            obj.revision = revision
+            obj.updated_at = now
+    return objs
+
+
+def touch(model, pks):
+    """
+    Re-stamp rows whose serialized form changed without a write to them,
+    e.g. once their image srcsets exist.
+    """
+    using = router.db_for_write(model)
+    with transaction.atomic(using=using):
+        return model._base_manager.using(using).filter(pk__in=pks).update(
+            revision=transaction_revision(using), updated_at=timezone.now(),
+        )
+
+
+def touch_image_rows(names):
+    """Re-stamp the rows that reference any of the image files ``names``; return their models."""
+    from .images import IMAGE_FIELDS
+
+    touched = []
+    for model, field_names in IMAGE_FIELDS:
+        query = Q()
+        for field_name in field_names:
+            query |= Q(**{field_name + '__in': names})
+        pks = list(model._base_manager.filter(query).values_list('pk', flat=True))
+        if pks:
+            touch(model, pks)
+            touched.append(model)
+    return touched
+
+
+def record_deletion(instance, using=None):
+    using = using or router.db_for_write(Tombstone)
+    with transaction.atomic(using=using):
+        Tombstone.objects.using(using).create(
+            model=instance._meta.label_lower,
+            object_id=instance.pk,
+            revision=transaction_revision(using),
+        )
+
+
+def record_reset(using=None):
+    """
+    Mark every Brand and Founder as replaced in the current transaction,
+    e.g. after deleting them without signals. Older tombstones are dropped:
+    clients behind the reset resync from scratch anyway.
+    """
+    using = using or router.db_for_write(RevisionCounter)
+    with transaction.atomic(using=using):
+        revision = transaction_revision(using)
+        RevisionCounter.objects.using(using).filter(pk=1).update(reset_revision=revision)
+        Tombstone.objects.using(using).filter(revision__lt=revision).delete()
+    return revision
+
+
+def parse_since(value):
+    """A revision from a query parameter or header, or None if invalid."""
+    try:
+        since = int(value)
+    except (TypeError, ValueError):
+        return None
+    return since if since >= 0 else None
+
+
+def changes_between(since, head):
+    """
+    ``(rows, deleted)`` for revisions in ``(since, head]``: a queryset per
+    FEED_MODELS key, and the ids deleted per key.
+    """
+    rows, deleted = {}, {}
+    window = {'revision__gt': since, 'revision__lte': head}
+    for key, model in FEED_MODELS.items():
+        rows[key] = model.objects.filter(**window).order_by('revision', 'pk')
+        deleted[key] = list(
+            Tombstone.objects.filter(model=model._meta.label_lower, **window)
+            .order_by('revision', 'object_id').values_list('object_id', flat=True)
+        )
+    return rows, deleted
+
+
+def _poll_head():
+    # A stream lives for minutes; hand the pooled connection back after
+    # every read rather than when the response finally closes.
+    try:
+        with replica_reads():
+            return current_revision()
+    finally:
+        connections[api_read_alias()].close()
+
+
+def _change_event(revision):
+    return 'id: %d\nevent: change\ndata: %s\n\n' % (revision, json.dumps({'revision': revision}))
+
+
+class _StreamState:
+    """Decides what the next poll of a change stream sends."""
+
+    def __init__(self, since):
+        self.since = since
+        self.version = None
+        self.started = self.last_sent = time.monotonic()
+
+    def expired(self):
+        return time.monotonic() - self.started >= settings.CHANGES_STREAM_MAX_SECONDS
+
+    def version_changed(self):
+        # Content versions sit in the API cache, so idle polls never touch
+        # the database.
+        version = get_content_version(*FEED_MODELS.values()).token
+        changed, self.version = version != self.version, version
+        return changed
+
+    def event(self, head):
+        if head > self.since:
+            self.since = self.last_sent = head
+            return _change_event(head)
+        return self.heartbeat()
+
+    def heartbeat(self):
+        if time.monotonic() - self.last_sent >= settings.CHANGES_STREAM_HEARTBEAT:
+            self.last_sent = time.monotonic()
+            return ': keep-alive\n\n'
+        return None
+
+
+def _retry_field():
+    return 'retry: %d\n\n' % (settings.CHANGES_STREAM_POLL_INTERVAL * 1000)
+
+
+def stream_changes(since):
+    """Server-sent events announcing new revisions, for WSGI."""
+    state = _StreamState(since)
+    yield _retry_field()
+    while not state.expired():
+        message = state.event(_poll_head()) if state.version_changed() else state.heartbeat()
+        if message:
+            yield message
+        time.sleep(settings.CHANGES_STREAM_POLL_INTERVAL)
+
+
+async def astream_changes(since):
+    """Server-sent events announcing new revisions, for ASGI."""
+    state = _StreamState(since)
+    poll_head = sync_to_async(_poll_head, thread_sensitive=False)
+    yield _retry_field()
+    while not state.expired():
+        changed = await sync_to_async(state.version_changed, thread_sensitive=False)()
+        message = state.event(await poll_head()) if changed else state.heartbeat()
+        if message:
+            yield message
+        await asyncio.sleep(settings.CHANGES_STREAM_POLL_INTERVAL)
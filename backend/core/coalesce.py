@@ -0,0 +1,68 @@
+"""
+Single-flight execution of cache misses.
+
+When a content version changes, every request in flight for a popular URL
+misses the response cache at the same moment, and each would run the same
+query and serialization. ``single_flight(key, compute)`` runs ``compute`` for
+the first caller and hands its result to the concurrent callers with the same
+key; ``asingle_flight`` does the same for coroutines on one event loop.
+
+``compute`` returns None for a result that must not be shared, e.g. an error
+response; waiters then compute their own.
+"""
+import asyncio
+import threading
+
+_flights = {}
+_flights_lock = threading.Lock()
+_async_flights = {}
+
+
+class _Flight:
+    __slots__ = ('done', 'result')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+
+def single_flight(key, compute, timeout):
+    """
+    Return ``compute()``, sharing one call among the threads asking for
+    ``key`` at the same time. A waiter gives up after ``timeout`` seconds and
+    computes the result itself.
+    """
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+    if not leader:
+        if flight.done.wait(timeout) and flight.result is not None:
+            return flight.result
+        return compute()
+    try:
+        flight.result = compute()
+        return flight.result
+    finally:
+        with _flights_lock:
+            del _flights[key]
+        flight.done.set()
+
+
+async def asingle_flight(key, compute):
+    """``single_flight`` for coroutine functions; waiters share the leader's result."""
+    key = (asyncio.get_running_loop(), key)
+    future = _async_flights.get(key)
+    if future is not None:
+        # Shielded so a waiter's disconnect does not cancel the leader.
+        result = await asyncio.shield(future)
+        return result if result is not None else await compute()
+    future = _async_flights[key] = asyncio.get_running_loop().create_future()
+    result = None
+    try:
+        result = await compute()
+        return result
+    finally:
+        del _async_flights[key]
+        future.set_result(result)
@@ -0,0 +1,168 @@
+"""
+Content-coding helpers shared by the precompressed API payloads and
+``CompressionMiddleware``.
+
+Precompressed files are written once, so they use the maximum levels.
+Responses compressed on the fly use ``DYNAMIC_LEVELS``, which trade a few
+percent of size for an order of magnitude less CPU.
+"""
+import gzip
+import hashlib
+import re
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+
+from .cache import get_api_cache
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstandard is optional
+    zstandard = None
+
+
+def _gzip(data, level=9):
+    # mtime=0 keeps the output deterministic so identical payloads compress
+    # to identical bytes.
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def _brotli(data, level=11):
+    return brotli.compress(data, quality=level)
+
+
+def _zstd(data, level=19):
+    return zstandard.ZstdCompressor(level=level).compress(data)
+
+
+# Preferred encodings first.
+ENCODERS = {}
+if brotli is not None:
+    ENCODERS['br'] = _brotli
+if zstandard is not None:
+    ENCODERS['zstd'] = _zstd
+ENCODERS['gzip'] = _gzip
+
+DYNAMIC_LEVELS = {'br': 5, 'zstd': 3, 'gzip': 6}
+
+# Media types whose bodies are already compressed (or are opaque binary);
+# compressing them again only burns CPU.
+INCOMPRESSIBLE_TYPES = re.compile(
+    r'^(image/(?!svg\+xml)|video/|audio/|font/woff2?$|application/('
+    r'zip|gzip|x-gzip|x-bzip2|x-xz|zstd|x-7z-compressed|x-rar-compressed|pdf|octet-stream|wasm)$)'
+)
+
+# Matches the random gzip filename padding of Django's GZipMiddleware.
+BREACH_MAX_RANDOM_BYTES = 100
+
+COMPRESSED_KEY = 'core:compressed:%s:%s'
+
+# File suffixes nginx's gzip_static/brotli_static (and zstd_static) look for.
+FILE_SUFFIXES = {'br': '.br', 'zstd': '.zst', 'gzip': '.gz'}
+
+
+def parse_accept_encoding(header):
+    """Return the set of codings the client accepts (q=0 excluded)."""
+    accepted = set()
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            accepted.add(coding)
+    return accepted
+
+
+def negotiate_encoding(request, available):
+    """Pick the best of ``available`` codings the request accepts, or None."""
+    accepted = parse_accept_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    for coding in available:
+        if coding in accepted or '*' in accepted:
+            return coding
+    return None
+
+
+def compress_all(data):
+    return {coding: encode(data) for coding, encode in ENCODERS.items()}
+
+
+def is_compressible(response):
+    if response.streaming or response.has_header('Content-Encoding'):
+        return False
+    if response.status_code in (204, 206, 304):
+        return False
+    if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+        return False
+    if 'no-transform' in response.get('Cache-Control', ''):
+        return False
+    content_type = response.get('Content-Type', '').split(';', 1)[0].strip().lower()
+    return not INCOMPRESSIBLE_TYPES.match(content_type)
+
+
+def _is_per_user(request, response):
+    # get_token() sets CSRF_COOKIE_NEEDS_UPDATE when a page renders the token.
+    return bool(request.META.get('CSRF_COOKIE_NEEDS_UPDATE')) or 'private' in response.get('Cache-Control', '')
+
+
+def _cached_encode(etag, coding, data):
+    digest = hashlib.md5(('%s:%d' % (etag, len(data))).encode(), usedforsecurity=False).hexdigest()
+    key = COMPRESSED_KEY % (coding, digest)
+    cache = get_api_cache()
+    body = cache.get(key)
+    if body is None:
+        body = ENCODERS[coding](data, DYNAMIC_LEVELS[coding])
+        cache.set(key, body, settings.API_CACHE_TIMEOUT)
+    return body
+
+
+def compress_response(request, response):
+    """
+    Compress ``response`` in place with the best coding the client accepts.
+
+    Bodies with an ``ETag`` are compressed once per coding and kept in the
+    API cache. Private responses and pages embedding a CSRF token may carry
+    secrets next to reflected input, so like Django's GZipMiddleware they
+    only get gzip with random padding against BREACH, and are never cached.
+    """
+    if not is_compressible(response):
+        return response
+    patch_vary_headers(response, ('Accept-Encoding',))
+
+    per_user = _is_per_user(request, response)
+    coding = negotiate_encoding(request, ['gzip'] if per_user else list(ENCODERS))
+    if coding is None:
+        return response
+
+    etag = response.get('ETag')
+    if per_user:
+        body = compress_string(response.content, max_random_bytes=BREACH_MAX_RANDOM_BYTES)
+    elif etag:
+        body = _cached_encode(etag, coding, response.content)
+    else:
+        body = ENCODERS[coding](response.content, DYNAMIC_LEVELS[coding])
+    if len(body) >= len(response.content):
+        return response
+
+    response.content = body
+    response['Content-Length'] = str(len(body))
+    response['Content-Encoding'] = coding
+    # The compressed bytes are a different representation, so the validator
+    # can only be weak (If-None-Match uses the weak comparison).
+    if etag and etag.startswith('"'):
+        response['ETag'] = 'W/' + etag
+    return response
@@ -0,0 +1,107 @@
+"""
+SQLite tuning, statement warm-up and read-only replica routing.
+
+Every new SQLite connection gets ``settings.SQLITE_PRAGMAS`` applied. With WAL
+journaling readers see the last committed state and never wait for a writer,
+so the public API reads through a second, read-only connection to the same
+file (the ``replica`` alias) while the admin writes through ``default``.
+New pooled connections of the alias the API reads from also read the first
+row of the list queries (see core.warmup.warm_statements).
+"""
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from .pool import is_fresh_connection
+
+logger = logging.getLogger(__name__)
+
+READ_REPLICA_ALIAS = 'replica'
+
+# Set for the duration of a public read-only request, see replica_reads().
+_replica_reads = ContextVar('replica_reads', default=False)
+
+# journal_mode is persistent and stored in the database file, and neither it
+# nor synchronous matter to a connection that cannot write.
+WRITE_ONLY_PRAGMAS = ('journal_mode', 'synchronous')
+
+
+def _is_read_only(connection):
+    return 'mode=ro' in str(connection.settings_dict['NAME'])
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    # Pooled connections keep their pragmas between checkouts.
+    if connection.vendor != 'sqlite' or not is_fresh_connection(connection):
+        return
+    read_only = _is_read_only(connection)
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            if read_only and name in WRITE_ONLY_PRAGMAS:
+                continue
+            cursor.execute('PRAGMA %s = %s' % (name, value))
+
+
+def api_read_alias():
+    return READ_REPLICA_ALIAS if READ_REPLICA_ALIAS in settings.DATABASES else 'default'
+
+
+@receiver(connection_created)
+def warm_new_connection(sender, connection, **kwargs):
+    if not settings.DB_WARM_STATEMENTS or connection.alias != api_read_alias():
+        return
+    if not is_fresh_connection(connection):
+        return
+    from .warmup import warm_statements
+
+    try:
+        warm_statements(connection)
+    except DatabaseError:
+        # E.g. migrate running against an empty database.
+        logger.debug('Statement warm-up skipped on %s', connection.alias, exc_info=True)
+
+
+@contextmanager
+def replica_reads():
+    """Route reads inside the block to the read-only replica, if configured."""
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+class ReadReplicaRouter:
+    """
+    Send reads made inside ``replica_reads()`` to the replica alias.
+
+    Everything else, and any read made while ``default`` is inside a
+    transaction (which must see its own uncommitted writes), stays on
+    ``default``.
+    """
+
+    def db_for_read(self, model, **hints):
+        if (_replica_reads.get() and READ_REPLICA_ALIAS in settings.DATABASES
+                and not connections['default'].in_atomic_block):
+            return READ_REPLICA_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases point at the same data.
+        if {obj1._state.db, obj2._state.db} <= {'default', READ_REPLICA_ALIAS}:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == READ_REPLICA_ALIAS:
+            return False
+        return None
@@ -0,0 +1,4 @@
+"""
+Database engines that pool their connections (see core.pool). They behave
+exactly like the Django engine they extend otherwise.
+"""
@@ -0,0 +1,12 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.postgresql import base
+
+from core.pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+
+    def get_connection_params(self):
+        if self.settings_dict['OPTIONS'].get('pool'):
+            raise ImproperlyConfigured('core.db_backends.postgresql pools itself, drop OPTIONS["pool"].')
+        return super().get_connection_params()
@@ -0,0 +1,119 @@
+"""
+Static export of the public API for nginx/CDN serving.
+
+Each endpoint is rendered through its real view, so the exported bytes match
+what Django would serve. Files are written twice: once under a content-hashed
+name that can be cached forever, and once under a stable ``index.json`` path
+that nginx can serve in place of the API route. ``manifest.json`` records both
+and lets the next run skip every file whose hash has not changed.
+"""
+import hashlib
+import json
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from django.test import RequestFactory
+
+from .compression import FILE_SUFFIXES, compress_all
+from .files import write_atomic
+from .models import Brand, Founder
+from .throttling import INTERNAL_REQUEST
+from .views import BrandViewSet, FounderViewSet, landing_snapshot
+
+MANIFEST_NAME = 'manifest.json'
+
+
+def _make_request(base_url, path):
+    parts = urlsplit(base_url)
+    factory = RequestFactory()
+    return factory.get(
+        path,
+        HTTP_HOST=parts.netloc,
+        HTTP_ACCEPT='application/json',
+        secure=parts.scheme == 'https',
+        **{INTERNAL_REQUEST: True},
+    )
+
+
+def iter_endpoints():
+    """Yield ``(url path, view, view kwargs)`` for every exported route."""
+    yield '/api/snapshot/', landing_snapshot, {}
+    for prefix, viewset, model in (
+        ('brands', BrandViewSet, Brand),
+        ('founders', FounderViewSet, Founder),
+    ):
+        yield '/api/%s/' % prefix, viewset.as_view({'get': 'list'}), {}
+        detail = viewset.as_view({'get': 'retrieve'})
+        for pk in model.objects.values_list('pk', flat=True):
+            yield '/api/%s/%s/' % (prefix, pk), detail, {'pk': pk}
+
+
+def render_endpoint(base_url, path, view, kwargs):
+    response = view(_make_request(base_url, path), **kwargs)
+    if hasattr(response, 'render'):
+        response.render()
+    if response.status_code != 200:
+        raise RuntimeError('%s returned HTTP %s' % (path, response.status_code))
+    return response.content
+
+
+def _write_with_variants(path, body):
+    write_atomic(path, body)
+    for coding, data in compress_all(body).items():
+        write_atomic(path.with_name(path.name + FILE_SUFFIXES[coding]), data)
+
+
+def _remove_with_variants(path):
+    path.unlink(missing_ok=True)
+    for suffix in FILE_SUFFIXES.values():
+        path.with_name(path.name + suffix).unlink(missing_ok=True)
+
+
+def load_manifest(output_dir):
+    try:
+        with open(output_dir / MANIFEST_NAME) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def export_static_api(output_dir, base_url, force=False):
+    """
+    Export the API into ``output_dir``. Return ``(written, unchanged,
+    removed)`` lists of URL paths.
+    """
+    output_dir = Path(output_dir)
+    previous = load_manifest(output_dir)
+    manifest = {}
+    written, unchanged = [], []
+
+    for url, view, kwargs in iter_endpoints():
+        body = render_endpoint(base_url, url, view, kwargs)
+        digest = hashlib.sha256(body).hexdigest()[:16]
+        stable = url.strip('/') + '/index.json'
+        hashed = '%s.%s.json' % (url.strip('/'), digest)
+        manifest[url] = {'file': stable, 'hashed': hashed, 'hash': digest, 'bytes': len(body)}
+
+        old = previous.get(url)
+        if (not force and old and old['hash'] == digest
+                and (output_dir / stable).exists() and (output_dir / hashed).exists()):
+            unchanged.append(url)
+            continue
+
+        _write_with_variants(output_dir / hashed, body)
+        _write_with_variants(output_dir / stable, body)
+        if old and old['hashed'] != hashed:
+            _remove_with_variants(output_dir / old['hashed'])
+        written.append(url)
+
+    removed = sorted(set(previous) - set(manifest))
+    for url in removed:
+        _remove_with_variants(output_dir / previous[url]['hashed'])
+        _remove_with_variants(output_dir / previous[url]['file'])
+
+    if written or removed or not (output_dir / MANIFEST_NAME).exists():
+        write_atomic(
+            output_dir / MANIFEST_NAME,
+            json.dumps(manifest, indent=2, sort_keys=True).encode(),
+        )
+    return written, unchanged, removed
@@ -0,0 +1,166 @@
+"""
+Compiled fast path for read-only list responses.
+
+DRF runs ``to_representation`` field by field on model instances, which
+dominates CPU on list endpoints. ``CompiledSerializer`` inspects a serializer
+once per request, turns each field into a plain converter function, and
+applies those to rows from ``QuerySet.values()``. Output is byte-identical to
+``JSONRenderer`` over the regular serializer; serializers with fields the
+compiler does not understand return ``None`` from ``compile_serializer`` and
+the view falls back to DRF.
+"""
+import json
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.utils.encoding import filepath_to_uri
+from rest_framework import serializers
+from rest_framework.settings import api_settings
+
+from .images import build_srcset, load_manifest, source_digest
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+# Fields whose to_representation() is the identity for the values the
+# database hands back.
+IDENTITY_FIELDS = (
+    serializers.CharField,
+    serializers.ChoiceField,
+    serializers.IntegerField,
+    serializers.BooleanField,
+)
+
+
+def _identity(value):
+    return value
+
+
+def _date_converter(field):
+    output_format = getattr(field, 'format', api_settings.DATE_FORMAT)
+    if output_format is None or output_format.lower() != 'iso-8601':
+        return field.to_representation
+    return lambda value: value.isoformat()
+
+
+def _file_url_converter(request, storage):
+    base_url = storage.base_url
+    if request is not None:
+        base_url = request.build_absolute_uri(base_url)
+
+    def convert(name):
+        if not name:
+            return None
+        return base_url + filepath_to_uri(name).lstrip('/')
+    return convert
+
+
+def _srcset_converter(request, storage):
+    # Many rows share an image (placeholders, synthetic data); look each file
+    # up once per response.
+    memo = {}
+
+    def convert(name):
+        if not name:
+            return None
+        if name not in memo:
+            try:
+                manifest = load_manifest(source_digest(storage.path(name)))
+            except FileNotFoundError:
+                manifest = None
+            memo[name] = None if manifest is None else build_srcset(manifest, request)
+        return memo[name]
+    return convert
+
+
+def _field_converter(field, model_field, request):
+    # Imported lazily to keep this module importable from serializers.
+    from .serializers import ResponsiveImageField
+
+    if isinstance(field, (ResponsiveImageField, serializers.FileField)):
+        # URLs are rebuilt from the file name, which only matches what
+        # FileSystemStorage.url() would return.
+        if not isinstance(model_field.storage, FileSystemStorage):
+            return None
+    if isinstance(field, ResponsiveImageField):
+        return _srcset_converter(request, model_field.storage)
+    if isinstance(field, serializers.FileField):
+        if not getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL):
+            return None
+        return _file_url_converter(request, model_field.storage)
+    if isinstance(field, serializers.DateField):
+        return _date_converter(field)
+    if isinstance(field, IDENTITY_FIELDS):
+        return _identity
+    if type(field) is serializers.ReadOnlyField:
+        return _identity
+    if isinstance(field, (serializers.DateTimeField, serializers.DecimalField, serializers.FloatField)):
+        return field.to_representation
+    return None
+
+
+class CompiledSerializer:
+    def __init__(self, plan, columns):
+        self.plan = plan
+        self.columns = columns
+
+    def to_representation(self, rows):
+        plan = self.plan
+        data = []
+        for row in rows:
+            item = {}
+            for name, column, convert in plan:
+                value = row[column]
+                item[name] = None if value is None else convert(value)
+            data.append(item)
+        return data
+
+    def render(self, rows):
+        return render_json(self.to_representation(rows))
+
+
+def compile_serializer(serializer, extra_columns=()):
+    """
+    Compile a (possibly sparse) serializer instance into a CompiledSerializer,
+    or return None if any field needs the full DRF machinery.
+    """
+    model = serializer.Meta.model
+    request = serializer.context.get('request')
+    model_fields = {f.name: f for f in model._meta.concrete_fields}
+    plan = []
+    columns = set(extra_columns)
+    for name, field in serializer.fields.items():
+        source = field.source
+        model_field = model_fields.get(source)
+        if model_field is None or '.' in source:
+            return None
+        convert = _field_converter(field, model_field, request)
+        if convert is None:
+            return None
+        plan.append((name, model_field.attname, convert))
+        columns.add(model_field.attname)
+    return CompiledSerializer(plan, sorted(columns))
+
+
+def render_json(data):
+    """Encode ``data`` exactly as DRF's compact JSONRenderer would."""
+    if orjson is not None:
+        ret = orjson.dumps(data).decode()
+    else:
+        ret = json.dumps(data, ensure_ascii=False, allow_nan=False, separators=(',', ':'))
+    return ret.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029').encode()
+
+
+def fast_path_enabled(request):
+    """Only plain, unindented JSON with DRF's default JSON settings qualifies."""
+    if not settings.API_FAST_SERIALIZER:
+        return False
+    if getattr(request.accepted_renderer, 'format', None) != 'json':
+        return False
+    if 'indent' in (request.accepted_media_type or ''):
+        return False
+    return (
+        api_settings.UNICODE_JSON and api_settings.COMPACT_JSON and api_settings.STRICT_JSON
+    )
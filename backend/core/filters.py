@@ -0,0 +1,45 @@
+from django.utils.dateparse import parse_date
+from rest_framework import serializers
+from rest_framework.filters import BaseFilterBackend
+
+from .search import search_brands
+
+
+class BrandFilterBackend(BaseFilterBackend):
+    """
+    ``?status=revenue,manufacturing``, ``?launch_date_after=YYYY-MM-DD`` and
+    ``?launch_date_before=YYYY-MM-DD`` (both inclusive).
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        if params.get('status'):
+            statuses = [value.strip() for value in params['status'].split(',') if value.strip()]
+            valid = {value for value, _ in queryset.model.STATUS_CHOICES}
+            invalid = sorted(set(statuses) - valid)
+            if invalid:
+                raise serializers.ValidationError({'status': ['Unknown status(es): %s' % ', '.join(invalid)]})
+            queryset = queryset.filter(status__in=statuses)
+
+        for param, lookup in (('launch_date_after', 'launch_date__gte'),
+                              ('launch_date_before', 'launch_date__lte')):
+            if params.get(param):
+                try:
+                    value = parse_date(params[param])
+                except ValueError:
+                    value = None
+                if value is None:
+                    raise serializers.ValidationError({param: ['Expected a YYYY-MM-DD date.']})
+                queryset = queryset.filter(**{lookup: value})
+        return queryset
+
+
+class BrandSearchFilter(BaseFilterBackend):
+    """``?search=`` over name, one-liner and description (FTS5 on SQLite)."""
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        term = request.query_params.get(self.search_param, '').strip()
+        if not term:
+            return queryset
+        return search_brands(queryset, term)
@@ -0,0 +1,291 @@
+"""
+Responsive image derivatives for the Brand/Founder ImageFields.
+
+Derivatives are keyed by the SHA-256 of the source file and written under
+``MEDIA_ROOT/IMAGE_DERIVATIVES_DIR/<hh>/<hash>/<encoder>/``, together with a
+``manifest.json`` describing every generated variant. Identical uploads (the
+seeded placeholder heroes, for instance) therefore share one set of files, and
+regenerating an unchanged source is a no-op.
+
+``<encoder>`` hashes everything else that decides a variant's bytes (the save
+options, the resampling, the Pillow build), so a file name only ever holds one
+content and can be cached as immutable (see core.media). Changing any of them
+starts a new set; collect_media_garbage removes the old one.
+"""
+import base64
+import hashlib
+import io
+import json
+import os
+from functools import lru_cache
+from importlib.metadata import version
+from pathlib import Path
+
+from django.conf import settings
+
+from .files import write_atomic
+from .models import Brand, Founder
+
+IMAGE_FIELDS = (
+    (Brand, ('logo', 'hero_image')),
+    (Founder, ('photo',)),
+)
+
+MANIFEST_NAME = 'manifest.json'
+
+MIME_TYPES = {
+    'avif': 'image/avif',
+    'webp': 'image/webp',
+    'jpeg': 'image/jpeg',
+    'png': 'image/png',
+}
+
+SAVE_OPTIONS = {
+    'avif': {'quality': 60, 'speed': 6},
+    'webp': {'quality': 80, 'method': 4},
+    'jpeg': {'quality': 82, 'optimize': True, 'progressive': True},
+    'png': {'optimize': True},
+}
+
+EXTENSIONS = {'avif': 'avif', 'webp': 'webp', 'jpeg': 'jpg', 'png': 'png'}
+
+# Bump when process_source() changes how it resizes or encodes.
+ENCODER_REVISION = 1
+
+
+def available_formats():
+    """Modern formats from IMAGE_DERIVATIVE_FORMATS this Pillow build can encode."""
+    # Pillow is imported where images are processed: API workers only read
+    # manifests and should not pay for it at startup.
+    from PIL import features
+
+    return [fmt for fmt in settings.IMAGE_DERIVATIVE_FORMATS if features.check(fmt)]
+
+
+def widths_for(field_name):
+    return settings.IMAGE_DERIVATIVE_WIDTHS.get(field_name, settings.IMAGE_DERIVATIVE_WIDTHS['default'])
+
+
+@lru_cache(maxsize=1024)
+def _digest(path, size, mtime_ns):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def source_digest(path):
+    st = os.stat(path)
+    return _digest(str(path), st.st_size, st.st_mtime_ns)
+
+
+@lru_cache(maxsize=1)
+def encoder_version():
+    """12 hex digits identifying the encoder settings, see the module docstring."""
+    # The package metadata, so API workers don't import Pillow for it.
+    key = json.dumps([ENCODER_REVISION, version('pillow'), SAVE_OPTIONS], sort_keys=True)
+    return hashlib.sha256(key.encode()).hexdigest()[:12]
+
+
+def derivative_root(digest):
+    """The directory holding every derivative set of a source."""
+    return Path(settings.MEDIA_ROOT) / settings.IMAGE_DERIVATIVES_DIR / digest[:2] / digest
+
+
+def derivative_dir(digest):
+    return derivative_root(digest) / encoder_version()
+
+
+def load_manifest(digest):
+    try:
+        with open(derivative_dir(digest) / MANIFEST_NAME) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _fallback_format(image):
+    has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+    return 'png' if has_alpha else 'jpeg'
+
+
+def _prepare(image, fmt):
+    if fmt == 'jpeg':
+        return image.convert('RGB')
+    if image.mode not in ('RGB', 'RGBA'):
+        return image.convert('RGBA' if 'A' in image.mode or 'transparency' in image.info else 'RGB')
+    return image
+
+
+def generate_derivatives(source_path, widths, formats=None, force=False):
+    """
+    Generate every (width, format) variant of ``source_path`` and return the
+    manifest. Existing manifests are reused unless ``force`` is set.
+    """
+    return process_source(source_path, widths, formats, force)[0]
+
+
+def process_source(source_path, widths, formats=None, force=False):
+    """
+    Like generate_derivatives() but return ``(manifest, generated)``, where
+    ``generated`` is False when an up-to-date manifest was reused.
+
+    This is a plain function of a file path so it can run in a worker process.
+    """
+    digest = source_digest(source_path)
+    if not force:
+        manifest = load_manifest(digest)
+        if manifest is not None:
+            return manifest, False
+
+    if formats is None:
+        formats = available_formats()
+    out_dir = derivative_dir(digest)
+    rel_dir = out_dir.relative_to(settings.MEDIA_ROOT).as_posix()
+
+    from PIL import Image, ImageOps
+
+    with Image.open(source_path) as source:
+        source = ImageOps.exif_transpose(source)
+        src_width, src_height = source.size
+        formats = list(formats) + [_fallback_format(source)]
+        # Never upscale; the source width itself is the largest variant.
+        targets = sorted({w for w in widths if w < src_width} | {min(src_width, max(widths))})
+
+        variants = []
+        for width in targets:
+            height = max(1, round(src_height * width / src_width))
+            resized = source if width == src_width else source.resize(
+                (width, height), Image.LANCZOS, reducing_gap=3.0,
+            )
+            for fmt in formats:
+                filename = '%d.%s' % (width, EXTENSIONS[fmt])
+                out_path = out_dir / filename
+                out_path.parent.mkdir(parents=True, exist_ok=True)
+                _prepare(resized, fmt).save(out_path, format=fmt.upper(), **SAVE_OPTIONS[fmt])
+                variants.append({
+                    'width': width,
+                    'height': height,
+                    'format': fmt,
+                    'file': '%s/%s' % (rel_dir, filename),
+                })
+
+    manifest = {
+        'digest': digest,
+        'width': src_width,
+        'height': src_height,
+        'variants': variants,
+    }
+    # The manifest is written last: its presence marks a complete set.
+    write_atomic(out_dir / MANIFEST_NAME, json.dumps(manifest).encode())
+    return manifest, True
+
+
+def make_placeholder(fileobj):
+    """
+    Return ``(data_uri, width, height)`` for an image file: a tiny blurred-up
+    WebP thumbnail (LQIP) plus the intrinsic size of the oriented image.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(fileobj) as image:
+        image = ImageOps.exif_transpose(image)
+        width, height = image.size
+        has_alpha = _fallback_format(image) == 'png'
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+        image.thumbnail((settings.IMAGE_PLACEHOLDER_SIZE,) * 2, Image.BILINEAR)
+        buf = io.BytesIO()
+        image.save(buf, format='WEBP', quality=40)
+    data_uri = 'data:image/webp;base64,' + base64.b64encode(buf.getvalue()).decode('ascii')
+    return data_uri, width, height
+
+
+def update_placeholder(instance, field_name):
+    """Set ``<field>_placeholder/_width/_height`` on ``instance`` from its image."""
+    fieldfile = getattr(instance, field_name)
+    placeholder, width, height = '', None, None
+    if fieldfile:
+        try:
+            fieldfile.open('rb')
+            try:
+                placeholder, width, height = make_placeholder(fieldfile)
+            finally:
+                # Pending uploads are still to be written by the storage.
+                if fieldfile._committed:
+                    fieldfile.close()
+                else:
+                    fieldfile.seek(0)
+        except (OSError, ValueError):
+            # Missing or undecodable files leave the placeholder blank.
+            pass
+    setattr(instance, field_name + '_placeholder', placeholder)
+    setattr(instance, field_name + '_width', width)
+    setattr(instance, field_name + '_height', height)
+
+
+def placeholder_fields(field_name):
+    return [field_name + suffix for suffix in ('_placeholder', '_width', '_height')]
+
+
+def fieldfile_path(fieldfile):
+    if not fieldfile:
+        return None
+    try:
+        path = fieldfile.storage.path(fieldfile.name)
+    except NotImplementedError:
+        return None
+    return path if os.path.exists(path) else None
+
+
+def generate_for_fieldfile(fieldfile, field_name, force=False):
+    """``(manifest, generated)`` as for process_source(), or None if the file is missing."""
+    path = fieldfile_path(fieldfile)
+    if path is None:
+        return None
+    return process_source(path, widths_for(field_name), force=force)
+
+
+def get_derivatives(fieldfile):
+    path = fieldfile_path(fieldfile)
+    if path is None:
+        return None
+    return load_manifest(source_digest(path))
+
+
+def build_srcset(manifest, request=None):
+    """
+    Turn a manifest into a ``<picture>``-friendly structure::
+
+        {"width": 1024, "height": 768,
+         "sources": [{"type": "image/avif", "srcset": "…/640.avif 640w, …"},
+                     ...,
+                     {"type": "image/jpeg", "srcset": "…"}]}
+
+    Sources are ordered best format first; the last one is the universally
+    supported fallback.
+    """
+    by_format = {}
+    for variant in manifest['variants']:
+        url = settings.MEDIA_URL + variant['file']
+        if request is not None:
+            url = request.build_absolute_uri(url)
+        by_format.setdefault(variant['format'], []).append('%s %dw' % (url, variant['width']))
+    return {
+        'width': manifest['width'],
+        'height': manifest['height'],
+        'sources': [
+            {'type': MIME_TYPES[fmt], 'srcset': ', '.join(entries)}
+            for fmt, entries in by_format.items()
+        ],
+    }
+
+
+def iter_image_fieldfiles():
+    """Yield ``(instance, field name, fieldfile)`` for every stored image."""
+    for model, field_names in IMAGE_FIELDS:
+        for instance in model.objects.only(*field_names):
+            for name in field_names:
+                fieldfile = getattr(instance, name)
+                if fieldfile:
+                    yield instance, name, fieldfile
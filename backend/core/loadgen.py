@@ -0,0 +1,206 @@
+"""
+Load generation helpers shared by the loadtest and benchmark_api commands.
+
+``run_load`` drives many concurrent HTTP/1.1 keep-alive clients from a single
+asyncio loop; ``start_gunicorn`` launches one of the gunicorn profiles on a
+free local port.
+"""
+import asyncio
+import os
+import resource
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+from django.conf import settings
+
+SERVER_PROFILES = {
+    'wsgi': ('gunicorn_config.py', 'config.wsgi:application'),
+    'asgi': ('gunicorn_asgi_config.py', 'config.asgi:application'),
+}
+
+
+def raise_open_file_limit(needed):
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < needed:
+        target = needed if hard == resource.RLIM_INFINITY else min(needed, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+        soft = target
+    return soft
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = []
+        self.statuses = Counter()
+        self.errors = Counter()
+        self.connects = 0
+        self.reconnects = 0
+        self.bytes = 0
+
+
+async def read_response(reader):
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionResetError('connection closed')
+    status = int(status_line.split()[1])
+    length = None
+    keep_alive = True
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        name = name.strip().lower()
+        value = value.strip()
+        if name == 'content-length':
+            length = int(value)
+        elif name == 'connection' and value.lower() == 'close':
+            keep_alive = False
+    if length is None:
+        body = await reader.read()
+        keep_alive = False
+    else:
+        body = await reader.readexactly(length)
+    return status, len(body), keep_alive
+
+
+async def client(host, port, request, deadline, stats, timeout):
+    reader = writer = None
+    while time.monotonic() < deadline:
+        reused = writer is not None
+        try:
+            if writer is None:
+                reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+                stats.connects += 1
+            started = time.perf_counter()
+            writer.write(request)
+            status, size, keep_alive = await asyncio.wait_for(read_response(reader), timeout)
+            stats.latencies.append(time.perf_counter() - started)
+            stats.statuses[status] += 1
+            stats.bytes += size
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError, IndexError) as exc:
+            keep_alive = False
+            if reused and isinstance(exc, (ConnectionResetError, BrokenPipeError, asyncio.IncompleteReadError)):
+                # The server closed an idle keep-alive connection (e.g. a
+                # recycled worker); like any HTTP client, retry on a new one.
+                stats.reconnects += 1
+            else:
+                stats.errors[type(exc).__name__] += 1
+                await asyncio.sleep(0.05)
+        if not keep_alive and writer is not None:
+            writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def run_load(url, connections, duration, timeout):
+    parts = urlsplit(url)
+    host = parts.hostname
+    port = parts.port or 80
+    path = parts.path or '/'
+    if parts.query:
+        path += '?' + parts.query
+    request = (
+        f'GET {path} HTTP/1.1\r\nHost: {parts.netloc}\r\n'
+        'Accept: application/json\r\nConnection: keep-alive\r\n\r\n'
+    ).encode()
+    stats = Stats()
+    started = time.monotonic()
+    deadline = started + duration
+    await asyncio.gather(*(
+        client(host, port, request, deadline, stats, timeout) for _ in range(connections)
+    ))
+    return stats, time.monotonic() - started
+
+
+def start_gunicorn(profile, env=None, workers=None):
+    """Start gunicorn with one of SERVER_PROFILES; return ``(process, port)`` once it listens."""
+    config, app = SERVER_PROFILES[profile]
+    port = free_port()
+    command = [
+        sys.executable, '-m', 'gunicorn', '-c', config,
+        '--bind', f'127.0.0.1:{port}', '--backlog', '4096',
+    ]
+    if workers:
+        command += ['--workers', str(workers)]
+    process = subprocess.Popen(
+        command + [app],
+        cwd=settings.BASE_DIR,
+        env={**os.environ, **(env or {})},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'gunicorn exited with status {process.returncode}')
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return process, port
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError('gunicorn did not start listening within 30s')
+
+
+def _proc_status(pid, field):
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1])
+    except (FileNotFoundError, ProcessLookupError):
+        pass
+    return None
+
+
+def process_tree(pid):
+    """``pid`` and its direct children (gunicorn master and workers). Linux only."""
+    pids = [pid]
+    for entry in os.listdir('/proc'):
+        if entry.isdigit() and _proc_status(entry, 'PPid') == pid:
+            pids.append(int(entry))
+    return pids
+
+
+def peak_rss_kib(pids):
+    """Sum of the peak resident set size (VmHWM) of ``pids``, in KiB."""
+    return sum(_proc_status(pid, 'VmHWM') or 0 for pid in pids)
+
+
+def summarize(stats, elapsed):
+    latencies = sorted(stats.latencies)
+    return {
+        'requests': len(latencies),
+        'duration': round(elapsed, 2),
+        'requests_per_second': round(len(latencies) / elapsed, 1),
+        'latency_ms': {
+            'p50': round(percentile(latencies, 0.50) * 1000, 2),
+            'p95': round(percentile(latencies, 0.95) * 1000, 2),
+            'p99': round(percentile(latencies, 0.99) * 1000, 2),
+            'max': round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        },
+        'statuses': {str(status): count for status, count in stats.statuses.items()},
+        'errors': dict(stats.errors),
+        'connects': stats.connects,
+        'reconnects': stats.reconnects,
+        'megabytes': round(stats.bytes / 1024 / 1024, 1),
+    }
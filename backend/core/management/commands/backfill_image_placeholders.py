@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from core.changes import CHANGE_FIELDS, stamp
+from core.images import IMAGE_FIELDS, placeholder_fields, update_placeholder
+from core.signals import content_changed
+
+class Command(BaseCommand):
+    help = 'Computes LQIP placeholders and intrinsic sizes for stored brand and founder images'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Recompute placeholders that are already set',
+        )
+        parser.add_argument('--batch-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        for model, field_names in IMAGE_FIELDS:
+            fields = [f for name in field_names for f in placeholder_fields(name)]
+            changed = []
+            for instance in model.objects.only('pk', *field_names, *fields).iterator():
+                dirty = False
+                for name in field_names:
+                    if options['force'] or not getattr(instance, name + '_placeholder'):
+                        update_placeholder(instance, name)
+                        dirty = True
+                if dirty:
+                    changed.append(instance)
+
+            # bulk_update skips save signals, so no derivative regeneration or
+            # per-row invalidation; the model is invalidated once instead.
+            with transaction.atomic():
+                stamp(changed)
+                model.objects.bulk_update(changed, fields + CHANGE_FIELDS, batch_size=options['batch_size'])
+                if changed:
+                    content_changed(model)
+            self.stdout.write(f"{model.__name__}: updated {len(changed)} rows")
+
+        self.stdout.write(self.style.SUCCESS('Placeholders backfilled'))
@@ -0,0 +1,282 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import ExitStack
+from pathlib import Path
+from urllib.request import urlopen
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from django.utils import timezone
+
+from core.cache import get_api_cache
+from core.loadgen import (
+    SERVER_PROFILES, peak_rss_kib, percentile, process_tree, raise_open_file_limit,
+    run_load, start_gunicorn, summarize,
+)
+
+# Numbers allowed to move in the bad direction by more than --tolerance.
+GATED_METRICS = (
+    ('requests_per_second', -1),
+    ('p95_ms', 1),
+    ('peak_rss_mib', 1),
+)
+
+
+def result_key(result):
+    return (result['size'], result['mode'], result['endpoint'], result['cache'])
+
+
+def parse_prometheus(text, name):
+    """Return ``{route: value}`` for the metric ``name``, summed over method/status."""
+    values = {}
+    for line in text.splitlines():
+        if not line.startswith(name + '{'):
+            continue
+        labels, value = line[len(name) + 1:].rsplit('} ', 1)
+        route = labels.split('route="', 1)[1].split('"', 1)[0]
+        values[route] = values.get(route, 0) + float(value)
+    return values
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks /api/brands/ and /api/founders/ on seeded synthetic datasets, '
+        'in-process and under gunicorn, and gates on a JSON baseline'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[100, 1000, 10000],
+            help='Synthetic brands and founders per dataset (default: 100 1000 10000)',
+        )
+        parser.add_argument('--endpoints', nargs='+', default=['/api/brands/', '/api/founders/'])
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Sequential requests per endpoint and cache mode in the in-process run',
+        )
+        parser.add_argument(
+            '--gunicorn', nargs='*', choices=sorted(SERVER_PROFILES), default=[],
+            help='Also load-test these gunicorn profiles (e.g. --gunicorn wsgi asgi)',
+        )
+        parser.add_argument('--workers', type=int, help='gunicorn workers (default: the profile\'s own)')
+        parser.add_argument('--connections', type=int, default=50, help='Concurrent clients for gunicorn runs')
+        parser.add_argument('--duration', type=float, default=10, help='Seconds per gunicorn run')
+        parser.add_argument('--output', help='Write the results to this JSON file')
+        parser.add_argument('--baseline', help='Compare against this results file and fail on regressions')
+        parser.add_argument(
+            '--update-baseline', action='store_true',
+            help='Write the results to --baseline instead of comparing',
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=0.15,
+            help='Allowed relative regression before the gate fails (default: 0.15)',
+        )
+        # Internal: measure the current database in this process and print JSON.
+        parser.add_argument('--in-process', action='store_true', help=argparse.SUPPRESS)
+
+    # In-process measurement, run in a child process pointed at the dataset.
+
+    def measure_in_process(self, endpoints, requests):
+        client = Client(HTTP_HOST='localhost')
+        results = []
+        for endpoint in endpoints:
+            for cache in ('cold', 'warm'):
+                get_api_cache().clear()
+                client.get(endpoint)
+                latencies = []
+                queries = 0
+                for _ in range(requests):
+                    if cache == 'cold':
+                        get_api_cache().clear()
+                    with ExitStack() as stack:
+                        captured = [
+                            stack.enter_context(CaptureQueriesContext(connection))
+                            for connection in connections.all()
+                        ]
+                        started = time.perf_counter()
+                        response = client.get(endpoint)
+                        latencies.append(time.perf_counter() - started)
+                    if response.status_code != 200:
+                        raise CommandError(f'{endpoint} returned HTTP {response.status_code}')
+                    queries += sum(len(context) for context in captured)
+                latencies.sort()
+                results.append({
+                    'endpoint': endpoint,
+                    'cache': cache,
+                    'requests': requests,
+                    'requests_per_second': round(requests / sum(latencies), 1),
+                    'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+                    'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+                    'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+                    'queries_per_request': round(queries / requests, 2),
+                    'response_bytes': len(response.content),
+                })
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        for result in results:
+            result['peak_rss_mib'] = round(peak / 1024, 1)
+        return results
+
+    # Orchestration.
+
+    def manage(self, env, *args, capture=False):
+        completed = subprocess.run(
+            [sys.executable, str(Path(settings.BASE_DIR) / 'manage.py'), *args],
+            env={**os.environ, **env},
+            stdout=subprocess.PIPE if capture else subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+        if completed.returncode:
+            raise CommandError(f'manage.py {args[0]} failed:\n{completed.stderr}')
+        return completed.stdout
+
+    def measure_gunicorn(self, profile, env, endpoints, options):
+        try:
+            process, port = start_gunicorn(profile, env=env, workers=options['workers'])
+        except RuntimeError as exc:
+            raise CommandError(str(exc))
+        results = []
+        try:
+            for endpoint in endpoints:
+                url = f'http://localhost:{port}{endpoint}'
+                asyncio.run(run_load(url, 4, 1, 30))
+                stats, elapsed = asyncio.run(run_load(url, options['connections'], options['duration'], 30))
+                summary = summarize(stats, elapsed)
+                if summary['errors'] or set(summary['statuses']) != {'200'}:
+                    raise CommandError(f'{profile} {endpoint}: {summary["statuses"]} {summary["errors"]}')
+                results.append({
+                    'endpoint': endpoint,
+                    'cache': 'warm',
+                    'requests': summary['requests'],
+                    'requests_per_second': summary['requests_per_second'],
+                    'p50_ms': summary['latency_ms']['p50'],
+                    'p95_ms': summary['latency_ms']['p95'],
+                    'p99_ms': summary['latency_ms']['p99'],
+                })
+            # Query counts come from the server's own metrics (see core.metrics).
+            time.sleep(settings.METRICS_FLUSH_INTERVAL * 1.5)
+            with urlopen(f'http://localhost:{port}/api/metrics/') as response:
+                metrics = response.read().decode()
+            queries = parse_prometheus(metrics, 'api_db_queries_total')
+            counts = parse_prometheus(metrics, 'api_request_duration_seconds_count')
+            rss = peak_rss_kib(process_tree(process.pid))
+        finally:
+            process.terminate()
+            process.wait(10)
+        for result in results:
+            route = resolve(result['endpoint']).view_name
+            result['queries_per_request'] = round(queries.get(route, 0) / max(counts.get(route, 0), 1), 2)
+            result['peak_rss_mib'] = round(rss / 1024, 1)
+        return results
+
+    def run_benchmarks(self, options, workdir):
+        results = []
+        for size in sorted(options['sizes']):
+            env = {
+                'SQLITE_PATH': str(workdir / f'db-{size}.sqlite3'),
+                'CACHE_ROOT': str(workdir / f'cache-{size}'),
+                # All load comes from one address; measure the API, not the throttle.
+                'API_THROTTLE_ANON_RATE': '',
+            }
+            self.stdout.write(f'Seeding {size} brands and founders...')
+            self.manage(env, 'migrate', '--noinput')
+            self.manage(
+                env, 'seed_data', '--upsert',
+                '--synthetic-brands', str(size), '--synthetic-founders', str(size),
+            )
+
+            output = self.manage(
+                env, 'benchmark_api', '--in-process',
+                '--endpoints', *options['endpoints'], '--requests', str(options['requests']),
+                capture=True,
+            )
+            for result in json.loads(output):
+                results.append(self.report(dict(result, size=size, mode='in-process')))
+
+            for profile in options['gunicorn']:
+                for result in self.measure_gunicorn(profile, env, options['endpoints'], options):
+                    results.append(self.report(dict(result, size=size, mode=f'gunicorn-{profile}')))
+        return results
+
+    def report(self, result):
+        self.stdout.write(
+            f"  {result['size']:>6} {result['mode']:<15} {result['endpoint']:<16} {result['cache']:<5} "
+            f"{result['requests_per_second']:>9.1f} req/s  p50 {result['p50_ms']:>8.2f}  "
+            f"p95 {result['p95_ms']:>8.2f}  p99 {result['p99_ms']:>8.2f} ms  "
+            f"{result['queries_per_request']:>5} q/req  {result['peak_rss_mib']:>6} MiB"
+        )
+        return result
+
+    def compare(self, results, baseline, tolerance):
+        previous = {result_key(result): result for result in baseline['results']}
+        regressions = []
+        for result in results:
+            old = previous.get(result_key(result))
+            if old is None:
+                continue
+            label = '%s %s %s %s' % result_key(result)
+            for metric, direction in GATED_METRICS:
+                before, after = old[metric], result[metric]
+                if before and (after - before) * direction > tolerance * before:
+                    regressions.append(f'{label}: {metric} {before} -> {after}')
+            # Query counts are deterministic, any increase is a regression.
+            if result['queries_per_request'] > old['queries_per_request']:
+                regressions.append(
+                    f"{label}: queries_per_request {old['queries_per_request']} -> "
+                    f"{result['queries_per_request']}"
+                )
+        return regressions
+
+    def handle(self, *args, **options):
+        if options['in_process']:
+            results = self.measure_in_process(options['endpoints'], options['requests'])
+            self.stdout.write(json.dumps(results))
+            return
+
+        if options['update_baseline'] and not options['baseline']:
+            raise CommandError('--update-baseline needs --baseline')
+        if options['gunicorn']:
+            raise_open_file_limit(options['connections'] * 2 + 256)
+
+        with tempfile.TemporaryDirectory(prefix='benchmark-api-') as workdir:
+            results = self.run_benchmarks(options, Path(workdir))
+
+        document = {
+            'created': timezone.now().isoformat(),
+            'environment': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'cpus': os.cpu_count(),
+                'machine': platform.machine(),
+            },
+            'options': {
+                key: options[key]
+                for key in ('sizes', 'endpoints', 'requests', 'gunicorn', 'workers', 'connections', 'duration')
+            },
+            'results': results,
+        }
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(document, indent=2) + '\n')
+
+        baseline_path = options['baseline'] and Path(options['baseline'])
+        if options['update_baseline']:
+            baseline_path.write_text(json.dumps(document, indent=2) + '\n')
+            self.stdout.write(f'Baseline written to {baseline_path}')
+        elif baseline_path:
+            regressions = self.compare(results, json.loads(baseline_path.read_text()), options['tolerance'])
+            if regressions:
+                raise CommandError('Regressions against %s:\n  %s' % (baseline_path, '\n  '.join(regressions)))
+            self.stdout.write(self.style.SUCCESS(f'No regressions against {baseline_path}'))
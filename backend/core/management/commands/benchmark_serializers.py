@@ -0,0 +1,80 @@
+import io
+import statistics
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from core.fastpath import compile_serializer
+from core.models import Brand
+from core.serializers import BrandSerializer
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compares DRF serialization of the brand list against the compiled fast path'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows', type=int, nargs='+', default=[10, 1000, 100000],
+            help='Dataset sizes to benchmark (default: 10 1000 100000)',
+        )
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per path')
+
+    def make_request(self):
+        request = Request(RequestFactory().get('/api/brands/', HTTP_HOST='localhost'))
+        request.accepted_renderer = JSONRenderer()
+        request.accepted_media_type = 'application/json'
+        return request
+
+    def time_it(self, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func()
+            timings.append(time.perf_counter() - started)
+        return statistics.median(timings), result
+
+    def bench(self, rows, repeat):
+        request = self.make_request()
+        context = {'request': request}
+        queryset = Brand.objects.all()[:rows]
+
+        def drf():
+            return JSONRenderer().render(BrandSerializer(queryset, many=True, context=context).data)
+
+        def fast():
+            compiled = compile_serializer(BrandSerializer(context=context))
+            return compiled.render(queryset.values(*compiled.columns))
+
+        drf_time, drf_body = self.time_it(drf, repeat)
+        fast_time, fast_body = self.time_it(fast, repeat)
+        if drf_body != fast_body:
+            raise CommandError(f'Fast path output differs from DRF at {rows} rows')
+        self.stdout.write(
+            f"{rows:>8} rows  drf {drf_time * 1000:9.1f} ms  fast {fast_time * 1000:9.1f} ms  "
+            f"speedup {drf_time / fast_time:5.1f}x  ({len(drf_body) / 1024:.0f} KiB, identical)"
+        )
+
+    def handle(self, *args, **options):
+        if compile_serializer(BrandSerializer(context={'request': self.make_request()})) is None:
+            raise CommandError('BrandSerializer cannot be compiled')
+        largest = max(options['rows'])
+        try:
+            # The synthetic rows only exist inside this transaction.
+            with transaction.atomic():
+                missing = largest - Brand.objects.count()
+                if missing > 0:
+                    self.stdout.write(f'Seeding {missing} synthetic brands (rolled back afterwards)...')
+                    call_command('seed_data', upsert=True, synthetic_brands=missing, stdout=io.StringIO())
+                for rows in sorted(options['rows']):
+                    self.bench(rows, options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
@@ -0,0 +1,124 @@
+import os
+import shutil
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from core.bulk import bulk_save
+from core.images import IMAGE_FIELDS, derivative_dir, derivative_root, source_digest
+from core.storage import is_content_addressed
+
+
+class Command(BaseCommand):
+    help = 'Deletes uploaded images and image derivatives that no Brand or Founder references'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be deleted')
+        parser.add_argument(
+            '--min-age', type=int, default=3600,
+            help='Keep files younger than this many seconds; they may belong to an upload '
+                 'whose row is not committed yet (default: 3600)',
+        )
+        parser.add_argument(
+            '--rehash', action='store_true',
+            help='First move files stored under legacy names to content-addressed names',
+        )
+
+    def rehash(self, dry_run):
+        """Re-store legacy names through the content-addressed storage and repoint rows."""
+        moved = 0
+        with transaction.atomic():
+            for model, field_names in IMAGE_FIELDS:
+                changed = []
+                for instance in model.objects.only('pk', *field_names).iterator():
+                    dirty = False
+                    for name in field_names:
+                        fieldfile = getattr(instance, name)
+                        if not fieldfile or is_content_addressed(fieldfile.name):
+                            continue
+                        if not default_storage.exists(fieldfile.name):
+                            continue
+                        if not dry_run:
+                            with default_storage.open(fieldfile.name, 'rb') as f:
+                                fieldfile.name = default_storage.save(fieldfile.name, f)
+                        dirty = True
+                        moved += 1
+                    if dirty:
+                        changed.append(instance)
+                if changed and not dry_run:
+                    # Same bytes, so placeholders and derivatives stay valid.
+                    bulk_save(model, changed, field_names)
+        self.stdout.write(f'Re-stored {moved} files under content-addressed names')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        if options['rehash']:
+            self.rehash(dry_run)
+
+        media_root = Path(settings.MEDIA_ROOT)
+        cutoff = time.time() - options['min_age']
+        referenced = set()
+        upload_dirs = set()
+        for model, field_names in IMAGE_FIELDS:
+            for name in field_names:
+                upload_dirs.add(model._meta.get_field(name).upload_to)
+            for row in model.objects.values_list(*field_names):
+                referenced.update(value for value in row if value)
+
+        removed, freed = 0, 0
+        for upload_to in sorted(upload_dirs):
+            for path in sorted((media_root / upload_to).rglob('*')):
+                if not path.is_file():
+                    continue
+                name = path.relative_to(media_root).as_posix()
+                stat = path.stat()
+                if name in referenced or stat.st_mtime > cutoff:
+                    continue
+                self.stdout.write(f'Orphan {name}')
+                removed += 1
+                freed += stat.st_size
+                if not dry_run:
+                    path.unlink()
+
+        # Derivatives are keyed by the digest of their source file, and only
+        # the set of the current encoder is read.
+        digests = set()
+        for name in referenced:
+            if default_storage.exists(name):
+                digests.add(source_digest(default_storage.path(name)))
+        derivatives_root = media_root / settings.IMAGE_DERIVATIVES_DIR
+        for directory in sorted(derivatives_root.glob('*/*')):
+            if not directory.is_dir() or directory != derivative_root(directory.name):
+                continue
+            if directory.name in digests:
+                current = derivative_dir(directory.name)
+                stale = [path for path in sorted(directory.iterdir()) if path != current]
+            else:
+                stale = [directory]
+            for path in stale:
+                if path.stat().st_mtime > cutoff:
+                    continue
+                files = list(path.rglob('*')) if path.is_dir() else [path]
+                self.stdout.write(f'Orphan {path.relative_to(media_root).as_posix()}{"/" if path.is_dir() else ""}')
+                removed += 1
+                freed += sum(f.stat().st_size for f in files if f.is_file())
+                if not dry_run:
+                    if path.is_dir():
+                        shutil.rmtree(path)
+                    else:
+                        path.unlink()
+
+        if not dry_run:
+            # Drop fan-out directories emptied above.
+            for upload_to in list(upload_dirs) + [settings.IMAGE_DERIVATIVES_DIR]:
+                for directory, _, _ in sorted(os.walk(media_root / upload_to), reverse=True):
+                    if Path(directory) != media_root / upload_to and not os.listdir(directory):
+                        os.rmdir(directory)
+
+        verb = 'Would free' if dry_run else 'Freed'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {freed / 1024 / 1024:.1f} MiB in {removed} orphaned files and derivative sets'
+        ))
@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from core.export import export_static_api
+
+class Command(BaseCommand):
+    help = 'Exports the brands/founders API as content-hashed static JSON files'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', default=settings.STATIC_EXPORT_ROOT,
+            help='Directory to write the export to (default: STATIC_EXPORT_ROOT)',
+        )
+        parser.add_argument(
+            '--base-url', default=settings.STATIC_EXPORT_BASE_URL,
+            help='Public base URL used for absolute media URLs (default: STATIC_EXPORT_BASE_URL)',
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Rewrite every file even if its content hash is unchanged',
+        )
+
+    def handle(self, *args, **options):
+        written, unchanged, removed = export_static_api(
+            options['output'], options['base_url'], force=options['force'],
+        )
+        for url in written:
+            self.stdout.write(f"Wrote {url}")
+        for url in removed:
+            self.stdout.write(f"Removed {url}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Exported to {options['output']}: {len(written)} written, "
+            f"{len(unchanged)} unchanged, {len(removed)} removed"
+        ))
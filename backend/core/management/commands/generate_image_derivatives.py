@@ -0,0 +1,114 @@
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from core.changes import touch
+from core.images import (
+    available_formats, fieldfile_path, iter_image_fieldfiles,
+    process_source, widths_for,
+)
+from core.signals import content_changed
+
+class Command(BaseCommand):
+    help = 'Generates responsive image derivatives for brand and founder images'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Regenerate derivatives even if they already exist',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help='Number of worker processes (default: CPU count, 1 runs inline)',
+        )
+        parser.add_argument(
+            '--max-pending', type=int, default=None,
+            help='Maximum queued sources at once (default: 2 x workers)',
+        )
+
+    def collect_sources(self):
+        # Several rows may share one file; widths are merged so it is decoded once.
+        sources, rows = {}, {}
+        for instance, name, fieldfile in iter_image_fieldfiles():
+            path = fieldfile_path(fieldfile)
+            if path is None:
+                self.stdout.write(self.style.WARNING(f"Missing source for {instance} {name}: {fieldfile.name}"))
+                continue
+            sources.setdefault(path, set()).update(widths_for(name))
+            rows.setdefault(path, set()).add((type(instance), instance.pk))
+        return sources, rows
+
+    def handle(self, *args, **options):
+        sources, rows = self.collect_sources()
+        touched = {}
+        formats = available_formats()
+        force = options['force']
+        workers = max(1, options['workers'])
+        max_pending = options['max_pending'] or workers * 2
+        total = len(sources)
+        stats = {'done': 0, 'generated': 0, 'skipped': 0, 'failed': 0, 'bytes': 0}
+        started = time.monotonic()
+
+        def report(path, result=None, error=None):
+            stats['done'] += 1
+            if error is not None:
+                stats['failed'] += 1
+                status = self.style.ERROR(f"failed: {error}")
+            elif result[1]:
+                stats['generated'] += 1
+                for model, pk in rows[path]:
+                    touched.setdefault(model, set()).add(pk)
+                stats['bytes'] += os.path.getsize(path)
+                status = f"{len(result[0]['variants'])} variants"
+            else:
+                stats['skipped'] += 1
+                status = 'unchanged'
+            rate = stats['done'] / max(time.monotonic() - started, 1e-9)
+            self.stdout.write(f"[{stats['done']}/{total}] {os.path.basename(path)}: {status} ({rate:.1f} img/s)")
+
+        tasks = iter(sorted(sources.items()))
+        if workers == 1:
+            for path, widths in tasks:
+                try:
+                    report(path, process_source(path, sorted(widths), formats, force))
+                except Exception as exc:
+                    report(path, error=exc)
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as pool:
+                pending = {}
+                while True:
+                    # Keep at most max_pending sources in flight so memory stays
+                    # flat however many images the portfolio grows to.
+                    for path, widths in tasks:
+                        future = pool.submit(process_source, path, sorted(widths), formats, force)
+                        pending[future] = path
+                        if len(pending) >= max_pending:
+                            break
+                    if not pending:
+                        break
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        path = pending.pop(future)
+                        try:
+                            report(path, future.result())
+                        except Exception as exc:
+                            report(path, error=exc)
+
+        if touched:
+            # Serialized payloads embed the srcsets, so cached responses are
+            # stale and the rows changed as far as the change feed goes.
+            with transaction.atomic():
+                for model, pks in touched.items():
+                    touch(model, pks)
+                content_changed(*touched)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {stats['done']} sources in {elapsed:.1f}s with {workers} workers: "
+            f"{stats['generated']} generated, {stats['skipped']} unchanged, {stats['failed']} failed "
+            f"({stats['done'] / max(elapsed, 1e-9):.1f} img/s, "
+            f"{stats['bytes'] / max(elapsed, 1e-9) / 1e6:.1f} MB/s source)"
+        ))
@@ -0,0 +1,64 @@
+import asyncio
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.loadgen import SERVER_PROFILES, raise_open_file_limit, run_load, start_gunicorn, summarize
+
+
+class Command(BaseCommand):
+    help = 'Drives many concurrent keep-alive clients against the API and reports throughput and latency'
+
+    def add_arguments(self, parser):
+        target = parser.add_mutually_exclusive_group(required=True)
+        target.add_argument('--url', help='Benchmark an already running server, e.g. http://localhost:8000/api/brands/')
+        target.add_argument(
+            '--server', choices=sorted(SERVER_PROFILES),
+            help='Start gunicorn with the WSGI or ASGI profile on a free local port and benchmark it',
+        )
+        parser.add_argument('--path', default='/api/brands/', help='Request path when using --server')
+        parser.add_argument('--connections', type=int, default=1000, help='Simultaneous keep-alive clients')
+        parser.add_argument('--duration', type=float, default=15, help='Seconds to run')
+        parser.add_argument('--timeout', type=float, default=30, help='Per-request timeout in seconds')
+        parser.add_argument('--json', dest='json_path', help='Also write the results to this file')
+
+    def handle(self, *args, **options):
+        connections = options['connections']
+        # Each client needs a socket, plus headroom for the server when it runs here.
+        limit = raise_open_file_limit(connections * 2 + 256)
+        if limit < connections + 64:
+            raise CommandError(f'Open file limit is {limit}; too low for {connections} connections')
+
+        process = None
+        url = options['url']
+        if options['server']:
+            try:
+                process, port = start_gunicorn(options['server'])
+            except RuntimeError as exc:
+                raise CommandError(str(exc))
+            url = f'http://localhost:{port}{options["path"]}'
+        try:
+            # A short warm-up so imports and cold caches are not timed.
+            asyncio.run(run_load(url, 4, 1, options['timeout']))
+            stats, elapsed = asyncio.run(
+                run_load(url, connections, options['duration'], options['timeout'])
+            )
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait(10)
+
+        result = {'url': url, 'server': options['server'], 'connections': connections}
+        result.update(summarize(stats, elapsed))
+        latency = result['latency_ms']
+        self.stdout.write(
+            f"{result['server'] or url}: {connections} connections, {result['requests']} requests in "
+            f"{result['duration']}s ({result['requests_per_second']} req/s)\n"
+            f"  latency p50 {latency['p50']} ms  p95 {latency['p95']} ms  "
+            f"p99 {latency['p99']} ms  max {latency['max']} ms\n"
+            f"  statuses {result['statuses']}  errors {result['errors'] or 0}  "
+            f"connects {result['connects']}  reconnects {result['reconnects']}"
+        )
+        if options['json_path']:
+            with open(options['json_path'], 'w') as f:
+                json.dump(result, f, indent=2)
@@ -0,0 +1,198 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter under -X importtime: load the application
+# module, then answer one request, printing wall-clock milestones as JSON.
+BOOTSTRAP = r'''
+import io, json, sys, time
+marks = {'interpreter': time.time()}
+app_module, path, host = sys.argv[1:4]
+if app_module == 'wsgi':
+    from config.wsgi import application
+    marks['application'] = time.time()
+    status = []
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': '', 'SCRIPT_NAME': '',
+        'SERVER_NAME': host, 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1', 'HTTP_HOST': host,
+        'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr, 'wsgi.url_scheme': 'http',
+        'wsgi.version': (1, 0), 'wsgi.multithread': False, 'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    result = application(environ, lambda s, headers, exc_info=None: status.append(s))
+    body = b''.join(result)
+    getattr(result, 'close', lambda: None)()
+    code = int(status[0].split()[0])
+else:
+    import asyncio
+    from config.asgi import application
+    marks['application'] = time.time()
+    messages = []
+    requests = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+
+    async def receive():
+        if requests:
+            return requests.pop()
+        # No disconnect; Django cancels this wait once the response is sent.
+        await asyncio.Future()
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+        'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': b'',
+        'root_path': '', 'headers': [(b'host', host.encode())], 'server': (host, 80),
+        'client': ('127.0.0.1', 0),
+    }
+    asyncio.run(application(scope, receive, send))
+    code = messages[0]['status']
+    body = b''.join(m.get('body', b'') for m in messages[1:])
+marks['response'] = time.time()
+print(json.dumps({'marks': marks, 'status': code, 'bytes': len(body), 'modules': len(sys.modules)}))
+'''
+
+
+def parse_importtime(stderr):
+    """
+    Turn ``-X importtime`` output into a list of ``(depth, module, self_us,
+    cumulative_us)`` rows, in the order the imports finished.
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        stripped = name.lstrip(' ')
+        depth = (len(name) - len(stripped) - 1) // 2
+        rows.append((depth, stripped.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def package_totals(rows):
+    """Self time per top-level package, which adds up to the whole import time."""
+    totals = {}
+    for _, module, self_us, _ in rows:
+        package = module.split('.', 1)[0]
+        totals[package] = totals.get(package, 0) + self_us
+    return sorted(totals.items(), key=lambda item: -item[1])
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures a cold start of the WSGI/ASGI application in a fresh interpreter: '
+        'the import-time tree and the time to the first response'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--app', choices=['wsgi', 'asgi'], default='wsgi')
+        parser.add_argument('--path', default='/api/brands/', help='Request for the first response (default: /api/brands/)')
+        parser.add_argument('--host', default='localhost', help='Host header of that request')
+        parser.add_argument('--repeat', type=int, default=3, help='Cold starts to run; medians are reported (default: 3)')
+        parser.add_argument('--top', type=int, default=20, help='Rows in each table (default: 20)')
+        parser.add_argument(
+            '--depth', type=int, default=1,
+            help='Show the import tree down to this nesting depth (default: 1, direct imports only)',
+        )
+        parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+
+    def cold_start(self, options):
+        started = time.time()
+        completed = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', BOOTSTRAP, options['app'], options['path'], options['host']],
+            cwd=settings.BASE_DIR, capture_output=True, text=True,
+        )
+        if completed.returncode:
+            raise CommandError('Cold start failed:\n%s' % completed.stderr[-4000:])
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        marks = result['marks']
+        return {
+            'interpreter_ms': (marks['interpreter'] - started) * 1000,
+            'application_ms': (marks['application'] - started) * 1000,
+            'first_response_ms': (marks['response'] - started) * 1000,
+            'status': result['status'],
+            'bytes': result['bytes'],
+            'modules': result['modules'],
+            'imports': parse_importtime(completed.stderr),
+        }
+
+    def handle(self, *args, **options):
+        runs = [self.cold_start(options) for _ in range(max(options['repeat'], 1))]
+        # The import tree of the median run by time to first response.
+        median_run = sorted(runs, key=lambda run: run['first_response_ms'])[len(runs) // 2]
+        rows = median_run['imports']
+        top = options['top']
+        summary = {
+            'settings': os.environ['DJANGO_SETTINGS_MODULE'],
+            'app': options['app'],
+            'path': options['path'],
+            'status': median_run['status'],
+            'runs': len(runs),
+            'modules': median_run['modules'],
+        }
+        for key in ('interpreter_ms', 'application_ms', 'first_response_ms'):
+            summary[key] = round(statistics.median(run[key] for run in runs), 1)
+        summary['import_ms'] = round(sum(row[2] for row in rows) / 1000, 1)
+        summary['slowest_modules'] = [
+            {'module': module, 'cumulative_ms': round(cumulative / 1000, 1), 'self_ms': round(self_us / 1000, 1)}
+            for _, module, self_us, cumulative in sorted(rows, key=lambda row: -row[3])[:top]
+        ]
+        summary['packages'] = [
+            {'package': package, 'self_ms': round(self_us / 1000, 1)}
+            for package, self_us in package_totals(rows)[:top]
+        ]
+
+        if options['json']:
+            self.stdout.write(json.dumps(summary, indent=2))
+            return
+
+        self.stdout.write(
+            f"{summary['settings']} {summary['app']}: GET {summary['path']} -> HTTP {summary['status']}, "
+            f"median of {summary['runs']} cold starts"
+        )
+        self.stdout.write(f"  interpreter ready   {summary['interpreter_ms']:>8.1f} ms")
+        self.stdout.write(f"  application loaded  {summary['application_ms']:>8.1f} ms")
+        self.stdout.write(f"  first response      {summary['first_response_ms']:>8.1f} ms")
+        self.stdout.write(f"  {summary['modules']} modules loaded, {summary['import_ms']:.1f} ms importing")
+
+        self.stdout.write('\nImport tree (cumulative / self ms):')
+        for depth, module, self_us, cumulative in self.tree(rows, options['depth'], top):
+            self.stdout.write(f"  {cumulative / 1000:>8.1f} {self_us / 1000:>8.1f}  {'  ' * depth}{module}")
+
+        self.stdout.write('\nSelf time by package:')
+        for item in summary['packages']:
+            self.stdout.write(f"  {item['self_ms']:>8.1f}  {item['package']}")
+
+    def tree(self, rows, max_depth, top):
+        """
+        Rows in parent-before-child order, keeping the ``top`` slowest
+        children of each node down to ``max_depth``.
+        """
+        # importtime prints a module after everything it imported, so a row's
+        # children are the rows one level deeper directly before it.
+        roots, stack = [], []
+        for depth, module, self_us, cumulative in rows:
+            children = []
+            while stack and stack[-1][0][0] > depth:
+                children.insert(0, stack.pop())
+            node = ((depth, module, self_us, cumulative), children)
+            if depth == 0:
+                roots.append(node)
+            else:
+                stack.append(node)
+        ordered = []
+
+        def walk(nodes, level):
+            for row, children in sorted(nodes, key=lambda node: -node[0][3])[:top]:
+                ordered.append(row)
+                if level < max_depth:
+                    walk(children, level + 1)
+
+        walk(roots, 0)
+        return ordered
@@ -1,158 +1,257 @@
-from django.core.management.base import BaseCommand
-from core.models import Brand, Founder
+from django.core.management.base import BaseCommand, CommandError
 from django.core.files import File
+from django.core.files.storage import default_storage
 from django.conf import settings
+from django.db import transaction
+from core.changes import CHANGE_FIELDS, record_reset, stamp, touch_image_rows
+from core.images import IMAGE_FIELDS, make_placeholder, process_source, widths_for
+from core.models import Brand, Founder
+from core.signals import content_changed, per_row_receivers_muted
+import json
 import os
-from datetime import date
+import time
+from datetime import date, timedelta
+
+try:
+    import yaml
+except ImportError:  # PyYAML is only needed for .yaml fixtures
+    yaml = None
+
+DEFAULT_FIXTURE = os.path.join(os.path.dirname(__file__), '..', '..', 'seed', 'landing.json')
+
+
+class MediaImporter:
+    """
+    Copies fixture images into media storage once per source file.
+
+    Every row referencing the same file shares one stored copy and one
+    placeholder computation. The content-addressed default storage (see
+    core.storage) returns the existing name for bytes it already holds, so
+    reseeding never writes another copy.
+    """
+
+    def __init__(self, source_dir, stdout, style):
+        self.source_dir = source_dir
+        self.stdout = stdout
+        self.style = style
+        self.imported = {}
+        # Derivative widths wanted for each stored file, by the fields using it.
+        self.widths = {}
+
+    def get(self, field, relative_path):
+        """Return ``(stored name, placeholder, width, height)`` for a fixture image."""
+        upload_to = field.upload_to
+        key = (upload_to, relative_path)
+        if key not in self.imported:
+            source_path = os.path.join(self.source_dir, relative_path)
+            if not os.path.exists(source_path):
+                self.stdout.write(self.style.WARNING(f"Image file not found: {source_path}"))
+                self.imported[key] = ('', '', None, None)
+            else:
+                name = os.path.join(upload_to, os.path.basename(relative_path))
+                with open(source_path, 'rb') as f:
+                    stored = default_storage.save(name, File(f))
+                self.stdout.write(f"Stored {stored}")
+                with open(source_path, 'rb') as f:
+                    placeholder, width, height = make_placeholder(f)
+                self.imported[key] = (stored, placeholder, width, height)
+        stored = self.imported[key][0]
+        if stored:
+            self.widths.setdefault(stored, set()).update(widths_for(field.name))
+        return self.imported[key]
+
 
 class Command(BaseCommand):
     help = 'Seeds the database with initial data'
 
-    def handle(self, *args, **options):
-        self.stdout.write('Seeding data...')
-        
-        # Clear existing data
-        Brand.objects.all().delete()
-        Founder.objects.all().delete()
-
-        # Create Brands
-        brands_data = [
-            {
-                "name": "Lumina",
-                "one_liner": "Intelligence that illuminates your life.",
-                "description": "Lumina enhances modern living spaces through AI-adaptive lighting solutions that sync with your circadian rhythm.",
-                "launch_date": date(2024, 6, 15),
-                "status": "revenue",
-                "order": 1,
-                "website_url": "https://lumina.example.com",
-                "logo_filename": "lumina.png"
-            },
-            {
-                "name": "Velvet & Oak",
-                "one_liner": "Timeless craftsmanship for the modern estate.",
-                "description": "Velvet & Oak bridges the gap between heritage artistry and contemporary minimalism.",
-                "launch_date": None,
-                "status": "manufacturing",
-                "order": 2,
-                "website_url": "https://velvetandoak.example.com",
-                "logo_filename": "velvet-oak.png"
-            },
-            {
-                "name": "Aura Scent",
-                "one_liner": "Personalized olfactory experiences driven by AI.",
-                "description": "Aura Scent uses advanced machine learning to design fragrances that are uniquely yours.",
-                "launch_date": None,
-                "status": "ideation",
-                "order": 3,
-                "website_url": "",
-                "logo_filename": "aura-scent.png"
-            },
-            {
-                "name": "Urban Harvest",
-                "one_liner": "Farm-to-table, right from your living room.",
-                "description": "Revolutionizing urban nutrition with sleek, automated hydroponic units.",
-                "launch_date": None,
-                "status": "manufacturing",
-                "order": 4,
-                "website_url": "https://urbanharvest.example.com",
-                "logo_filename": "urban-harvest.png"
-            },
-            {
-                "name": "Nova Sleep",
-                "one_liner": "Engineering the perfect night's rest.",
-                "description": "Backed by sleep science, Nova Sleep creates ergonomic mattresses and bedding.",
-                "launch_date": date(2023, 11, 1),
-                "status": "revenue",
-                "order": 5,
-                "website_url": "https://novasleep.example.com",
-                "logo_filename": "nova-sleep.png"
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fixture', default=DEFAULT_FIXTURE,
+            help='JSON or YAML file with "brands" and "founders" lists (default: core/seed/landing.json)',
+        )
+        parser.add_argument(
+            '--media-dir', default=os.path.join(settings.BASE_DIR, '../frontend/public'),
+            help='Directory fixture image paths are relative to (default: frontend/public)',
+        )
+        parser.add_argument(
+            '--upsert', action='store_true',
+            help='Update rows matched by name and insert the rest instead of replacing everything',
+        )
+        parser.add_argument(
+            '--prune', action='store_true',
+            help='With --upsert, delete rows whose name is not in the seed data',
+        )
+        parser.add_argument(
+            '--synthetic-brands', type=int, default=0, metavar='N',
+            help='Additionally generate N synthetic brands (for load testing)',
+        )
+        parser.add_argument(
+            '--synthetic-founders', type=int, default=0, metavar='N',
+            help='Additionally generate N synthetic founders (for load testing)',
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def load_fixture(self, path):
+        with open(path, encoding='utf-8') as f:
+            if path.endswith(('.yaml', '.yml')):
+                if yaml is None:
+                    raise CommandError('PyYAML is required to load YAML fixtures')
+                data = yaml.safe_load(f)
+            else:
+                data = json.load(f)
+        if not isinstance(data, dict):
+            raise CommandError(f'{path}: expected a mapping with "brands" and "founders"')
+        return data.get('brands') or [], data.get('founders') or []
+
+    def synthetic_brands(self, count, templates, start_order):
+        statuses = [value for value, _ in Brand.STATUS_CHOICES]
+        templates = templates or [{'description': 'Synthetic brand', 'logo': '', 'hero_image': ''}]
+        for i in range(count):
+            template = templates[i % len(templates)]
+            yield {
+                **template,
+                'name': f'Synthetic Brand {i + 1:05d}',
+                'one_liner': f"{template.get('one_liner', '')} (#{i + 1})".strip(),
+                'status': statuses[i % len(statuses)],
+                'launch_date': (date(2024, 1, 1) + timedelta(days=i % 730)).isoformat() if i % 2 else None,
+                'website_url': f'https://brand-{i + 1}.example.com',
+                'order': start_order + i + 1,
             }
-        ]
 
-        # Path to frontend public folder where images are stored
-        frontend_brands_path = os.path.join(settings.BASE_DIR, '../frontend/public/brands')
-
-        for data in brands_data:
-            logo_filename = data.pop('logo_filename', None)
-            hero_image_filename = data.pop('hero_image_filename', 'placeholder-brand.jpg')
-            brand = Brand.objects.create(**data)
-            
-            if logo_filename:
-                file_path = os.path.join(frontend_brands_path, logo_filename)
-                if os.path.exists(file_path):
-                    with open(file_path, 'rb') as f:
-                        brand.logo.save(logo_filename, File(f), save=True)
-                        self.stdout.write(f"Attached logo for {brand.name}")
-                else:
-                    self.stdout.write(self.style.WARNING(f"Logo file not found: {file_path}"))
-
-            if hero_image_filename:
-                # Hero images might be in public root or images/ folder
-                # We placed placeholder-brand.jpg in public root
-                hero_path = os.path.join(settings.BASE_DIR, '../frontend/public', hero_image_filename)
-                if os.path.exists(hero_path):
-                    with open(hero_path, 'rb') as f:
-                        brand.hero_image.save(hero_image_filename, File(f), save=True)
-                        self.stdout.write(f"Attached hero image for {brand.name}")
-                else:
-                    self.stdout.write(self.style.WARNING(f"Hero image file not found: {hero_path}"))
-            
-            self.stdout.write(f"Created brand: {brand.name}")
-
-        # Create Founders
-        founders_data = [
-            {
-                "name": "Jimit Shah",
-                "role": "Founder & Chief of Manufacturing",
-                "bio": "Building the 'Giga Factory' of the future, Jimit is the visionary force behind Alevate's operational scale. With a deep background in advanced manufacturing and D2C brand aggregation, he is restructuring the construction and interior industry by creating a vertically integrated ecosystem that delivers speed, quality, and innovation.",
-                "vision_quote": "We aren't just building products; we are building an ecosystem of owning a home that is seamless, smart, and beautiful.",
-                "linkedin_url": "https://www.linkedin.com/in/jimit-shah-3861aa113/",
-                "twitter_url": "https://twitter.com/alevate_spaces",
-                "photo_filename": "jimit.jpg",
-                "order": 1,
-                "expertise": ["Advanced Manufacturing", "Operational Scale", "D2C Ecosystems", "Supply Chain Innovation"]
-            },
-            {
-                "name": "Nupur Shah",
-                "role": "Co-Founder & Head of Design",
-                "bio": "An architect with a philosophy rooted in the harmony of space and form. Nupur brings a rich portfolio of award-winning spatial design to Alevate. She leads the design language of our brands, ensuring that every product—from furniture to lighting—adheres to a standard of aesthetic purity and functional elegance.",
-                "vision_quote": "Design is the silent ambassador of your brand. At Alevate, we ensure that ambassador speaks the language of elegance and utility.",
-                "linkedin_url": "https://www.linkedin.com/in/nupurshah-thh/",
-                "twitter_url": "",
-                "photo_filename": "nupur.jpg",
-                "order": 2,
-                "expertise": ["Spatial Design", "Architectural Innovation", "Aesthetics", "Brand Identity"]
+    def synthetic_founders(self, count, templates, start_order):
+        templates = templates or [{'role': 'Founder', 'bio': 'Synthetic founder', 'photo': ''}]
+        for i in range(count):
+            template = templates[i % len(templates)]
+            yield {
+                **template,
+                'name': f'Synthetic Founder {i + 1:05d}',
+                'linkedin_url': f'https://www.linkedin.com/in/founder-{i + 1}/',
+                'order': start_order + i + 1,
             }
+
+    def build_instances(self, model, rows, media):
+        image_fields = dict(IMAGE_FIELDS)[model]
+        fields = {
+            f.name: f for f in model._meta.concrete_fields
+            if not f.primary_key and f.editable
+        }
+        instances = []
+        for row in rows:
+            unknown = set(row) - set(fields)
+            if unknown:
+                raise CommandError(f"{model.__name__} {row.get('name')!r}: unknown fields {sorted(unknown)}")
+            values = {}
+            for name, value in row.items():
+                if name in image_fields:
+                    continue
+                values[name] = fields[name].to_python(value)
+            instance = model(**values)
+            for name in image_fields:
+                stored, placeholder, width, height = ('', '', None, None)
+                if row.get(name):
+                    stored, placeholder, width, height = media.get(fields[name], row[name])
+                setattr(instance, name, stored)
+                setattr(instance, name + '_placeholder', placeholder)
+                setattr(instance, name + '_width', width)
+                setattr(instance, name + '_height', height)
+            instances.append(instance)
+        return instances
+
+    def sync(self, model, instances, upsert, prune, batch_size):
+        """Write ``instances`` with bulk queries; return (created, updated, deleted)."""
+        if not upsert:
+            # One feed reset replaces the per-row tombstones, and
+            # handle() invalidates the cache once.
+            with per_row_receivers_muted():
+                deleted, _ = model._base_manager.all().delete()
+            record_reset()
+            model.objects.bulk_create(stamp(instances), batch_size=batch_size)
+            return len(instances), 0, deleted
+
+        image_fields = dict(IMAGE_FIELDS)[model]
+        update_fields = [
+            f.name for f in model._meta.concrete_fields
+            if not f.primary_key and f.name != 'name' and f.name not in CHANGE_FIELDS
         ]
-        
-        # Path to frontend public folder where images are stored
-        frontend_founders_path = os.path.join(settings.BASE_DIR, '../frontend/public/founders')
-
-        for data in founders_data:
-            photo_filename = data.pop('photo_filename', None)
-            expertise = data.pop('expertise', []) # Currently Founder model might not have expertise text field but let's check
-            founder = Founder.objects.create(**data)
-            
-            # Since Founder model doesn't strictly have an expertise field in the Django definition we saw earlier,
-            # we might need to add it or store it in bio. 
-            # *Correction*: I previously updated the `types/index.ts` frontend type but did I update the Django model?
-            # Checking recent file view of `models.py`: No, I did NOT add expertise field to the Django model.
-            # I will assume for now we cannot save expertise directly unless I migrate. 
-            # To be safe and quick, I will append expertise to bio or just skip it on backend and handle frontend.
-            # Actually, I should probably add the field if I want it to be real, or just put it in a JSON field.
-            # *Decision*: I will SKIP 'expertise' for now on the backend save to avoid migration errors, 
-            # unless I do a quick migration. 
-            # Given the request is "Update profile", I will stick to what the model has. 
-            
-            if photo_filename:
-                file_path = os.path.join(frontend_founders_path, photo_filename)
-                if os.path.exists(file_path):
-                    with open(file_path, 'rb') as f:
-                        founder.photo.save(photo_filename, File(f), save=True)
-                        self.stdout.write(f"Attached photo for {founder.name}")
-                else:
-                    self.stdout.write(self.style.WARNING(f"Photo file not found: {file_path}"))
-
-            self.stdout.write(f"Created founder: {founder.name}")
-
-        self.stdout.write(self.style.SUCCESS('Successfully seeded data'))
+        existing = {obj.name: obj for obj in model.objects.all()}
+        to_create, to_update = [], []
+        for instance in instances:
+            current = existing.get(instance.name)
+            if current is None:
+                to_create.append(instance)
+                continue
+            changed = False
+            for name in update_fields:
+                value = getattr(instance, name)
+                if name in image_fields:
+                    value = value.name
+                    if getattr(current, name).name != value:
+                        setattr(current, name, value)
+                        changed = True
+                elif getattr(current, name) != value:
+                    setattr(current, name, value)
+                    changed = True
+            if changed:
+                to_update.append(current)
+
+        deleted = 0
+        if prune:
+            keep = {instance.name for instance in instances}
+            stale = [obj.pk for name, obj in existing.items() if name not in keep]
+            if stale:
+                deleted, _ = model.objects.filter(pk__in=stale).delete()
+        stamp(to_create + to_update)
+        model.objects.bulk_create(to_create, batch_size=batch_size)
+        model.objects.bulk_update(to_update, update_fields + CHANGE_FIELDS, batch_size=batch_size)
+        return len(to_create), len(to_update), deleted
+
+    def handle(self, *args, **options):
+        self.stdout.write('Seeding data...')
+        started = time.monotonic()
+        if options['prune'] and not options['upsert']:
+            raise CommandError('--prune only applies together with --upsert')
+
+        brands_data, founders_data = self.load_fixture(options['fixture'])
+        brands_data = brands_data + list(self.synthetic_brands(
+            options['synthetic_brands'], brands_data,
+            max((row.get('order', 0) for row in brands_data), default=0),
+        ))
+        founders_data = founders_data + list(self.synthetic_founders(
+            options['synthetic_founders'], founders_data,
+            max((row.get('order', 0) for row in founders_data), default=0),
+        ))
+
+        # Media is copied before the transaction; storage writes can't be
+        # rolled back, and they would only lengthen the write lock.
+        media = MediaImporter(options['media_dir'], self.stdout, self.style)
+        brands = self.build_instances(Brand, brands_data, media)
+        founders = self.build_instances(Founder, founders_data, media)
+
+        # One transaction: readers see the old rows until the new ones are
+        # committed, never an empty table.
+        with transaction.atomic():
+            for model, instances in ((Brand, brands), (Founder, founders)):
+                created, updated, deleted = self.sync(
+                    model, instances, options['upsert'], options['prune'], options['batch_size'],
+                )
+                self.stdout.write(
+                    f"{model.__name__}: {created} created, {updated} updated, {deleted} deleted"
+                )
+            # bulk_create/bulk_update skip model signals; the rows were
+            # stamped for the change feed in sync().
+            content_changed(Brand, Founder)
+
+        if settings.IMAGE_DERIVATIVES_ON_SAVE:
+            # Derivatives are keyed by content hash, so reseeding is a no-op here.
+            generated = [
+                name for name, widths in media.widths.items()
+                if process_source(default_storage.path(name), sorted(widths))[1]
+            ]
+            if generated:
+                # Responses cached since the commit above lack these srcsets.
+                with transaction.atomic():
+                    content_changed(*touch_image_rows(generated))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Successfully seeded data in {time.monotonic() - started:.2f}s'
+        ))
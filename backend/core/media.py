@@ -0,0 +1,166 @@
+"""
+Serving files from MEDIA_ROOT.
+
+``media_response`` answers conditional requests (ETag / Last-Modified) and
+single byte ranges itself. The bytes are either handed to the front-end
+server (``X-Accel-Redirect`` for nginx, ``X-Sendfile`` for Apache/lighttpd,
+see ``MEDIA_SENDFILE``) or streamed as a ``FileResponse``, which gunicorn sends
+with ``os.sendfile`` through ``wsgi.file_wrapper``. Content-addressed uploads
+(core.storage) and image derivatives (named by source digest and encoder, see
+core.images) never change their bytes, so they are cached as immutable.
+"""
+import mimetypes
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.encoding import escape_uri_path
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+from .storage import is_content_addressed
+
+# <hh>/<source sha256>/<encoder>/<width>.<ext> under IMAGE_DERIVATIVES_DIR.
+# Not the manifest, which a forced regeneration rewrites.
+DERIVATIVE_FILE_RE = re.compile(r'^([0-9a-f]{2})/\1[0-9a-f]{62}/[0-9a-f]{12}/\d+\.[a-z]+$')
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def is_immutable(name):
+    prefix = settings.IMAGE_DERIVATIVES_DIR + '/'
+    if name.startswith(prefix):
+        return bool(DERIVATIVE_FILE_RE.match(name[len(prefix):]))
+    return is_content_addressed(name)
+
+
+def parse_range(header, size):
+    """
+    Return ``(start, end)`` (inclusive) for a single-range ``Range`` header,
+    None to ignore the header, or ``False`` when it cannot be satisfied.
+    """
+    match = RANGE_RE.match(header.strip())
+    if match is None or size == 0:
+        # Malformed or multiple ranges; serving the whole file is allowed.
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or (last and int(last) < start):
+        return False
+    return start, end
+
+
+def _if_range_matches(request, etag, mtime):
+    if_range = request.headers.get('If-Range')
+    if if_range is None:
+        return True
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == int(mtime)
+
+
+class FileRange:
+    """
+    A file positioned at the start of a range whose ``read()`` stops at its
+    end. ``fileno()`` lets gunicorn's file_wrapper ``sendfile()`` the range
+    (it sends Content-Length bytes from the current offset); other servers
+    iterate ``read()``.
+    """
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def resolve_media_path(name):
+    try:
+        path = Path(safe_join(settings.MEDIA_ROOT, name))
+    except (SuspiciousFileOperation, ValueError):
+        # Traversal outside MEDIA_ROOT, or a name the OS cannot represent.
+        raise Http404
+    if not path.is_file():
+        raise Http404
+    return path
+
+
+def _cache_headers(response, name):
+    if is_immutable(name):
+        response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    else:
+        response['Cache-Control'] = 'public, max-age=%d' % settings.MEDIA_CACHE_MAX_AGE
+    return response
+
+
+def media_response(request, name):
+    path = resolve_media_path(name)
+    stat = path.stat()
+    etag = quote_etag('%x-%x' % (stat.st_mtime_ns, stat.st_size))
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if not_modified is not None:
+        return _cache_headers(not_modified, name)
+
+    content_type, encoding = mimetypes.guess_type(path.name)
+    if encoding or not content_type:
+        content_type = 'application/octet-stream'
+
+    if settings.MEDIA_SENDFILE:
+        # The front-end server handles ranges and streams the bytes itself.
+        response = HttpResponse(content_type=content_type)
+        if settings.MEDIA_SENDFILE == 'x-accel-redirect':
+            response['X-Accel-Redirect'] = escape_uri_path(
+                settings.MEDIA_ACCEL_REDIRECT_PREFIX + name.lstrip('/')
+            )
+        else:
+            response['X-Sendfile'] = str(path)
+    else:
+        start, end = 0, stat.st_size - 1
+        byte_range = None
+        range_header = request.headers.get('Range')
+        if range_header and request.method == 'GET' and _if_range_matches(request, etag, stat.st_mtime):
+            byte_range = parse_range(range_header, stat.st_size)
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = 'bytes */%d' % stat.st_size
+            return response
+
+        file = open(path, 'rb')
+        if byte_range:
+            start, end = byte_range
+            response = FileResponse(FileRange(file, start, end - start + 1), status=206, content_type=content_type)
+            response['Content-Range'] = 'bytes %d-%d/%d' % (start, end, stat.st_size)
+        else:
+            response = FileResponse(file, content_type=content_type)
+        response['Content-Length'] = end - start + 1
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    return _cache_headers(response, name)
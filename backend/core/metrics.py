@@ -0,0 +1,336 @@
+"""
+Request metrics in the Prometheus text format.
+
+For every request ``MetricsMiddleware`` records latency (as a histogram),
+DB query count and time, time spent building the response body, and response
+size, labelled by route name, method and status. DB time comes from an
+execute wrapper installed on every connection; it reports into a context
+variable, so queries made from ``sync_to_async`` threads are counted too.
+
+Each process keeps its own counters and a background thread writes them to
+``METRICS_ROOT/<pid>.json`` every ``METRICS_FLUSH_INTERVAL`` seconds (and at
+exit). ``render_metrics()`` merges the files of all processes, so any gunicorn
+worker can answer a scrape for the whole server. Files of dead processes (recycled
+workers) are folded into ``archive.json`` so the totals never go backwards.
+
+The same files carry each process' connection pool statistics (see
+core.pool): gauges of idle and checked-out connections, summed over live
+processes, and counters of connects, checkouts, waits and failed health checks.
+"""
+import atexit
+import fcntl
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from .files import write_atomic
+from .pool import COUNTERS as POOL_COUNTERS, pool_stats
+
+ARCHIVE_NAME = 'archive.json'
+LOCK_NAME = '.lock'
+
+POOL_GAUGES = (
+    ('api_db_pool_connections', 'Pooled connections by state.'),
+    ('api_db_pool_max_connections', 'Configured pool size (MAX_SIZE) summed over processes.'),
+)
+
+POOL_COUNTER_HELP = {
+    'opened': 'Connections opened by the pool.',
+    'closed': 'Pooled connections closed (expired, broken or shut down).',
+    'checkouts': 'Connections handed out by the pool.',
+    'waits': 'Checkouts that had to wait for a free connection.',
+    'wait_seconds': 'Time spent waiting for a free connection.',
+    'timeouts': 'Checkouts that gave up waiting.',
+    'health_check_failures': 'Idle connections that failed the health check on checkout.',
+}
+
+COUNTERS = (
+    ('api_db_queries_total', 'queries', 'Database queries executed.'),
+    ('api_db_query_seconds_total', 'db_seconds', 'Time spent in database queries.'),
+    ('api_serialize_seconds_total', 'serialize_seconds', 'Time spent building response bodies, excluding database time.'),
+    ('api_response_bytes_total', 'bytes', 'Response body bytes sent.'),
+)
+
+# Any other method is labelled "other", so clients can't mint new series.
+METHODS = frozenset(('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS', 'TRACE', 'CONNECT'))
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    __slots__ = ('started', 'queries', 'db_seconds', 'serialize_seconds')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serialize_seconds = 0.0
+
+
+def query_wrapper(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db_seconds += time.perf_counter() - started
+
+
+@receiver(connection_created)
+def install_query_wrapper(sender, connection, **kwargs):
+    if query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_wrapper)
+
+
+@contextmanager
+def timed_serialization():
+    """Add the time spent in the block, minus DB time, to the current request."""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter()
+    db_before = metrics.db_seconds
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics.serialize_seconds += max(0.0, elapsed - (metrics.db_seconds - db_before))
+
+
+def _new_series():
+    series = {'buckets': [0] * (len(settings.METRICS_BUCKETS) + 1), 'count': 0, 'sum': 0.0}
+    for _, field, _ in COUNTERS:
+        series[field] = 0
+    return series
+
+
+def _merge_series(target, source):
+    for key, series in source.items():
+        merged = target.setdefault(key, _new_series())
+        if len(series['buckets']) != len(merged['buckets']):
+            # Written with different METRICS_BUCKETS; only the totals line up.
+            series = dict(series, buckets=[0] * (len(merged['buckets']) - 1) + [series['count']])
+        merged['buckets'] = [a + b for a, b in zip(merged['buckets'], series['buckets'])]
+        for field in ['count', 'sum'] + [field for _, field, _ in COUNTERS]:
+            merged[field] += series[field]
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.series = {}
+        self.dirty = False
+        self.flusher_pid = None
+
+    def observe(self, labels, duration, metrics, size):
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = _new_series()
+            index = 0
+            for bound in settings.METRICS_BUCKETS:
+                if duration <= bound:
+                    break
+                index += 1
+            series['buckets'][index] += 1
+            series['count'] += 1
+            series['sum'] += duration
+            series['queries'] += metrics.queries
+            series['db_seconds'] += metrics.db_seconds
+            series['serialize_seconds'] += metrics.serialize_seconds
+            series['bytes'] += size
+            self.dirty = True
+        if self.flusher_pid != os.getpid():
+            self._start_flusher()
+
+    def _start_flusher(self):
+        # Started lazily so every forked worker gets its own thread.
+        with self.lock:
+            if self.flusher_pid == os.getpid():
+                return
+            self.flusher_pid = os.getpid()
+        threading.Thread(target=self._flush_periodically, name='metrics-flush', daemon=True).start()
+        atexit.register(self.flush_if_dirty)
+
+    def _flush_periodically(self):
+        while True:
+            time.sleep(settings.METRICS_FLUSH_INTERVAL)
+            self.flush_if_dirty()
+
+    def flush_if_dirty(self):
+        if self.dirty:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            self.dirty = False
+            data = _dump(self.series, pool_stats())
+        write_atomic(_metrics_dir() / ('%d.json' % os.getpid()), data)
+
+
+registry = Registry()
+
+
+def _metrics_dir():
+    return Path(settings.METRICS_ROOT)
+
+
+def _dump(series, pools):
+    return json.dumps({
+        'requests': [{'labels': list(labels), **values} for labels, values in series.items()],
+        'pools': pools,
+    }).encode()
+
+
+def _load(path):
+    """Return ``(series, pools)`` from a metrics file."""
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}, {}
+    if isinstance(data, list):
+        # Written before pool statistics were recorded.
+        data = {'requests': data, 'pools': {}}
+    return {tuple(item.pop('labels')): item for item in data['requests']}, data['pools']
+
+
+def _merge_pools(target, source, counters_only=False):
+    for alias, stats in source.items():
+        merged = target.setdefault(alias, {})
+        for key, value in stats.items():
+            if counters_only and key not in POOL_COUNTERS:
+                continue
+            merged[key] = merged.get(key, 0) + value
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def start_request():
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def finish_request(request, response, metrics, token):
+    _current.reset(token)
+    duration = time.perf_counter() - metrics.started
+    match = getattr(request, 'resolver_match', None)
+    route = (match.view_name or match.route) if match else 'unmatched'
+    size = int(response.get('Content-Length') or 0) if response.streaming else len(response.content)
+    method = request.method if request.method in METHODS else 'other'
+    registry.observe((route, method, str(response.status_code)), duration, metrics, size)
+    if settings.METRICS_SERVER_TIMING:
+        response['Server-Timing'] = (
+            'db;dur=%.1f;desc="%d queries", serialize;dur=%.1f, total;dur=%.1f' % (
+                metrics.db_seconds * 1000, metrics.queries,
+                metrics.serialize_seconds * 1000, duration * 1000,
+            )
+        )
+    return response
+
+
+def collect():
+    """
+    Merge the metrics of every process, folding dead processes into the
+    archive. Returns ``(series, pools)``.
+    """
+    registry.flush()
+    root = _metrics_dir()
+    with open(root / LOCK_NAME, 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        archive, archived_pools = _load(root / ARCHIVE_NAME)
+        merged, pools = {}, {}
+        _merge_series(merged, archive)
+        _merge_pools(pools, archived_pools)
+        dead = []
+        for path in root.glob('*.json'):
+            if not path.stem.isdigit():
+                continue
+            series, process_pools = _load(path)
+            _merge_series(merged, series)
+            if _process_alive(int(path.stem)):
+                _merge_pools(pools, process_pools)
+            else:
+                # Gauges of a dead process are gone, its counters are kept.
+                _merge_pools(pools, process_pools, counters_only=True)
+                _merge_series(archive, series)
+                _merge_pools(archived_pools, process_pools, counters_only=True)
+                dead.append(path)
+        if dead:
+            write_atomic(root / ARCHIVE_NAME, _dump(archive, archived_pools))
+            for path in dead:
+                path.unlink(missing_ok=True)
+    return merged, pools
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _label_string(labels, extra=''):
+    route, method, status = (_escape(value) for value in labels)
+    return '{route="%s",method="%s",status="%s"%s}' % (route, method, status, extra)
+
+
+def render_metrics():
+    series, pools = collect()
+    series = sorted(series.items())
+    lines = [
+        '# HELP api_request_duration_seconds Request latency by route.',
+        '# TYPE api_request_duration_seconds histogram',
+    ]
+    for labels, values in series:
+        cumulative = 0
+        for bound, count in zip(list(settings.METRICS_BUCKETS) + ['+Inf'], values['buckets']):
+            cumulative += count
+            lines.append('api_request_duration_seconds_bucket%s %d' % (
+                _label_string(labels, ',le="%s"' % bound), cumulative,
+            ))
+        lines.append('api_request_duration_seconds_sum%s %.6f' % (_label_string(labels), values['sum']))
+        lines.append('api_request_duration_seconds_count%s %d' % (_label_string(labels), values['count']))
+    for name, field, help_text in COUNTERS:
+        lines.append('# HELP %s %s' % (name, help_text))
+        lines.append('# TYPE %s counter' % name)
+        for labels, values in series:
+            lines.append('%s%s %s' % (name, _label_string(labels), round(values[field], 6)))
+    lines.extend(_render_pools(sorted(pools.items())))
+    return '\n'.join(lines) + '\n'
+
+
+def _render_pools(pools):
+    (connections_name, connections_help), (max_name, max_help) = POOL_GAUGES
+    lines = ['# HELP %s %s' % (connections_name, connections_help), '# TYPE %s gauge' % connections_name]
+    for alias, stats in pools:
+        for state in ('idle', 'in_use'):
+            lines.append('%s{alias="%s",state="%s"} %d' % (
+                connections_name, _escape(alias), state, stats.get(state, 0),
+            ))
+    lines += ['# HELP %s %s' % (max_name, max_help), '# TYPE %s gauge' % max_name]
+    for alias, stats in pools:
+        lines.append('%s{alias="%s"} %d' % (max_name, _escape(alias), stats.get('max_size', 0)))
+    for field in POOL_COUNTERS:
+        name = 'api_db_pool_%s_total' % field
+        lines += ['# HELP %s %s' % (name, POOL_COUNTER_HELP[field]), '# TYPE %s counter' % name]
+        for alias, stats in pools:
+            lines.append('%s{alias="%s"} %s' % (name, _escape(alias), round(stats.get(field, 0), 6)))
+    return lines
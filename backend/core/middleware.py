@@ -0,0 +1,60 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+
+from .compression import compress_response, is_compressible
+from .metrics import finish_request, start_request
+
+
+class MetricsMiddleware:
+    """
+    Record per-route timing, DB and response size metrics (see core.metrics)
+    and, with METRICS_SERVER_TIMING, add a ``Server-Timing`` header. Put it first in MIDDLEWARE so the
+    total covers the whole stack. Works under both WSGI and ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        metrics, token = start_request()
+        response = self.get_response(request)
+        return finish_request(request, response, metrics, token)
+
+    async def __acall__(self, request):
+        metrics, token = start_request()
+        response = await self.get_response(request)
+        return finish_request(request, response, metrics, token)
+
+
+class CompressionMiddleware:
+    """
+    Compress responses with brotli, zstd or gzip (see core.compression).
+    Put it right after MetricsMiddleware so every other middleware sees the
+    uncompressed body. Under ASGI the compression runs in a worker thread
+    so it does not block the event loop.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return compress_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if not is_compressible(response):
+            return response
+        return await sync_to_async(compress_response, thread_sensitive=False)(request, response)
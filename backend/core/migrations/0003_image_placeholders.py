@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0002_brand_launch_date_brand_one_liner_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="brand",
+            name="hero_image_height",
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="brand",
+            name="hero_image_placeholder",
+            field=models.TextField(
+                blank=True, editable=False, help_text="Tiny base64 LQIP data URI"
+            ),
+        ),
+        migrations.AddField(
+            model_name="brand",
+            name="hero_image_width",
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="brand",
+            name="logo_height",
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="brand",
+            name="logo_placeholder",
+            field=models.TextField(
+                blank=True, editable=False, help_text="Tiny base64 LQIP data URI"
+            ),
+        ),
+        migrations.AddField(
+            model_name="brand",
+            name="logo_width",
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="founder",
+            name="photo_height",
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="founder",
+            name="photo_placeholder",
+            field=models.TextField(
+                blank=True, editable=False, help_text="Tiny base64 LQIP data URI"
+            ),
+        ),
+        migrations.AddField(
+            model_name="founder",
+            name="photo_width",
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0003_image_placeholders"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="brand",
+            index=models.Index(fields=["order", "id"], name="core_brand_order_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="founder",
+            index=models.Index(fields=["order", "id"], name="core_founder_order_idx"),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0004_order_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="brand",
+            index=models.Index(
+                fields=["status", "order"], name="core_brand_status_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="brand",
+            index=models.Index(
+                fields=["launch_date"], name="core_brand_launch_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="brand",
+            index=models.Index(fields=["name"], name="core_brand_name_idx"),
+        ),
+    ]
@@ -0,0 +1,85 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:41
+
+from django.db import migrations, models
+
+
+def start_feed(apps, schema_editor):
+    # Existing rows all belong to revision 1, so ?since=0 returns them.
+    db = schema_editor.connection.alias
+    apps.get_model("core", "RevisionCounter").objects.using(db).create(pk=1, value=1)
+    for name in ("Brand", "Founder"):
+        apps.get_model("core", name).objects.using(db).update(revision=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0005_brand_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RevisionCounter",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("value", models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="Tombstone",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("model", models.CharField(max_length=100)),
+                ("object_id", models.BigIntegerField()),
+                ("revision", models.PositiveBigIntegerField(db_index=True)),
+                ("deleted_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="brand",
+            name="revision",
+            field=models.PositiveBigIntegerField(
+                db_index=True,
+                default=0,
+                editable=False,
+                help_text="Change feed revision of the last write",
+            ),
+        ),
+        migrations.AddField(
+            model_name="brand",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name="founder",
+            name="revision",
+            field=models.PositiveBigIntegerField(
+                db_index=True,
+                default=0,
+                editable=False,
+                help_text="Change feed revision of the last write",
+            ),
+        ),
+        migrations.AddField(
+            model_name="founder",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(start_feed, migrations.RunPython.noop),
+    ]
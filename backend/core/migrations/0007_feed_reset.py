@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0006_change_feed"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="revisioncounter",
+            name="reset_revision",
+            field=models.PositiveBigIntegerField(
+                default=0,
+                help_text="Revision of the last wholesale replacement of the data",
+            ),
+        ),
+    ]
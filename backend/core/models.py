@@ -10,15 +10,30 @@ class Brand(models.Model):
     name = models.CharField(max_length=255)
     logo = models.ImageField(upload_to='brands/logos/')
     hero_image = models.ImageField(upload_to='brands/hero/')
+    logo_placeholder = models.TextField(blank=True, editable=False, help_text="Tiny base64 LQIP data URI")
+    logo_width = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    logo_height = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    hero_image_placeholder = models.TextField(blank=True, editable=False, help_text="Tiny base64 LQIP data URI")
+    hero_image_width = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    hero_image_height = models.PositiveIntegerField(blank=True, null=True, editable=False)
     one_liner = models.CharField(max_length=255, help_text="Short impactful description", default="")
     description = models.TextField(help_text="Detailed description")
     launch_date = models.DateField(blank=True, null=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='ideation')
     website_url = models.URLField(blank=True, null=True)
     order = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    revision = models.PositiveBigIntegerField(default=0, editable=False, db_index=True, help_text="Change feed revision of the last write")
 
     class Meta:
         ordering = ['order']
+        indexes = [
+            # Backs ORDER BY and keyset pagination on (order, id).
+            models.Index(fields=['order', 'id'], name='core_brand_order_idx'),
+            models.Index(fields=['status', 'order'], name='core_brand_status_idx'),
+            models.Index(fields=['launch_date'], name='core_brand_launch_date_idx'),
+            models.Index(fields=['name'], name='core_brand_name_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -27,14 +42,40 @@ class Founder(models.Model):
     name = models.CharField(max_length=255)
     role = models.CharField(max_length=255)
     photo = models.ImageField(upload_to='founders/')
+    photo_placeholder = models.TextField(blank=True, editable=False, help_text="Tiny base64 LQIP data URI")
+    photo_width = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    photo_height = models.PositiveIntegerField(blank=True, null=True, editable=False)
     bio = models.TextField()
     vision_quote = models.CharField(max_length=500, blank=True, help_text="Short vision quote")
     linkedin_url = models.URLField(blank=True, null=True)
     twitter_url = models.URLField(blank=True, null=True)
     order = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    revision = models.PositiveBigIntegerField(default=0, editable=False, db_index=True, help_text="Change feed revision of the last write")
 
     class Meta:
         ordering = ['order']
+        indexes = [
+            models.Index(fields=['order', 'id'], name='core_founder_order_idx'),
+        ]
 
     def __str__(self):
         return self.name
+
+class RevisionCounter(models.Model):
+    """Single row holding the last revision handed out by core.changes."""
+    value = models.PositiveBigIntegerField(default=0)
+    reset_revision = models.PositiveBigIntegerField(default=0, help_text="Revision of the last wholesale replacement of the data")
+
+    def __str__(self):
+        return str(self.value)
+
+class Tombstone(models.Model):
+    """A deleted Brand or Founder, kept so the change feed can report it."""
+    model = models.CharField(max_length=100)
+    object_id = models.BigIntegerField()
+    revision = models.PositiveBigIntegerField(db_index=True)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return '%s #%s' % (self.model, self.object_id)
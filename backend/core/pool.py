@@ -0,0 +1,264 @@
+"""
+Bounded per-process database connection pools.
+
+Django opens a connection on a thread's first query and, with
+``CONN_MAX_AGE = 0``, closes it again when the request finishes. The pooled
+engines in ``core.db_backends`` keep Django's request lifecycle but swap the
+two ends: ``connect()`` checks a raw connection out of the alias' pool and
+``close()`` hands it back, so a worker pays the connect (for PostgreSQL, TCP
+and auth) once per pooled connection instead of once per request.
+
+Each alias' ``POOL`` dict configures its pool:
+
+``MAX_SIZE``            connections per process, idle plus checked out
+``TIMEOUT``             seconds to wait for a free connection before failing
+``MAX_IDLE``            close connections unused for this long
+``MAX_LIFETIME``        recycle connections older than this
+``HEALTH_CHECK_AFTER``  ping connections idle for longer before reuse
+
+Pools belong to the process that filled them: a forked child starts with empty
+pools and never touches the parent's sockets.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+POOL_DEFAULTS = {
+    'MAX_SIZE': 8,
+    'TIMEOUT': 10.0,
+    'MAX_IDLE': 300.0,
+    'MAX_LIFETIME': 3600.0,
+    'HEALTH_CHECK_AFTER': 30.0,
+}
+
+COUNTERS = ('opened', 'closed', 'checkouts', 'waits', 'wait_seconds', 'timeouts', 'health_check_failures')
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class PooledConnection:
+    __slots__ = ('connection', 'created', 'last_used', 'checkouts')
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.created = self.last_used = time.monotonic()
+        self.checkouts = 0
+
+
+def _close_quietly(entry):
+    try:
+        entry.connection.close()
+    except Exception:
+        pass
+
+
+class ConnectionPool:
+    def __init__(self, alias, options):
+        self.alias = alias
+        self.options = {**POOL_DEFAULTS, **options}
+        self.condition = threading.Condition()
+        self.idle = deque()
+        self.size = 0
+        self.stats = dict.fromkeys(COUNTERS, 0)
+
+    def _expired(self, entry, now):
+        return (now - entry.created > self.options['MAX_LIFETIME']
+                or now - entry.last_used > self.options['MAX_IDLE'])
+
+    def acquire(self, connect, ping):
+        """
+        Return a checked-out PooledConnection, reusing an idle one (after a
+        ``ping`` if it sat idle for a while) or opening one with ``connect``.
+        """
+        deadline = time.monotonic() + self.options['TIMEOUT']
+        waited = False
+        while True:
+            entry, discard = None, []
+            with self.condition:
+                while entry is None:
+                    now = time.monotonic()
+                    while self.idle:
+                        candidate = self.idle.pop()
+                        if self._expired(candidate, now):
+                            self.size -= 1
+                            discard.append(candidate)
+                        else:
+                            entry = candidate
+                            break
+                    if entry is not None or self.size < self.options['MAX_SIZE']:
+                        break
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self.stats['timeouts'] += 1
+                        raise PoolTimeout(
+                            'No connection free in the %r pool after %.1fs (MAX_SIZE=%d)'
+                            % (self.alias, self.options['TIMEOUT'], self.options['MAX_SIZE'])
+                        )
+                    if not waited:
+                        waited = True
+                        self.stats['waits'] += 1
+                    started = time.monotonic()
+                    self.condition.wait(remaining)
+                    self.stats['wait_seconds'] += time.monotonic() - started
+                if entry is None:
+                    # Reserve the slot, connect outside the lock.
+                    self.size += 1
+                self.stats['closed'] += len(discard)
+            for stale in discard:
+                _close_quietly(stale)
+
+            if entry is None:
+                try:
+                    entry = PooledConnection(connect())
+                except BaseException:
+                    self._forget()
+                    raise
+                with self.condition:
+                    self.stats['opened'] += 1
+            elif time.monotonic() - entry.last_used > self.options['HEALTH_CHECK_AFTER']:
+                try:
+                    ping(entry.connection)
+                except Exception:
+                    with self.condition:
+                        self.stats['health_check_failures'] += 1
+                    self.discard(entry)
+                    continue
+
+            entry.checkouts += 1
+            with self.condition:
+                self.stats['checkouts'] += 1
+            return entry
+
+    def release(self, entry):
+        entry.last_used = time.monotonic()
+        with self.condition:
+            self.idle.append(entry)
+            self.condition.notify()
+
+    def discard(self, entry):
+        _close_quietly(entry)
+        with self.condition:
+            self.stats['closed'] += 1
+        self._forget()
+
+    def _forget(self):
+        with self.condition:
+            self.size -= 1
+            self.condition.notify()
+
+    def close_idle(self):
+        with self.condition:
+            entries = list(self.idle)
+            self.idle.clear()
+            self.size -= len(entries)
+            self.stats['closed'] += len(entries)
+            self.condition.notify_all()
+        for entry in entries:
+            _close_quietly(entry)
+
+    def snapshot(self):
+        with self.condition:
+            return {
+                **self.stats,
+                'max_size': self.options['MAX_SIZE'],
+                'idle': len(self.idle),
+                'in_use': self.size - len(self.idle),
+            }
+
+
+def get_pool(alias, settings_dict):
+    # Keyed by NAME too, so the test runner's switch to a test database
+    # gets a fresh pool.
+    key = (alias, str(settings_dict['NAME']))
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.setdefault(key, ConnectionPool(alias, settings_dict.get('POOL') or {}))
+    return pool
+
+
+def close_pools():
+    """Close every idle pooled connection, e.g. before forking workers."""
+    for pool in list(_pools.values()):
+        pool.close_idle()
+
+
+def pool_stats():
+    """``{alias: stats}`` for this process, summed over pools of the same alias."""
+    stats = {}
+    for (alias, _), pool in list(_pools.items()):
+        snapshot = pool.snapshot()
+        if alias in stats:
+            snapshot = {key: stats[alias][key] + value for key, value in snapshot.items()}
+        stats[alias] = snapshot
+    return stats
+
+
+def _forget_inherited_pools():
+    # The parent still owns these connections; closing them here would close
+    # its sockets too, so just drop the references.
+    global _pools_lock
+    _pools.clear()
+    _pools_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_forget_inherited_pools)
+
+
+def is_fresh_connection(connection):
+    """True on the first checkout of a raw connection, or when not pooled."""
+    entry = getattr(connection, 'pool_entry', None)
+    return entry is None or entry.checkouts == 1
+
+
+class PooledDatabaseWrapperMixin:
+    """
+    Mixed into a backend's DatabaseWrapper to draw its raw connections from
+    the alias' ConnectionPool (see core.db_backends).
+    """
+    pool_entry = None
+
+    @property
+    def connection_pool(self):
+        return get_pool(self.alias, self.settings_dict)
+
+    def get_new_connection(self, conn_params):
+        try:
+            entry = self.connection_pool.acquire(
+                lambda: super(PooledDatabaseWrapperMixin, self).get_new_connection(conn_params),
+                self.ping,
+            )
+        except PoolTimeout as exc:
+            raise self.Database.OperationalError(str(exc)) from exc
+        self.pool_entry = entry
+        return entry.connection
+
+    def ping(self, connection):
+        cursor = connection.cursor()
+        try:
+            cursor.execute('SELECT 1')
+        finally:
+            cursor.close()
+
+    def _close(self):
+        entry, self.pool_entry = self.pool_entry, None
+        if entry is None or entry.connection is not self.connection:
+            return super()._close()
+        pool = self.connection_pool
+        if self.errors_occurred and not self.is_usable():
+            pool.discard(entry)
+            return
+        try:
+            # Never hand out a connection with an open transaction.
+            if self.in_atomic_block or not self.autocommit:
+                entry.connection.rollback()
+        except Exception:
+            pool.discard(entry)
+        else:
+            pool.release(entry)
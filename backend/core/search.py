@@ -0,0 +1,110 @@
+"""
+Brand search backed by an SQLite FTS5 index.
+
+On the SQLite backend ``core_brand_fts`` is an external-content FTS5 table
+over ``core_brand`` kept in sync by triggers. It is (re)installed from
+``post_migrate`` rather than a migration because Django rebuilds SQLite tables
+for many schema changes, which silently drops triggers; reinstalling after
+every migrate keeps the index consistent. Other backends fall back to
+``icontains`` lookups.
+"""
+import re
+
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'core_brand_fts'
+FTS_SOURCE = 'core_brand'
+FTS_COLUMNS = ('name', 'one_liner', 'description')
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+_available = {}
+
+
+def _fts_sql():
+    columns = ', '.join(FTS_COLUMNS)
+    new_values = ', '.join('new.%s' % c for c in FTS_COLUMNS)
+    old_values = ', '.join('old.%s' % c for c in FTS_COLUMNS)
+    delete_row = (
+        "INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old});"
+    ).format(fts=FTS_TABLE, columns=columns, old=old_values)
+    insert_row = 'INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new});'.format(
+        fts=FTS_TABLE, columns=columns, new=new_values,
+    )
+    return [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({columns}, content='{src}', "
+        "content_rowid='id', tokenize='unicode61 remove_diacritics 2')".format(
+            fts=FTS_TABLE, columns=columns, src=FTS_SOURCE,
+        ),
+        'CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {src} BEGIN {ins} END'.format(
+            fts=FTS_TABLE, src=FTS_SOURCE, ins=insert_row,
+        ),
+        'CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {src} BEGIN {dele} END'.format(
+            fts=FTS_TABLE, src=FTS_SOURCE, dele=delete_row,
+        ),
+        'CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {columns} ON {src} '
+        'BEGIN {dele} {ins} END'.format(
+            fts=FTS_TABLE, src=FTS_SOURCE, columns=', '.join(FTS_COLUMNS),
+            dele=delete_row, ins=insert_row,
+        ),
+    ]
+
+
+def _has_fts5(connection):
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return any(row[0] == 'ENABLE_FTS5' for row in cursor.fetchall())
+
+
+def install_fts(using='default'):
+    """Create the FTS table and triggers if missing, rebuilding the index when needed."""
+    connection = connections[using]
+    if connection.vendor != 'sqlite' or not _has_fts5(connection):
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger') AND name LIKE %s",
+            [FTS_TABLE + '%'],
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+        expected = {FTS_TABLE, FTS_TABLE + '_ai', FTS_TABLE + '_ad', FTS_TABLE + '_au'}
+        if expected <= existing:
+            return True
+        for statement in _fts_sql():
+            cursor.execute(statement)
+        # Rows written while triggers were missing are only picked up by a rebuild.
+        cursor.execute("INSERT INTO {fts}({fts}) VALUES ('rebuild')".format(fts=FTS_TABLE))
+    _available.pop(connection.alias, None)
+    return True
+
+
+def fts_available(using='default'):
+    if using not in _available:
+        connection = connections[using]
+        available = False
+        if connection.vendor == 'sqlite':
+            available = FTS_TABLE in connection.introspection.table_names()
+        _available[using] = available
+    return _available[using]
+
+
+def fts_match_expression(term):
+    """Quote each word of ``term`` as an FTS5 prefix query; all words must match."""
+    return ' '.join('"%s"*' % token for token in _TOKEN_RE.findall(term))
+
+
+def search_brands(queryset, term):
+    expression = fts_match_expression(term)
+    if not expression:
+        return queryset.none()
+    if fts_available(queryset.db):
+        return queryset.filter(id__in=RawSQL(
+            'SELECT rowid FROM {fts} WHERE {fts} MATCH %s'.format(fts=FTS_TABLE),
+            [expression],
+        ))
+    condition = Q()
+    for token in _TOKEN_RE.findall(term):
+        condition &= Q(name__icontains=token) | Q(one_liner__icontains=token) | Q(description__icontains=token)
+    return queryset.filter(condition)
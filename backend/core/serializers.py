@@ -1,12 +1,56 @@
 from rest_framework import serializers
+from .images import build_srcset, get_derivatives
 from .models import Brand, Founder
 
-class BrandSerializer(serializers.ModelSerializer):
+def requested_fields(request):
+    """Field names from ``?fields=a,b`` on a DRF request, or None."""
+    params = getattr(request, 'query_params', None)
+    if not params or not params.get('fields'):
+        return None
+    return [name.strip() for name in params['fields'].split(',') if name.strip()]
+
+class SparseFieldsetMixin:
+    """Restrict output to the fields listed in ``?fields=``."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = requested_fields(self.context.get('request'))
+        if requested is None:
+            return
+        unknown = sorted(set(requested) - set(self.fields))
+        if unknown:
+            raise serializers.ValidationError({'fields': ['Unknown field(s): %s' % ', '.join(unknown)]})
+        for name in set(self.fields) - set(requested):
+            self.fields.pop(name)
+
+class ResponsiveImageField(serializers.ReadOnlyField):
+    """srcset-style derivatives of an ImageField, or null until generated."""
+
+    def to_representation(self, value):
+        manifest = get_derivatives(value)
+        if manifest is None:
+            return None
+        return build_srcset(manifest, self.context.get('request'))
+
+class BrandSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    logo_srcset = ResponsiveImageField(source='logo')
+    hero_image_srcset = ResponsiveImageField(source='hero_image')
+
     class Meta:
         model = Brand
         fields = '__all__'
 
-class FounderSerializer(serializers.ModelSerializer):
+class FounderSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    photo_srcset = ResponsiveImageField(source='photo')
+
     class Meta:
         model = Founder
         fields = '__all__'
+
+class ReorderSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False)
+
+    def validate_ids(self, value):
+        if len(set(value)) != len(value):
+            raise serializers.ValidationError('Each id may appear only once.')
+        return value
@@ -0,0 +1,211 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_save
+from django.dispatch import receiver
+
+from .cache import bump_version
+from .changes import record_deletion, touch, transaction_revision
+from .models import Brand, Founder
+
+logger = logging.getLogger(__name__)
+
+_pending = threading.local()
+_muted = threading.local()
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def _on_commit_once(func):
+    """Register ``func`` to run on commit unless it is already queued."""
+    connection = transaction.get_connection()
+    if any(queued[1] is func for queued in connection.run_on_commit):
+        return
+    transaction.on_commit(func)
+
+
+def _flush_invalidations():
+    models = getattr(_pending, 'models', set())
+    _pending.models = set()
+    if models:
+        bump_version(*models)
+
+
+def content_changed(*models):
+    """
+    Retire cached payloads for ``models`` once the current transaction
+    commits, and refresh the static export if enabled.
+
+    Bumping after commit keeps a concurrent reader from caching pre-commit
+    rows under the new version. All changes in one transaction share a single
+    bump. Bulk writes that bypass model signals must call this themselves.
+    """
+    if not hasattr(_pending, 'models'):
+        _pending.models = set()
+    _pending.models.update(models)
+    _on_commit_once(_flush_invalidations)
+    if settings.STATIC_EXPORT_ON_CHANGE:
+        _on_commit_once(_run_static_export)
+
+
+@contextmanager
+def per_row_receivers_muted():
+    """
+    Skip the per-row tombstones and invalidations of deletes made inside the
+    block, for callers that replace the data wholesale and record one feed
+    reset and one content_changed() for it instead (see seed_data).
+    """
+    _muted.active = True
+    try:
+        yield
+    finally:
+        _muted.active = False
+
+
+def _is_muted():
+    return getattr(_muted, 'active', False)
+
+
+@receiver(post_save, sender=Brand)
+@receiver(post_delete, sender=Brand)
+@receiver(post_save, sender=Founder)
+@receiver(post_delete, sender=Founder)
+def invalidate_api_cache(sender, **kwargs):
+    # Admin saves, including list_editable changelist edits, go through
+    # Model.save() and land here.
+    if not _is_muted():
+        content_changed(sender)
+
+
+@receiver(pre_save, sender=Brand)
+@receiver(pre_save, sender=Founder)
+def stamp_revision(sender, instance, raw=False, using=None, **kwargs):
+    if raw or not transaction.get_connection(using).in_atomic_block:
+        return
+    instance.revision = transaction_revision(using)
+
+
+@receiver(post_save, sender=Brand)
+@receiver(post_save, sender=Founder)
+def stamp_revision_after_save(sender, instance, raw=False, using=None, update_fields=None, **kwargs):
+    # A save outside a transaction, or save(update_fields=...) without the
+    # revision, did not write one; stamp the row in a transaction of its own.
+    if raw:
+        return
+    if transaction.get_connection(using).in_atomic_block and (update_fields is None or 'revision' in update_fields):
+        return
+    touch(sender, [instance.pk])
+
+
+@receiver(post_delete, sender=Brand)
+@receiver(post_delete, sender=Founder)
+def record_tombstone(sender, instance, using=None, **kwargs):
+    if not _is_muted():
+        record_deletion(instance, using)
+
+
+@receiver(pre_save, sender=Brand)
+@receiver(pre_save, sender=Founder)
+def compute_image_placeholders(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    from .images import IMAGE_FIELDS, update_placeholder
+
+    field_names = [
+        name for name in dict(IMAGE_FIELDS)[sender]
+        if update_fields is None or name in update_fields
+    ]
+    previous = {}
+    if instance.pk is not None and field_names:
+        previous = sender._base_manager.filter(pk=instance.pk).values(*field_names).first() or {}
+    # Read by schedule_image_derivatives() once the row is saved.
+    instance._changed_image_fields = []
+    for name in field_names:
+        fieldfile = getattr(instance, name)
+        changed = not fieldfile._committed or previous.get(name) != fieldfile.name
+        if changed:
+            instance._changed_image_fields.append(name)
+        if changed or not getattr(instance, name + '_placeholder'):
+            update_placeholder(instance, name)
+
+
+def _generate_image_derivatives(model, pk, field_names):
+    from .images import generate_for_fieldfile
+
+    try:
+        # Re-read the row: it may have been edited or deleted since.
+        instance = model._base_manager.filter(pk=pk).first()
+        generated = False
+        for name in field_names if instance is not None else ():
+            try:
+                result = generate_for_fieldfile(getattr(instance, name), name)
+            except Exception:
+                # generate_image_derivatives picks up sources without a manifest.
+                logger.exception('Image derivative generation failed for %s %s %s', model.__name__, pk, name)
+                continue
+            generated = generated or bool(result and result[1])
+        if generated:
+            # The srcsets just appeared, serialized payloads must be rebuilt
+            # and feed clients told about them.
+            with transaction.atomic():
+                touch(model, [pk])
+                content_changed(model)
+    except Exception:
+        # Nobody reads the executor's futures, log it here.
+        logger.exception('Image derivative update failed for %s %s', model.__name__, pk)
+    finally:
+        connections.close_all()
+
+
+def derivative_executor():
+    """
+    The background thread derivatives are encoded on, so a save never waits
+    for them. Created lazily so every forked worker gets its own; jobs still
+    queued when a process exits are encoded before it does.
+    """
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='image-derivatives')
+            _executor_pid = os.getpid()
+        return _executor
+
+
+@receiver(post_save, sender=Brand)
+@receiver(post_save, sender=Founder)
+def schedule_image_derivatives(sender, instance, raw=False, **kwargs):
+    if raw or not settings.IMAGE_DERIVATIVES_ON_SAVE:
+        return
+    # Only files that changed in this save; the others already have theirs.
+    field_names = getattr(instance, '_changed_image_fields', None)
+    if not field_names:
+        return
+    pk = instance.pk
+    transaction.on_commit(
+        lambda: derivative_executor().submit(_generate_image_derivatives, sender, pk, field_names)
+    )
+
+
+def _run_static_export():
+    from .export import export_static_api
+
+    try:
+        export_static_api(settings.STATIC_EXPORT_ROOT, settings.STATIC_EXPORT_BASE_URL)
+    except Exception:
+        logger.exception('Static API export failed')
+
+
+@receiver(post_migrate)
+def install_search_index(sender, using='default', **kwargs):
+    if sender.name != 'core':
+        return
+    from .search import install_fts
+
+    install_fts(using)
@@ -0,0 +1,96 @@
+"""
+Landing snapshot: every Brand and Founder in one precompressed JSON document.
+
+A snapshot is rendered once per content version (see ``core.cache``) and per
+base URL, since image URLs in the payload are absolute. Built snapshots are
+kept in process memory and mirrored to ``SNAPSHOT_ROOT`` so a freshly forked
+worker can load them from disk instead of querying the database.
+"""
+import hashlib
+from collections import namedtuple
+from pathlib import Path
+
+from django.conf import settings
+from rest_framework.renderers import JSONRenderer
+
+from .cache import get_content_version, make_etag
+from .compression import FILE_SUFFIXES, compress_all
+from .files import write_atomic
+from .models import Brand, Founder
+from .serializers import BrandSerializer, FounderSerializer
+
+Snapshot = namedtuple('Snapshot', ['etag', 'version', 'bodies'])
+
+SNAPSHOT_MODELS = (Brand, Founder)
+
+_snapshots = {}
+
+
+def _base_url(request):
+    return request.build_absolute_uri('/')
+
+
+def build_payload(request):
+    context = {'request': request}
+    data = {
+        'brands': BrandSerializer(Brand.objects.all(), many=True, context=context).data,
+        'founders': FounderSerializer(Founder.objects.all(), many=True, context=context).data,
+    }
+    return JSONRenderer().render(data)
+
+
+def _snapshot_dir():
+    return Path(settings.SNAPSHOT_ROOT)
+
+
+def _snapshot_paths(base_url, etag):
+    host_digest = hashlib.md5(base_url.encode(), usedforsecurity=False).hexdigest()[:12]
+    stem = '%s-%s' % (host_digest, etag.strip('"'))
+    root = _snapshot_dir()
+    paths = {None: root / ('%s.json' % stem)}
+    for coding, suffix in FILE_SUFFIXES.items():
+        paths[coding] = root / ('%s.json%s' % (stem, suffix))
+    return host_digest, paths
+
+
+def _load_from_disk(paths):
+    bodies = {}
+    for coding, path in paths.items():
+        try:
+            bodies[coding] = path.read_bytes()
+        except FileNotFoundError:
+            if coding is None:
+                return None
+    return bodies
+
+
+def _save_to_disk(host_digest, paths, bodies):
+    root = _snapshot_dir()
+    current = set(paths.values())
+    # Retire snapshots of older versions for this base URL.
+    for stale in root.glob('%s-*' % host_digest):
+        if stale not in current:
+            stale.unlink(missing_ok=True)
+    for coding, body in bodies.items():
+        write_atomic(paths[coding], body)
+
+
+def get_snapshot(request):
+    base_url = _base_url(request)
+    version = get_content_version(*SNAPSHOT_MODELS)
+    etag = make_etag(version, base_url, 'snapshot')
+
+    snapshot = _snapshots.get(base_url)
+    if snapshot is not None and snapshot.etag == etag:
+        return snapshot
+
+    host_digest, paths = _snapshot_paths(base_url, etag)
+    bodies = _load_from_disk(paths)
+    if bodies is None:
+        body = build_payload(request)
+        bodies = {None: body, **compress_all(body)}
+        _save_to_disk(host_digest, paths, bodies)
+
+    snapshot = Snapshot(etag, version, bodies)
+    _snapshots[base_url] = snapshot
+    return snapshot
@@ -1,3 +1,1129 @@
-from django.test import TestCase
+import base64
+import gzip
+import io
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.http import Http404, HttpResponse
+from django.test import AsyncRequestFactory, Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from PIL import Image
+
+from . import async_views, snapshot
+from .cache import bump_version
+from .changes import record_reset
+from .compression import ENCODERS, brotli, compress_response, parse_accept_encoding
+from .export import export_static_api
+from .loadgen import percentile
+from .management.commands.benchmark_api import Command as BenchmarkCommand, parse_prometheus
+from .images import SAVE_OPTIONS, derivative_dir, derivative_root, encoder_version, get_derivatives, make_placeholder, process_source
+from .media import resolve_media_path
+from .search import fts_available
+from .storage import is_content_addressed
+from .metrics import collect, registry
+from .pool import ConnectionPool, PoolTimeout, get_pool, pool_stats
+from .models import Brand, Founder, RevisionCounter, Tombstone
+from .signals import _generate_image_derivatives, derivative_executor, per_row_receivers_muted
+from .throttling import AnonTokenBucketThrottle
+from .warmup import list_statements
+
+TEST_ROOT = tempfile.mkdtemp(prefix='core-tests-')
+MEDIA_ROOT = os.path.join(TEST_ROOT, 'media')
+
+TEST_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-default'},
+    'api': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-api'},
+    'throttle': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-throttle'},
+}
+
+
+# Request metrics are flushed by a thread and at exit, outside any class.
+metrics_settings = override_settings(METRICS_ROOT=os.path.join(TEST_ROOT, 'metrics'))
+
+
+def setUpModule():
+    metrics_settings.enable()
+
+
+def tearDownModule():
+    registry.flush_if_dirty()
+    metrics_settings.disable()
+    shutil.rmtree(TEST_ROOT, ignore_errors=True)
+
+
+def png(color, size=(8, 8)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def make_brand(name, order, color='red', **kwargs):
+    kwargs.setdefault('description', 'About %s' % name)
+    return Brand.objects.create(
+        name=name,
+        order=order,
+        logo=SimpleUploadedFile('logo.png', png(color)),
+        hero_image=SimpleUploadedFile('hero.png', png(color, (16, 8))),
+        **kwargs,
+    )
+
+
+def make_founder(name, order):
+    return Founder.objects.create(
+        name=name, role='CEO', bio='Bio of %s' % name, order=order,
+        photo=SimpleUploadedFile('photo.png', png('blue')),
+    )
+
+
+api_settings = override_settings(
+    CACHES=TEST_CACHES, MEDIA_ROOT=MEDIA_ROOT, STATIC_EXPORT_ON_CHANGE=False,
+    # Encoded on a background thread; DerivativeTests turns it back on.
+    IMAGE_DERIVATIVES_ON_SAVE=False,
+    SNAPSHOT_ROOT=os.path.join(TEST_ROOT, 'snapshots'),
+)
+
+
+class APITestMixin:
+    def setUp(self):
+        super().setUp()
+        for alias in TEST_CACHES:
+            caches[alias].clear()
+        self.client = Client(REMOTE_ADDR='192.0.2.1')
+
+
+@api_settings
+class ConditionalRequestTests(APITestMixin, TransactionTestCase):
+    # Invalidation runs on commit, so the edits have to commit.
+    databases = {'default', 'replica'}
+
+    def test_edit_changes_etag(self):
+        brand = make_brand('Alpha', 1)
+        first = self.client.get('/api/brands/')
+        self.assertEqual(first.status_code, 200)
+        etag = first['ETag']
+
+        cached = self.client.get('/api/brands/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached['ETag'], etag)
+
+        brand.name = 'Alpha Two'
+        brand.save()
+        changed = self.client.get('/api/brands/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], etag)
+        self.assertEqual(changed.json()[0]['name'], 'Alpha Two')
+
+        again = self.client.get('/api/brands/', HTTP_IF_NONE_MATCH=changed['ETag'])
+        self.assertEqual(again.status_code, 304)
+
+
+@api_settings
+class SnapshotTests(APITestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        snapshot._snapshots.clear()
+        self.brand = make_brand('Alpha', 1)
+        make_founder('Ada', 1)
+
+    def test_payload(self):
+        response = self.client.get('/api/snapshot/')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([row['name'] for row in data['brands']], ['Alpha'])
+        self.assertEqual([row['name'] for row in data['founders']], ['Ada'])
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertTrue(response['ETag'].startswith('"'))
+
+    def test_encoded_variants_get_weak_etags(self):
+        identity = self.client.get('/api/snapshot/')
+        encoded = self.client.get('/api/snapshot/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(encoded['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(encoded.content), identity.content)
+        self.assertEqual(encoded['ETag'], 'W/' + identity['ETag'])
+        self.assertIn('Accept-Encoding', encoded['Vary'])
+
+        # If-None-Match compares weakly, either validator revalidates.
+        for etag in (identity['ETag'], encoded['ETag']):
+            response = self.client.get('/api/snapshot/', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response['ETag'], encoded['ETag'])
+            self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_new_version_rebuilds(self):
+        etag = self.client.get('/api/snapshot/')['ETag']
+        Brand.objects.filter(pk=self.brand.pk).update(name='Alpha Two')
+        bump_version(Brand)
+        response = self.client.get('/api/snapshot/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['brands'][0]['name'], 'Alpha Two')
+
+    def test_loaded_from_disk(self):
+        body = self.client.get('/api/snapshot/').content
+        snapshot._snapshots.clear()
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/snapshot/')
+        self.assertEqual(response.content, body)
+
+
+@api_settings
+class ExportTests(APITestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        snapshot._snapshots.clear()
+        self.output = tempfile.mkdtemp(dir=TEST_ROOT)
+        self.brands = [make_brand('Alpha', 1), make_brand('Beta', 2)]
+
+    def export(self, **kwargs):
+        return export_static_api(self.output, 'http://testserver', **kwargs)
+
+    def read(self, name):
+        with open(os.path.join(self.output, name), 'rb') as f:
+            return f.read()
+
+    def test_export_matches_api(self):
+        written, unchanged, removed = self.export()
+        self.assertIn('/api/brands/', written)
+        self.assertEqual((unchanged, removed), ([], []))
+
+        manifest = json.loads(self.read('manifest.json'))
+        entry = manifest['/api/brands/']
+        body = self.read(entry['file'])
+        self.assertEqual(body, self.client.get('/api/brands/').content)
+        self.assertEqual(self.read(entry['hashed']), body)
+        self.assertEqual(gzip.decompress(self.read(entry['file'] + '.gz')), body)
+        self.assertIn('/api/brands/%d/' % self.brands[0].pk, manifest)
+
+    def test_unchanged_files_are_skipped(self):
+        written, _, _ = self.export()
+        self.assertEqual(self.export(), ([], written, []))
+        self.assertEqual(self.export(force=True)[0], written)
+
+    def test_removed_rows(self):
+        self.export()
+        manifest = json.loads(self.read('manifest.json'))
+        url = '/api/brands/%d/' % self.brands[1].pk
+        self.brands[1].delete()
+        caches['api'].clear()
+
+        written, _, removed = self.export()
+        self.assertEqual(removed, [url])
+        self.assertIn('/api/brands/', written)
+        self.assertFalse(os.path.exists(os.path.join(self.output, manifest[url]['file'])))
+        self.assertFalse(os.path.exists(os.path.join(self.output, manifest[url]['hashed'])))
+        old_list = manifest['/api/brands/']['hashed']
+        self.assertFalse(os.path.exists(os.path.join(self.output, old_list)))
+
+    def test_command(self):
+        out = io.StringIO()
+        call_command('export_static_api', output=self.output, base_url='http://testserver', stdout=out)
+        self.assertIn('0 unchanged, 0 removed', out.getvalue())
+
+
+@override_settings(
+    IMAGE_DERIVATIVES_ON_SAVE=True,
+    IMAGE_DERIVATIVE_FORMATS=['webp'],
+    IMAGE_DERIVATIVE_WIDTHS={'default': [4], 'logo': [4, 16], 'hero_image': [8], 'photo': [4]},
+)
+@api_settings
+class DerivativeTests(APITestMixin, TransactionTestCase):
+    # Derivatives are encoded after commit, on another thread.
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        super().setUp()
+        shutil.rmtree(os.path.join(MEDIA_ROOT, 'derivatives'), ignore_errors=True)
+
+    def drain(self):
+        derivative_executor().submit(lambda: None).result()
+
+    def test_save_hands_encoding_off(self):
+        with mock.patch('core.signals.derivative_executor') as executor:
+            brand = make_brand('Alpha', 1)
+        executor.return_value.submit.assert_called_once_with(
+            _generate_image_derivatives, Brand, brand.pk, ['logo', 'hero_image'],
+        )
+        self.assertIsNone(get_derivatives(brand.logo))
+
+        with mock.patch('core.signals.derivative_executor') as executor:
+            brand.name = 'Alpha Two'
+            brand.save()
+            brand.logo = SimpleUploadedFile('logo.png', png('green'))
+            brand.save()
+        executor.return_value.submit.assert_called_once_with(
+            _generate_image_derivatives, Brand, brand.pk, ['logo'],
+        )
+
+    def test_generated_in_background(self):
+        # Hold the executor until the revision written by the save is read.
+        release = threading.Event()
+        derivative_executor().submit(release.wait)
+        brand = make_brand('Alpha', 1)
+        revision = Brand.objects.get(pk=brand.pk).revision
+        release.set()
+        self.drain()
+
+        manifest = get_derivatives(brand.logo)
+        # 8px wide source: 4px plus the source width, never upscaled.
+        self.assertEqual(
+            [(v['width'], v['format']) for v in manifest['variants']],
+            [(4, 'webp'), (4, 'jpeg'), (8, 'webp'), (8, 'jpeg')],
+        )
+        for variant in manifest['variants']:
+            self.assertTrue(os.path.exists(os.path.join(MEDIA_ROOT, variant['file'])))
+        self.assertGreater(Brand.objects.get(pk=brand.pk).revision, revision)
+
+        srcset = self.client.get('/api/brands/').json()[0]['logo_srcset']
+        self.assertEqual([source['type'] for source in srcset['sources']], ['image/webp', 'image/jpeg'])
+        self.assertIn('/4.webp 4w, ', srcset['sources'][0]['srcset'])
+
+    def test_existing_manifests_are_reused(self):
+        brand = make_brand('Alpha', 1)
+        self.drain()
+        path = brand.logo.path
+        self.assertFalse(process_source(path, [4])[1])
+        self.assertTrue(process_source(path, [4], force=True)[1])
+
+    def test_encoder_settings_start_a_new_set(self):
+        brand = make_brand('Alpha', 1)
+        self.drain()
+        files = [v['file'] for v in get_derivatives(brand.logo)['variants']]
+        self.assertTrue(all('/%s/' % encoder_version() in name for name in files))
+
+        with mock.patch.dict(SAVE_OPTIONS, webp={'quality': 50}):
+            encoder_version.cache_clear()
+            try:
+                self.assertIsNone(get_derivatives(brand.logo))
+                manifest, generated = process_source(brand.logo.path, [4])
+            finally:
+                encoder_version.cache_clear()
+        # Served as immutable: the old URLs keep their bytes.
+        self.assertTrue(generated)
+        self.assertTrue(set(files).isdisjoint(v['file'] for v in manifest['variants']))
+        self.assertEqual([v['file'] for v in get_derivatives(brand.logo)['variants']], files)
+
+    def test_failures_are_logged(self):
+        with self.assertLogs('core.signals', 'ERROR') as logs:
+            with mock.patch('core.images.process_source', side_effect=OSError('broken')):
+                brand = make_brand('Alpha', 1)
+                self.drain()
+        self.assertIn('failed for Brand %d logo' % brand.pk, logs.output[0])
+        self.assertIsNone(get_derivatives(brand.logo))
+
+
+@api_settings
+class PlaceholderTests(APITestMixin, TestCase):
+    def test_computed_on_save(self):
+        brand = make_brand('Alpha', 1)
+        self.assertEqual((brand.logo_width, brand.logo_height), (8, 8))
+        self.assertEqual((brand.hero_image_width, brand.hero_image_height), (16, 8))
+        prefix = 'data:image/webp;base64,'
+        self.assertTrue(brand.logo_placeholder.startswith(prefix))
+        with Image.open(io.BytesIO(base64.b64decode(brand.logo_placeholder[len(prefix):]))) as image:
+            self.assertLessEqual(max(image.size), 16)
+
+    def test_large_images_are_scaled_down(self):
+        _, width, height = make_placeholder(io.BytesIO(png('red', (400, 100))))
+        self.assertEqual((width, height), (400, 100))
+        with self.settings(IMAGE_PLACEHOLDER_SIZE=8):
+            data_uri, _, _ = make_placeholder(io.BytesIO(png('red', (400, 100))))
+        with Image.open(io.BytesIO(base64.b64decode(data_uri.split(',', 1)[1]))) as image:
+            self.assertEqual(image.size, (8, 2))
+
+    def test_recomputed_only_when_the_image_changes(self):
+        brand = make_brand('Alpha', 1)
+        with mock.patch('core.images.make_placeholder') as make:
+            brand.name = 'Alpha Two'
+            brand.save()
+        make.assert_not_called()
+
+        brand.logo = SimpleUploadedFile('logo.png', png('green', (12, 6)))
+        brand.save()
+        self.assertEqual((brand.logo_width, brand.logo_height), (12, 6))
+
+    def test_unreadable_image_leaves_it_blank(self):
+        brand = make_brand('Alpha', 1)
+        brand.logo = SimpleUploadedFile('logo.png', b'not an image')
+        brand.save()
+        self.assertEqual((brand.logo_placeholder, brand.logo_width, brand.logo_height), ('', None, None))
+
+    def test_backfill(self):
+        brand = make_brand('Alpha', 1)
+        Brand.objects.filter(pk=brand.pk).update(logo_placeholder='', logo_width=None, logo_height=None)
+        out = io.StringIO()
+        call_command('backfill_image_placeholders', stdout=out)
+        self.assertIn('Brand: updated 1 rows', out.getvalue())
+        brand.refresh_from_db()
+        self.assertEqual((brand.logo_width, brand.logo_height), (8, 8))
+        self.assertTrue(brand.logo_placeholder)
+
+        call_command('backfill_image_placeholders', stdout=out)
+        self.assertIn('Brand: updated 0 rows', out.getvalue())
+
+    def test_served_by_the_api(self):
+        make_brand('Alpha', 1)
+        row = self.client.get('/api/brands/').json()[0]
+        self.assertEqual((row['logo_width'], row['logo_height']), (8, 8))
+        self.assertTrue(row['logo_placeholder'].startswith('data:image/webp;base64,'))
+
+
+@api_settings
+class SeedDataTests(APITestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.media_dir = tempfile.mkdtemp(dir=TEST_ROOT)
+        with open(os.path.join(self.media_dir, 'logo.png'), 'wb') as f:
+            f.write(png('red'))
+        self.brands = [
+            {'name': 'Alpha', 'description': 'A', 'order': 1, 'logo': 'logo.png', 'hero_image': 'logo.png'},
+            {'name': 'Beta', 'description': 'B', 'order': 2, 'logo': 'logo.png', 'status': 'revenue'},
+        ]
+        self.founders = [{'name': 'Ada', 'role': 'CEO', 'bio': 'Bio', 'photo': 'missing.png'}]
+
+    def seed(self, *args, **options):
+        path = os.path.join(self.media_dir, 'fixture.json')
+        with open(path, 'w') as f:
+            json.dump({'brands': self.brands, 'founders': self.founders}, f)
+        out = io.StringIO()
+        call_command('seed_data', *args, fixture=path, media_dir=self.media_dir, stdout=out, **options)
+        return out.getvalue()
+
+    def test_replace(self):
+        self.seed()
+        alpha, beta = Brand.objects.order_by('order')
+        self.assertEqual(beta.status, 'revenue')
+        # One stored copy per upload directory, shared by the rows using it.
+        self.assertEqual(alpha.logo.name, beta.logo.name)
+        self.assertEqual((alpha.logo_width, alpha.logo_height), (8, 8))
+        self.assertEqual(Founder.objects.get().photo.name, '')
+
+        self.brands.pop()
+        output = self.seed()
+        self.assertIn('Brand: 1 created, 0 updated, 2 deleted', output)
+        self.assertEqual(list(Brand.objects.values_list('name', flat=True)), ['Alpha'])
+        # A feed reset instead of a tombstone per row.
+        self.assertFalse(Tombstone.objects.exists())
+        self.assertGreater(RevisionCounter.objects.get().reset_revision, 0)
+
+    def test_upsert(self):
+        self.seed()
+        alpha, beta = Brand.objects.order_by('order')
+        self.brands[0]['one_liner'] = 'Updated'
+        self.brands.append({'name': 'Gamma', 'description': 'C', 'order': 3})
+        output = self.seed(upsert=True)
+        self.assertIn('Brand: 1 created, 1 updated, 0 deleted', output)
+        self.assertIn('Founder: 0 created, 0 updated, 0 deleted', output)
+        rows = {brand.name: brand for brand in Brand.objects.all()}
+        self.assertEqual((rows['Alpha'].pk, rows['Alpha'].one_liner), (alpha.pk, 'Updated'))
+        self.assertEqual(rows['Beta'].pk, beta.pk)
+        self.assertIn('Gamma', rows)
+
+    def test_prune(self):
+        self.seed()
+        beta = Brand.objects.get(name='Beta')
+        self.brands.pop()
+        output = self.seed(upsert=True, prune=True)
+        self.assertIn('Brand: 0 created, 0 updated, 1 deleted', output)
+        self.assertEqual(list(Tombstone.objects.values_list('object_id', flat=True)), [beta.pk])
+
+    def test_synthetic_rows(self):
+        self.seed(synthetic_brands=5, synthetic_founders=3)
+        self.assertEqual(Brand.objects.count(), 7)
+        self.assertEqual(Founder.objects.count(), 4)
+        self.assertEqual(Brand.objects.order_by('-order').first().order, 7)
+
+    def test_invalid_input(self):
+        with self.assertRaises(CommandError):
+            self.seed(prune=True)
+        self.brands[0]['colour'] = 'red'
+        with self.assertRaises(CommandError):
+            self.seed()
+
+
+@api_settings
+class FilterSearchTests(APITestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.alpha = make_brand('Alpha Foods', 1, status='revenue', launch_date='2024-01-01',
+                                one_liner='Snacks for everyone')
+        self.beta = make_brand('Beta Café', 2, status='ideation', launch_date='2024-06-30',
+                               description='Coffee')
+        self.gamma = make_brand('Gamma', 3, status='manufacturing', description='Organic alpha bars')
+
+    def names(self, query):
+        response = self.client.get('/api/brands/?' + query)
+        self.assertEqual(response.status_code, 200, response.content)
+        return [row['name'] for row in response.json()]
+
+    def test_status(self):
+        self.assertEqual(self.names('status=revenue,manufacturing'), ['Alpha Foods', 'Gamma'])
+        response = self.client.get('/api/brands/?status=revenue,bogus')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('bogus', response.json()['status'][0])
+
+    def test_launch_date(self):
+        self.assertEqual(self.names('launch_date_after=2024-06-30'), ['Beta Café'])
+        self.assertEqual(self.names('launch_date_before=2024-06-30'), ['Alpha Foods', 'Beta Café'])
+        self.assertEqual(self.names('launch_date_after=2024-01-02&launch_date_before=2024-06-29'), [])
+        for value in ('2024-13-01', 'soon'):
+            self.assertEqual(self.client.get('/api/brands/?launch_date_after=' + value).status_code, 400)
+
+    def test_search(self):
+        self.assertTrue(fts_available())
+        self.assertEqual(self.names('search=alp'), ['Alpha Foods', 'Gamma'])
+        self.assertEqual(self.names('search=alpha+snack'), ['Alpha Foods'])
+        self.assertEqual(self.names('search=cafe'), ['Beta Café'])
+        self.assertEqual(self.names('search=organic&status=manufacturing'), ['Gamma'])
+        # Operators and quotes are searched for, never parsed.
+        self.assertEqual(self.names('search=alpha+OR+beta'), [])
+        self.assertEqual(self.names('search=%22alpha'), ['Alpha Foods', 'Gamma'])
+        self.assertEqual(self.names('search=%21%21'), [])
+
+    def test_index_follows_writes(self):
+        self.beta.name = 'Delta Drinks'
+        self.beta.save()
+        self.gamma.delete()
+        caches['api'].clear()
+        self.assertEqual(self.names('search=delta'), ['Delta Drinks'])
+        self.assertEqual(self.names('search=beta'), [])
+        self.assertEqual(self.names('search=organic'), [])
+
+    def test_fallback_without_fts(self):
+        with mock.patch('core.search.fts_available', return_value=False):
+            self.assertEqual(self.names('search=alpha+snack'), ['Alpha Foods'])
+            self.assertEqual(self.names('search=organic'), ['Gamma'])
+
+
+@api_settings
+class FastPathTests(APITestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        make_brand('Alpha', 2, launch_date='2024-05-01', website_url='https://alpha.example')
+        make_brand('Beta', 1, color='green', status='revenue')
+        for order in range(5):
+            make_brand('Tied %d' % order, 3)
+        make_founder('Ada', 1)
+        make_founder('Grace', 2)
+
+    def fetch(self, url, fast):
+        caches['api'].clear()
+        with self.settings(API_FAST_SERIALIZER=fast):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.content
+
+    def assertSameBytes(self, url):
+        self.assertEqual(self.fetch(url, True), self.fetch(url, False), url)
+
+    def test_list(self):
+        self.assertSameBytes('/api/brands/')
+        self.assertSameBytes('/api/founders/')
+
+    def test_sparse_fields(self):
+        self.assertSameBytes('/api/brands/?fields=id,name,logo')
+        self.assertSameBytes('/api/founders/?fields=name,photo')
+
+    def test_cursor_pages(self):
+        url = '/api/brands/?page_size=2'
+        while url:
+            self.assertSameBytes(url)
+            url = self.client.get(url).json()['next']
+
+    def test_async_views(self):
+        factory = AsyncRequestFactory()
+        for view, url in (
+            (async_views.brand_list, '/api/brands/'),
+            (async_views.brand_list, '/api/brands/?fields=id,name'),
+            (async_views.founder_list, '/api/founders/'),
+        ):
+            expected = self.fetch(url, False)
+            caches['api'].clear()
+            response = async_to_sync(view)(factory.get(url, REMOTE_ADDR='192.0.2.2'))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.content, expected, url)
+
+
+@api_settings
+class PaginationTests(APITestMixin, TestCase):
+    def test_ties_on_order_are_paged_by_id(self):
+        brands = [make_brand('Tied %d' % i, 0) for i in range(5)] + [make_brand('Last', 1)]
+        expected = [brand.pk for brand in brands]
+
+        seen, url = [], '/api/brands/?page_size=2'
+        while url:
+            page = self.client.get(url).json()
+            seen += [row['id'] for row in page['results']]
+            url = page['next']
+        self.assertEqual(seen, expected)
+
+        previous = self.client.get('/api/brands/?page_size=2').json()['next']
+        previous = self.client.get(previous).json()['previous']
+        page = self.client.get(previous).json()
+        self.assertEqual([row['id'] for row in page['results']], expected[:2])
+        self.assertIsNone(page['previous'])
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get('/api/brands/?cursor=nonsense').status_code, 404)
+
+
+@api_settings
+class ChangeFeedTests(APITestMixin, TransactionTestCase):
+    # Committed writes, read back through the replica like in production.
+    databases = {'default', 'replica'}
+
+    def feed(self, since=None):
+        url = '/api/changes/' if since is None else '/api/changes/?since=%d' % since
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_since_and_tombstones(self):
+        with transaction.atomic():
+            alpha = make_brand('Alpha', 1)
+            beta = make_brand('Beta', 2)
+        start = self.feed()
+        self.assertFalse(start['reset'])
+        self.assertCountEqual([row['id'] for row in start['brands']], [alpha.pk, beta.pk])
+
+        with transaction.atomic():
+            alpha.name = 'Alpha Two'
+            alpha.save()
+        with transaction.atomic():
+            beta_pk = beta.pk
+            beta.delete()
+
+        changes = self.feed(start['revision'])
+        self.assertEqual(changes['revision'], start['revision'] + 2)
+        self.assertEqual([row['name'] for row in changes['brands']], ['Alpha Two'])
+        self.assertEqual(changes['deleted'], {'brands': [beta_pk], 'founders': []})
+
+        latest = self.feed(changes['revision'])
+        self.assertEqual((latest['brands'], latest['deleted']['brands']), ([], []))
+
+    def test_reset(self):
+        make_brand('Alpha', 1)
+        since = self.feed()['revision']
+        with transaction.atomic():
+            with per_row_receivers_muted():
+                Brand.objects.all().delete()
+            record_reset()
+            gamma = make_brand('Gamma', 1)
+
+        changes = self.feed(since)
+        self.assertTrue(changes['reset'])
+        self.assertEqual([row['id'] for row in changes['brands']], [gamma.pk])
+        self.assertEqual(changes['deleted']['brands'], [])
+        self.assertFalse(self.feed(changes['revision'])['reset'])
+
+    def test_since_validation(self):
+        self.assertEqual(self.client.get('/api/changes/?since=-1').status_code, 400)
+        head = self.feed()['revision']
+        self.assertEqual(self.client.get('/api/changes/?since=%d' % (head + 1)).status_code, 400)
+
+
+@api_settings
+class ThrottleTests(APITestMixin, TestCase):
+    @mock.patch.object(AnonTokenBucketThrottle, 'THROTTLE_RATES', {'anon': '2/min'})
+    def test_burst_then_429(self):
+        statuses = [self.client.get('/api/founders/').status_code for _ in range(3)]
+        self.assertEqual(statuses, [200, 200, 429])
+        response = self.client.get('/api/founders/')
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(1 <= int(response['Retry-After']) <= 30)
+
+        other = Client(REMOTE_ADDR='192.0.2.99')
+        self.assertEqual(other.get('/api/founders/').status_code, 200)
+
+    @mock.patch.object(AnonTokenBucketThrottle, 'THROTTLE_RATES', {'anon': '1/min'})
+    def test_forwarded_for_is_ignored_without_proxies(self):
+        self.client.get('/api/founders/', HTTP_X_FORWARDED_FOR='203.0.113.1')
+        response = self.client.get('/api/founders/', HTTP_X_FORWARDED_FOR='203.0.113.2')
+        self.assertEqual(response.status_code, 429)
+
+
+@api_settings
+class MetricsTests(APITestMixin, TestCase):
+    def series(self, route):
+        return {labels[1:]: values['count'] for labels, values in registry.series.items() if labels[0] == route}
+
+    def test_method_label(self):
+        before = self.series('founder-list')
+        self.client.get('/api/founders/')
+        self.client.generic('BREW', '/api/founders/')
+        after = self.series('founder-list')
+        self.assertEqual(after[('GET', '200')], before.get(('GET', '200'), 0) + 1)
+        self.assertEqual(after[('other', '405')], before.get(('other', '405'), 0) + 1)
+        self.assertNotIn(('BREW', '405'), after)
+
+    def test_flush_and_collect(self):
+        self.client.get('/api/founders/')
+        registry.flush()
+        root = settings.METRICS_ROOT
+        self.assertTrue(os.path.exists(os.path.join(root, '%d.json' % os.getpid())))
+
+        # A recycled worker's counters are folded into the archive.
+        process = subprocess.Popen(['true'])
+        process.wait()
+        labels = ('founder-list', 'GET', '200')
+        with open(os.path.join(root, '%d.json' % process.pid), 'w') as f:
+            json.dump({'requests': [dict(registry.series[labels], labels=list(labels))], 'pools': {}}, f)
+        own = registry.series[labels]['count']
+        series, _ = collect()
+        self.assertEqual(series[labels]['count'], own * 2)
+        self.assertFalse(os.path.exists(os.path.join(root, '%d.json' % process.pid)))
+        self.assertEqual(collect()[0][labels]['count'], own * 2)
+
+        response = self.client.get('/api/metrics/')
+        self.assertEqual(response['Cache-Control'], 'no-store')
+        self.assertIn(b'api_request_duration_seconds_count{route="founder-list",method="GET",status="200"}', response.content)
+
+    def test_server_timing(self):
+        self.assertNotIn('Server-Timing', self.client.get('/api/founders/'))
+        with self.settings(METRICS_SERVER_TIMING=True):
+            self.assertIn('db;dur=', self.client.get('/api/founders/')['Server-Timing'])
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_token(self):
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 403)
+        response = self.client.get('/api/metrics/', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+
+
+@api_settings
+class StorageTests(APITestMixin, TestCase):
+    def age(self, path, seconds=2 * 3600):
+        stamp = os.stat(path).st_mtime - seconds
+        os.utime(path, (stamp, stamp))
+        return os.stat(path).st_mtime
+
+    def test_dedupe(self):
+        body = png('purple')
+        name = default_storage.save('brands/logos/first.png', ContentFile(body))
+        self.assertTrue(is_content_addressed(name))
+        self.assertEqual(default_storage.save('brands/logos/second.PNG', ContentFile(body)), name)
+        self.assertNotEqual(default_storage.save('brands/logos/third.png', ContentFile(png('teal'))), name)
+
+        # An upload of existing bytes protects the file from collection.
+        old = self.age(default_storage.path(name))
+        default_storage.save('brands/logos/again.png', ContentFile(body))
+        self.assertGreater(os.stat(default_storage.path(name)).st_mtime, old)
+
+        os.unlink(default_storage.path(name))
+        self.assertEqual(default_storage.save('brands/logos/back.png', ContentFile(body)), name)
+        with default_storage.open(name) as f:
+            self.assertEqual(f.read(), body)
+
+    def test_rows_share_files(self):
+        a, b = make_brand('Alpha', 1, 'olive'), make_brand('Beta', 2, 'olive')
+        self.assertEqual(a.logo.name, b.logo.name)
+        self.assertEqual(a.hero_image.name, b.hero_image.name)
+
+    def test_collect_media_garbage(self):
+        brand = make_brand('Alpha', 1, 'navy')
+        process_source(brand.logo.path, [4], ['webp'])
+        # Referenced files are kept however old they are.
+        self.age(brand.logo.path)
+        orphan = default_storage.path(default_storage.save('brands/logos/x.png', ContentFile(png('maroon'))))
+        young = default_storage.path(default_storage.save('brands/logos/y.png', ContentFile(png('lime'))))
+        self.age(orphan)
+
+        digest = get_derivatives(brand.logo)['digest']
+        current = derivative_dir(digest)
+        stale = derivative_root(digest) / '000000000000'
+        unreferenced = derivative_root('cd' + '0' * 62)
+        for directory in (stale, unreferenced / encoder_version()):
+            directory.mkdir(parents=True)
+            (directory / '4.webp').write_bytes(b'x')
+        for directory in (current, stale, unreferenced):
+            self.age(directory)
+
+        call_command('collect_media_garbage', '--dry-run', stdout=io.StringIO())
+        self.assertTrue(os.path.exists(orphan) and stale.exists() and unreferenced.exists())
+
+        out = io.StringIO()
+        call_command('collect_media_garbage', stdout=out)
+        self.assertIn('Freed', out.getvalue())
+        self.assertFalse(os.path.exists(orphan))
+        self.assertFalse(stale.exists() or unreferenced.exists())
+        for path in (brand.logo.path, brand.hero_image.path, young, current / 'manifest.json'):
+            self.assertTrue(os.path.exists(path), path)
+        self.assertIsNotNone(get_derivatives(brand.logo))
+
+
+@api_settings
+class CompressionTests(APITestMixin, TestCase):
+    body = json.dumps([{'name': 'Brand %d' % i, 'status': 'live'} for i in range(100)]).encode()
+
+    def compress(self, accept, response=None, **meta):
+        if response is None:
+            response = HttpResponse(self.body, content_type='application/json')
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept, **meta)
+        return compress_response(request, response)
+
+    def test_parse_accept_encoding(self):
+        self.assertEqual(parse_accept_encoding('gzip, br;q=0.5, zstd;q=0, identity;q=bad, '), {'gzip', 'br'})
+        self.assertEqual(parse_accept_encoding('GZIP ; q=1.0'), {'gzip'})
+        self.assertEqual(parse_accept_encoding(''), set())
+
+    @skipUnless(brotli, 'brotli is not installed')
+    def test_negotiation(self):
+        self.assertEqual(self.compress('gzip, br')['Content-Encoding'], 'br')
+        self.assertEqual(self.compress('gzip, br;q=0')['Content-Encoding'], 'gzip')
+        self.assertEqual(self.compress('*')['Content-Encoding'], list(ENCODERS)[0])
+        response = self.compress('br')
+        self.assertEqual(brotli.decompress(response.content), self.body)
+        self.assertEqual(response['Content-Length'], str(len(response.content)))
+
+    def test_gzip(self):
+        response = self.compress('gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), self.body)
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+    def test_not_compressed(self):
+        response = self.compress('identity')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        # Still varies: another client would get a compressed body.
+        self.assertEqual((response.content, response['Vary']), (self.body, 'Accept-Encoding'))
+
+        cases = [
+            HttpResponse(b'{}' * 10, content_type='application/json'),
+            HttpResponse(self.body, content_type='image/png'),
+            HttpResponse(self.body, content_type='application/octet-stream'),
+            HttpResponse(self.body, content_type='application/json', status=206),
+            HttpResponse(self.body, headers={'Cache-Control': 'no-transform'}),
+            HttpResponse(self.body, headers={'Content-Encoding': 'br'}),
+        ]
+        for response in cases:
+            content = response.content
+            response = self.compress('gzip, br', response)
+            self.assertEqual(response.content, content, response)
+            self.assertNotEqual(response.get('Content-Encoding'), 'gzip', response)
+
+    def test_weak_etag(self):
+        response = HttpResponse(self.body, content_type='application/json', headers={'ETag': '"v1"'})
+        response = self.compress('gzip', response)
+        self.assertEqual(response['ETag'], 'W/"v1"')
+        # The same representation is encoded once and then read from the cache.
+        with mock.patch.dict(ENCODERS, gzip=mock.Mock(side_effect=AssertionError)):
+            again = HttpResponse(self.body, content_type='application/json', headers={'ETag': '"v1"'})
+            self.assertEqual(self.compress('gzip', again).content, response.content)
+
+        weak = HttpResponse(self.body, content_type='application/json', headers={'ETag': 'W/"v1"'})
+        self.assertEqual(self.compress('gzip', weak)['ETag'], 'W/"v1"')
+
+    def test_per_user_responses_get_padded_gzip(self):
+        private = HttpResponse(self.body, content_type='application/json', headers={'Cache-Control': 'private'})
+        response = self.compress('br, gzip', private)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), self.body)
+
+        csrf = HttpResponse(self.body, content_type='text/html')
+        response = self.compress('br', csrf, CSRF_COOKIE_NEEDS_UPDATE=True)
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_api_response(self):
+        for i in range(20):
+            make_brand('Brand %d' % i, i)
+        plain = self.client.get('/api/brands/')
+        response = self.client.get('/api/brands/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertEqual(response['ETag'], 'W/' + plain['ETag'])
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+        for etag in (response['ETag'], plain['ETag']):
+            revalidated = self.client.get('/api/brands/', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(revalidated.status_code, 304)
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class PoolTests(SimpleTestCase):
+    def pool(self, **options):
+        self.opened = []
+        return ConnectionPool('test', {'TIMEOUT': 0.05, **options})
+
+    def connect(self):
+        self.opened.append(FakeConnection())
+        return self.opened[-1]
+
+    def ping(self, conn):
+        pass
+
+    def test_reuse(self):
+        pool = self.pool()
+        entry = pool.acquire(self.connect, self.ping)
+        pool.release(entry)
+        self.assertIs(pool.acquire(self.connect, self.ping), entry)
+        self.assertEqual((len(self.opened), entry.checkouts), (1, 2))
+        self.assertEqual(pool.snapshot()['in_use'], 1)
+
+    def test_discard(self):
+        pool = self.pool(MAX_SIZE=1)
+        entry = pool.acquire(self.connect, self.ping)
+        pool.discard(entry)
+        self.assertTrue(entry.connection.closed)
+        self.assertIsNot(pool.acquire(self.connect, self.ping), entry)
+        self.assertEqual(pool.snapshot()['closed'], 1)
+
+    def test_timeout(self):
+        pool = self.pool(MAX_SIZE=1)
+        entry = pool.acquire(self.connect, self.ping)
+        with self.assertRaises(PoolTimeout):
+            pool.acquire(self.connect, self.ping)
+        stats = pool.snapshot()
+        self.assertEqual((stats['waits'], stats['timeouts']), (1, 1))
+
+        # A waiter gets the connection as soon as it is released.
+        pool.options['TIMEOUT'] = 5
+        threading.Timer(0.05, pool.release, [entry]).start()
+        self.assertIs(pool.acquire(self.connect, self.ping), entry)
+
+    def test_failed_connect_frees_the_slot(self):
+        pool = self.pool(MAX_SIZE=1)
+        with self.assertRaises(OSError):
+            pool.acquire(mock.Mock(side_effect=OSError), self.ping)
+        pool.acquire(self.connect, self.ping)
+
+    def test_expiry(self):
+        pool = self.pool(MAX_IDLE=10, MAX_LIFETIME=100)
+        idle, old = pool.acquire(self.connect, self.ping), pool.acquire(self.connect, self.ping)
+        pool.release(idle)
+        pool.release(old)
+        idle.last_used -= 11
+        old.created -= 101
+        entry = pool.acquire(self.connect, self.ping)
+        self.assertNotIn(entry, (idle, old))
+        self.assertTrue(idle.connection.closed and old.connection.closed)
+        self.assertEqual(pool.snapshot()['closed'], 2)
+
+    def test_health_check(self):
+        pool = self.pool(HEALTH_CHECK_AFTER=10)
+        entry = pool.acquire(self.connect, self.ping)
+        pool.release(entry)
+        ping = mock.Mock()
+        pool.acquire(self.connect, ping)
+        ping.assert_not_called()
+
+        pool.release(entry)
+        entry.last_used -= 11
+        ping.side_effect = OSError
+        self.assertIsNot(pool.acquire(self.connect, ping), entry)
+        ping.assert_called_once_with(entry.connection)
+        self.assertTrue(entry.connection.closed)
+        self.assertEqual(pool.snapshot()['health_check_failures'], 1)
+
+    def test_close_idle(self):
+        pool = self.pool()
+        entry = pool.acquire(self.connect, self.ping)
+        pool.release(entry)
+        pool.close_idle()
+        self.assertTrue(entry.connection.closed)
+        self.assertEqual((pool.snapshot()['idle'], pool.size), (0, 0))
+
+    def test_fork_starts_empty(self):
+        get_pool('test', {'NAME': 'fork'})
+        self.assertIn('test', pool_stats())
+        pid = os.fork()
+        if pid == 0:
+            os._exit(0 if 'test' not in pool_stats() else 1)
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+        self.assertIn('test', pool_stats())
+
+
+@api_settings
+class PooledConnectionTests(APITestMixin, TransactionTestCase):
+    databases = {'default', 'replica'}
+
+    def release(self):
+        # close() is a no-op on the in-memory test database.
+        connection._close()
+        connection.connection = None
+
+    def test_connections_are_returned(self):
+        connection.ensure_connection()
+        raw, pool = connection.connection, connection.connection_pool
+        in_use = pool.snapshot()['in_use']
+        self.release()
+        self.assertEqual(pool.snapshot()['in_use'], in_use - 1)
+        connection.ensure_connection()
+        self.assertIs(connection.connection, raw)
+
+    def test_open_transactions_are_rolled_back(self):
+        brand = make_brand('Alpha', 1)
+        connection.ensure_connection()
+        connection.set_autocommit(False)
+        Brand.objects.filter(pk=brand.pk).update(name='Beta')
+        self.release()
+        connection.ensure_connection()
+        self.assertTrue(connection.get_autocommit())
+        self.assertEqual(Brand.objects.get(pk=brand.pk).name, 'Alpha')
+
+    def test_warm_statements_read_one_row(self):
+        self.assertTrue(all(sql.endswith('LIMIT 1') for sql, _ in list_statements(connection)))
+
+
+@api_settings
+class BenchmarkTests(APITestMixin, TransactionTestCase):
+    # The in-process run captures the queries of every alias.
+    databases = {'default', 'replica'}
+
+    def result(self, **values):
+        return {
+            'size': 100, 'mode': 'in-process', 'endpoint': '/api/brands/', 'cache': 'warm',
+            'requests_per_second': 1000.0, 'p95_ms': 2.0, 'peak_rss_mib': 80.0, 'queries_per_request': 1.0,
+            **values,
+        }
+
+    def test_in_process(self):
+        make_brand('Alpha', 1)
+        out = io.StringIO()
+        call_command('benchmark_api', '--in-process', '--endpoints', '/api/brands/', '--requests', '3', stdout=out)
+        cold, warm = json.loads(out.getvalue())
+        self.assertEqual((cold['cache'], warm['cache']), ('cold', 'warm'))
+        self.assertEqual(cold['requests'], 3)
+        self.assertGreater(cold['queries_per_request'], warm['queries_per_request'])
+        self.assertLessEqual(cold['p50_ms'], cold['p99_ms'])
+
+    def test_compare(self):
+        baseline = {'results': [self.result(), self.result(cache='cold')]}
+        compare = BenchmarkCommand().compare
+        within = [self.result(requests_per_second=900.0, p95_ms=2.2), self.result(size=1000, p95_ms=99.0)]
+        self.assertEqual(compare(within, baseline, 0.15), [])
+
+        regressions = compare(
+            [self.result(requests_per_second=800.0, p95_ms=2.5, queries_per_request=2.0)], baseline, 0.15,
+        )
+        self.assertEqual(regressions, [
+            '100 in-process /api/brands/ warm: requests_per_second 1000.0 -> 800.0',
+            '100 in-process /api/brands/ warm: p95_ms 2.0 -> 2.5',
+            '100 in-process /api/brands/ warm: queries_per_request 1.0 -> 2.0',
+        ])
+
+    def test_parse_prometheus(self):
+        text = '\n'.join([
+            '# TYPE api_db_queries_total counter',
+            'api_db_queries_total{route="brand-list",method="GET",status="200"} 6',
+            'api_db_queries_total{route="brand-list",method="HEAD",status="200"} 2',
+            'api_db_queries_total{route="founder-list",method="GET",status="304"} 1.5',
+            'api_db_queries_total_other{route="brand-list",method="GET",status="200"} 9',
+        ])
+        self.assertEqual(parse_prometheus(text, 'api_db_queries_total'), {'brand-list': 8.0, 'founder-list': 1.5})
+
+    def test_percentile(self):
+        values = [0.001 * i for i in range(1, 101)]
+        self.assertEqual((percentile(values, 0.5), percentile(values, 0.99)), (values[50], values[98]))
+        self.assertEqual(percentile([], 0.95), 0.0)
+
+
+@api_settings
+class MediaTests(APITestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.body = bytes(range(256)) * 4
+        os.makedirs(MEDIA_ROOT, exist_ok=True)
+        with open(os.path.join(MEDIA_ROOT, 'range.bin'), 'wb') as f:
+            f.write(self.body)
+        self.url = '/media/range.bin'
+
+    def get(self, **headers):
+        response = self.client.get(self.url, **headers)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, body
+
+    def test_range(self):
+        response, body = self.get(HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/1024')
+        self.assertEqual(body, self.body[10:20])
+
+        response, body = self.get(HTTP_RANGE='bytes=-4')
+        self.assertEqual((response.status_code, body), (206, self.body[-4:]))
+
+    def test_unsatisfiable_range(self):
+        response, _ = self.get(HTTP_RANGE='bytes=2000-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */1024')
+
+    def test_if_range(self):
+        etag = self.get()[0]['ETag']
+        response, body = self.get(HTTP_RANGE='bytes=0-3', HTTP_IF_RANGE=etag)
+        self.assertEqual((response.status_code, body), (206, self.body[:4]))
+
+        response, body = self.get(HTTP_RANGE='bytes=0-3', HTTP_IF_RANGE='"stale"')
+        self.assertEqual((response.status_code, body), (200, self.body))
+
+    def test_cache_headers(self):
+        immutable = 'public, max-age=31536000, immutable'
+        digest = 'ab' + '0' * 62
+        names = {
+            'brands/logos/ab/%s.png' % digest: immutable,
+            'derivatives/ab/%s/0123456789ab/320.webp' % digest: immutable,
+            # Rewritten by --force, and the layout before encoder versions.
+            'derivatives/ab/%s/0123456789ab/manifest.json' % digest: 'public, max-age=3600',
+            'derivatives/ab/%s/320.webp' % digest: 'public, max-age=3600',
+            'brands/logos/logo.png': 'public, max-age=3600',
+        }
+        for name, expected in names.items():
+            path = os.path.join(MEDIA_ROOT, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(b'x')
+            response = self.client.get('/media/' + name)
+            self.assertEqual(response['Cache-Control'], expected, name)
+            response = self.client.get('/media/' + name, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual((response.status_code, response['Cache-Control']), (304, expected), name)
+
+    def test_outside_media_root(self):
+        for name in ('../manage.py', '/etc/passwd', 'a\x00b'):
+            with self.assertRaises(Http404):
+                resolve_media_path(name)
+
+
+@api_settings
+class ReorderTests(APITestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.brands = [make_brand('Brand %d' % i, i) for i in range(3)]
+        self.admin = get_user_model().objects.create_user('staff', password='x', is_staff=True)
+        self.client.force_login(self.admin)
+
+    def reorder(self, ids):
+        return self.client.post('/api/brands/reorder/', {'ids': ids}, content_type='application/json')
+
+    def test_reorder(self):
+        a, b, c = (brand.pk for brand in self.brands)
+        response = self.reorder([c, a, b])
+        self.assertEqual(response.json(), {'moved': 3})
+        self.assertEqual(list(Brand.objects.order_by('order').values_list('pk', flat=True)), [c, a, b])
+
+    def test_validation(self):
+        pk = self.brands[0].pk
+        for ids in ([], [pk, pk], [0], 'nope', [pk, 999999]):
+            self.assertEqual(self.reorder(ids).status_code, 400, ids)
+        self.assertEqual(list(Brand.objects.order_by('order').values_list('pk', flat=True)),
+                         [brand.pk for brand in self.brands])
+
+    def test_staff_only(self):
+        self.client.logout()
+        self.assertEqual(self.reorder([self.brands[0].pk]).status_code, 403)
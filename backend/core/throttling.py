@@ -0,0 +1,80 @@
+"""
+Token-bucket throttling for anonymous API traffic.
+
+DRF's SimpleRateThrottle keeps a timestamp per request in the cache and
+rejects everything once a window fills. A token bucket holds two numbers per
+client instead: a client may burst up to N requests, then gets one more every
+period / N seconds. A visitor loading a page in one burst is never slowed,
+while a scraper settles at the sustained rate.
+
+Buckets live in ``settings.API_THROTTLE_CACHE_ALIAS``. The default locmem
+cache is per process, so each worker enforces the rate on its own; point the
+alias at a shared cache to enforce it across workers.
+"""
+import math
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import SimpleRateThrottle
+
+# WSGI environ key set on requests the app renders for itself (static
+# export, warm-up), which are never throttled. Header-derived keys all start
+# with HTTP_, so clients cannot set it.
+INTERNAL_REQUEST = 'core.internal_request'
+
+_buckets_lock = threading.Lock()
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    ``DEFAULT_THROTTLE_RATES[scope]`` of ``"N/period"`` allows bursts of N
+    requests, refilled at N per period.
+    """
+    cache_format = 'core:throttle:%(scope)s:%(ident)s'
+
+    def __init__(self):
+        super().__init__()
+        self.cache = caches[settings.API_THROTTLE_CACHE_ALIAS]
+        self.tokens = None
+
+    def refill_rate(self):
+        return self.num_requests / self.duration
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        capacity, refill = self.num_requests, self.refill_rate()
+        self.now = self.timer()
+        with _buckets_lock:
+            tokens, updated = self.cache.get(self.key, (capacity, self.now))
+            tokens = min(capacity, tokens + (self.now - updated) * refill)
+            if tokens < 1:
+                self.tokens = tokens
+                return False
+            self.tokens = tokens - 1
+            # An expired bucket reads as a full one, which it would be by then.
+            timeout = math.ceil((capacity - self.tokens) / refill)
+            self.cache.set(self.key, (self.tokens, self.now), timeout)
+        return True
+
+    def wait(self):
+        if self.tokens is None or self.tokens >= 1:
+            return None
+        return (1 - self.tokens) / self.refill_rate()
+
+
+class AnonTokenBucketThrottle(TokenBucketThrottle):
+    """Throttle unauthenticated clients by IP, under the ``anon`` rate."""
+    scope = 'anon'
+
+    def get_cache_key(self, request, view):
+        if request.META.get(INTERNAL_REQUEST):
+            return None
+        if request.user and request.user.is_authenticated:
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
@@ -1,11 +1,30 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import BrandViewSet, FounderViewSet
+from .views import BrandViewSet, ChangeFeedView, FounderViewSet, changes_stream, landing_snapshot, prometheus_metrics
 
 router = DefaultRouter()
 router.register(r'brands', BrandViewSet)
 router.register(r'founders', FounderViewSet)
 
 urlpatterns = [
+    path('snapshot/', landing_snapshot, name='landing-snapshot'),
+    path('metrics/', prometheus_metrics, name='metrics'),
+    path('changes/', ChangeFeedView.as_view(), name='changes'),
+    path('changes/stream/', changes_stream, name='changes-stream'),
+]
+
+if settings.API_ASYNC_VIEWS:
+    from . import async_views
+
+    # Same URL names as the router, so reverse() keeps working.
+    urlpatterns += [
+        path('brands/', async_views.brand_list, name='brand-list'),
+        path('brands/<int:pk>/', async_views.brand_detail, name='brand-detail'),
+        path('founders/', async_views.founder_list, name='founder-list'),
+        path('founders/<int:pk>/', async_views.founder_detail, name='founder-detail'),
+    ]
+
+urlpatterns += [
     path('', include(router.urls)),
 ]
@@ -1,11 +1,195 @@
-from rest_framework import viewsets
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_safe
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from .bulk import reorder
+from .cache import CachedResponseMixin, set_validators
+from .changes import astream_changes, changes_between, feed_state, parse_since, stream_changes
+from .compression import negotiate_encoding
+from .db import replica_reads
+from .fastpath import compile_serializer, fast_path_enabled
+from .media import media_response
+from .filters import BrandFilterBackend, BrandSearchFilter
+from .metrics import render_metrics, timed_serialization
 from .models import Brand, Founder
-from .serializers import BrandSerializer, FounderSerializer
+from .pagination import OrderKeysetPagination
+from .serializers import BrandSerializer, FounderSerializer, ReorderSerializer, requested_fields
+from .snapshot import get_snapshot
 
-class BrandViewSet(viewsets.ReadOnlyModelViewSet):
+class ReplicaReadMixin:
+    """Read through the read-only replica connection (see core.db)."""
+
+    def dispatch(self, request, *args, **kwargs):
+        with replica_reads():
+            return super().dispatch(request, *args, **kwargs)
+
+class SparseQuerysetMixin:
+    """With ``?fields=``, only load the columns the serializer will output."""
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if requested_fields(self.request) is None:
+            return queryset
+        columns = {f.name for f in queryset.model._meta.concrete_fields}
+        sources = {field.source.split('.')[0] for field in self.get_serializer().fields.values()}
+        # Pagination orders and filters on these, keep them loaded.
+        return queryset.only('id', 'order', *(sources & columns))
+
+class FastListMixin:
+    """
+    Serve ``list`` through the compiled serializer (see core.fastpath) when
+    API_FAST_SERIALIZER is on and the serializer can be compiled.
+    """
+
+    def get_compiled_serializer(self):
+        if not fast_path_enabled(self.request):
+            return None
+        ordering = getattr(self.pagination_class, 'ordering', ())
+        return compile_serializer(self.get_serializer(), extra_columns=ordering)
+
+    def list(self, request, *args, **kwargs):
+        compiled = self.get_compiled_serializer()
+        if compiled is None:
+            return super().list(request, *args, **kwargs)
+
+        rows = self.filter_queryset(self.get_queryset()).values(*compiled.columns)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(compiled.to_representation(page))
+        return HttpResponse(compiled.render(rows), content_type='application/json')
+
+class ReorderMixin:
+    """
+    ``POST <list>/reorder/ {"ids": [...]}`` for staff: put the rows in that
+    sequence in one bulk write (see core.bulk.reorder), e.g. after a
+    drag-and-drop in an admin UI.
+    """
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAdminUser], serializer_class=ReorderSerializer)
+    def reorder(self, request):
+        serializer = ReorderSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        model = self.queryset.model
+        try:
+            moved = reorder(model, serializer.validated_data['ids'])
+        except model.DoesNotExist as exc:
+            return Response({'ids': [str(exc)]}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'moved': moved})
+
+class BrandViewSet(ReplicaReadMixin, CachedResponseMixin, SparseQuerysetMixin, FastListMixin, ReorderMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Brand.objects.all()
     serializer_class = BrandSerializer
+    pagination_class = OrderKeysetPagination
+    filter_backends = [BrandFilterBackend, BrandSearchFilter]
 
-class FounderViewSet(viewsets.ReadOnlyModelViewSet):
+class FounderViewSet(ReplicaReadMixin, CachedResponseMixin, SparseQuerysetMixin, FastListMixin, ReorderMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Founder.objects.all()
     serializer_class = FounderSerializer
+    pagination_class = OrderKeysetPagination
+
+class ChangeFeedView(ReplicaReadMixin, CachedResponseMixin, APIView):
+    """
+    ``GET /api/changes/?since=<revision>``: the brands and founders written
+    after ``since``, the ids deleted since, and the ``revision`` to send as
+    ``since`` next time (see core.changes). Without ``since`` every row is
+    returned. When the data was replaced after ``since``, ``reset`` is true
+    and every row is returned; the client replaces its copy. Responses are
+    cached per content version like the list views.
+    """
+    cache_models = (Brand, Founder)
+    serializer_classes = {'brands': BrandSerializer, 'founders': FounderSerializer}
+
+    def get(self, request):
+        return self.cached_response(request, self.feed)
+
+    def feed(self, request):
+        since = parse_since(request.query_params.get('since', 0))
+        if since is None:
+            return Response({'since': ['Expected a non-negative integer revision.']}, status=status.HTTP_400_BAD_REQUEST)
+        head, reset_revision = feed_state()
+        if since > head:
+            return Response(
+                {'since': ['Revision %d is ahead of the feed (%d), sync again from 0.' % (since, head)]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        reset = since < reset_revision
+        if reset:
+            since = 0
+        rows, deleted = changes_between(since, head)
+        data = {'revision': head, 'reset': reset}
+        for key, queryset in rows.items():
+            data[key] = self.serialize(self.serializer_classes[key], queryset)
+        data['deleted'] = deleted
+        return Response(data)
+
+    def serialize(self, serializer_class, queryset):
+        context = {'request': self.request}
+        compiled = None
+        if fast_path_enabled(self.request):
+            compiled = compile_serializer(serializer_class(context=context))
+        if compiled is None:
+            return serializer_class(queryset, many=True, context=context).data
+        return compiled.to_representation(queryset.values(*compiled.columns))
+
+@require_safe
+def changes_stream(request):
+    """
+    Server-sent ``change`` events carrying each new revision, so clients can
+    fetch ``/api/changes/`` as soon as something changed instead of polling
+    it. Resumes from ``Last-Event-ID`` or ``?since=``.
+    """
+    if not settings.CHANGES_STREAM:
+        raise Http404('The change stream is disabled.')
+    since = parse_since(request.headers.get('Last-Event-ID') or request.GET.get('since', 0))
+    if since is None:
+        return HttpResponseBadRequest('Expected a non-negative integer revision.')
+    if isinstance(request, ASGIRequest):
+        events = astream_changes(since)
+    else:
+        events = stream_changes(since)
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Let nginx pass events through as they are written.
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+@require_safe
+def landing_snapshot(request):
+    with replica_reads(), timed_serialization():
+        snapshot = get_snapshot(request)
+    coding = negotiate_encoding(request, [c for c in snapshot.bodies if c is not None])
+
+    response = HttpResponse(snapshot.bodies[coding], content_type='application/json')
+    etag = snapshot.etag
+    if coding:
+        response['Content-Encoding'] = coding
+        # Same rule as CompressionMiddleware: a strong validator names one
+        # representation, the encoded bodies only get a weak one.
+        etag = 'W/' + etag
+    patch_vary_headers(response, ('Accept-Encoding',))
+    set_validators(response, etag, snapshot.version)
+    return get_conditional_response(
+        request, etag=etag, last_modified=int(snapshot.version.last_modified),
+        response=response,
+    )
+
+@require_safe
+def serve_media(request, path):
+    return media_response(request, path)
+
+@require_safe
+def prometheus_metrics(request):
+    if settings.METRICS_TOKEN:
+        expected = 'Bearer %s' % settings.METRICS_TOKEN
+        if not constant_time_compare(request.headers.get('Authorization', ''), expected):
+            return HttpResponseForbidden()
+    response = HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+    response['Cache-Control'] = 'no-store'
+    return response
@@ -0,0 +1,93 @@
+"""
+Process warm-up, run once in the gunicorn master before workers fork.
+
+Touching the ORM and rendering the list endpoints imports every module on the
+request path, fills Django's per-process caches (URL resolvers, model and
+serializer metadata, compiled SQL) and the in-memory landing snapshot, and
+stores the rendered responses in the shared API cache. With ``preload_app``
+each forked worker inherits all of that copy-on-write.
+
+``warm_statements`` does the per-connection part: core.db runs it on every
+new pooled connection the API reads through.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.urls import resolve
+
+from .export import _make_request, render_endpoint
+from .models import Brand, Founder
+from .pool import close_pools
+from .views import BrandViewSet, FounderViewSet, landing_snapshot
+
+logger = logging.getLogger(__name__)
+
+
+def iter_warmup_endpoints():
+    yield '/api/snapshot/', landing_snapshot
+    yield '/api/brands/', BrandViewSet.as_view({'get': 'list'})
+    yield '/api/founders/', FounderViewSet.as_view({'get': 'list'})
+
+
+def warm_up(base_url=None):
+    """Prime the ORM and response caches; return the number of endpoints rendered."""
+    started = time.perf_counter()
+    base_url = base_url or settings.WARMUP_BASE_URL
+    rendered = 0
+    try:
+        # Populates the URL resolver caches.
+        resolve('/api/brands/')
+        for model in (Brand, Founder):
+            model.objects.order_by('order', 'id').first()
+        for path, view in iter_warmup_endpoints():
+            render_endpoint(base_url, path, view, {})
+            rendered += 1
+    except Exception:
+        # A missing table or a broken row must not keep the server from booting.
+        logger.exception('Warm-up failed after %d endpoints', rendered)
+    finally:
+        # Connections must not be shared with forked workers.
+        connections.close_all()
+        close_pools()
+    logger.info('Warmed %d endpoints in %.0f ms', rendered, (time.perf_counter() - started) * 1000)
+    return rendered
+
+
+_list_statements = {}
+
+
+def list_statements(connection):
+    """
+    SQL and params of the plain ``GET /api/brands/`` and ``/api/founders/``
+    list queries, built by the viewsets themselves so they read the same
+    tables, columns and index, limited to one row.
+    """
+    statements = _list_statements.get(connection.vendor)
+    if statements is None:
+        statements = []
+        for path, viewset in (('/api/brands/', BrandViewSet), ('/api/founders/', FounderViewSet)):
+            view = viewset(action_map={'get': 'list'}, args=(), kwargs={}, headers={})
+            view.request = view.initialize_request(_make_request(settings.WARMUP_BASE_URL, path))
+            view.initial(view.request)
+            compiled = view.get_compiled_serializer()
+            queryset = view.filter_queryset(view.get_queryset())
+            if compiled is not None:
+                queryset = queryset.values(*compiled.columns)
+            statements.append(queryset[:1].query.get_compiler(connection=connection).as_sql())
+        _list_statements[connection.vendor] = statements
+    return statements
+
+
+def warm_statements(connection):
+    """
+    Read the first row of each list query on ``connection``. That loads what
+    every query on a new connection pays for once (SQLite parses the schema,
+    PostgreSQL fills its catalog caches) and the first index and table pages
+    of the lists, without reading the whole tables on every connection.
+    """
+    with connection.cursor() as cursor:
+        for sql, params in list_statements(connection):
+            cursor.execute(sql, params)
+            cursor.fetchall()
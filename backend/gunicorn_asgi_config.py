@@ -0,0 +1,10 @@
+# ASGI profile: gunicorn -c gunicorn_asgi_config.py config.asgi:application
+import os
+
+pythonpath = os.environ.get('GUNICORN_PYTHONPATH', os.path.dirname(os.path.abspath(__file__)))
+bind = '0.0.0.0:8000'
+workers = 3
+worker_class = 'uvicorn_worker.UvicornWorker'
+# Idle keep-alive connections cost an event loop almost nothing, unlike a
+# sync worker, so hold them open long enough for the landing page's bursts.
+keepalive = 30
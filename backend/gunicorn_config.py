@@ -1,4 +1,61 @@
-command = '/home/jimit/alevate-spaces-landing/backend/venv/bin/gunicorn'
-pythonpath = '/home/jimit/alevate-spaces-landing/backend'
-bind = '0.0.0.0:8000'
-workers = 3
+# Production profile: gunicorn -c gunicorn_config.py config.wsgi:application
+#
+# Every value can be overridden from the environment (GUNICORN_*), so the
+# same file works on a 1 GB VPS and on a bigger host. Workers that only serve
+# the public API can boot the trimmed profile with
+# DJANGO_SETTINGS_MODULE=config.settings_api (see config/settings_api.py).
+import math
+import multiprocessing
+import os
+
+
+def env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+cpus = multiprocessing.cpu_count()
+
+pythonpath = os.environ.get('GUNICORN_PYTHONPATH', os.path.dirname(os.path.abspath(__file__)))
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+# (2 x cores) + 1, capped so small hosts are not pushed into swap. With more
+# than one thread gunicorn switches to the gthread worker, which also keeps
+# idle keep-alive connections from pinning a whole worker.
+workers = env_int('GUNICORN_WORKERS', min(cpus * 2 + 1, 8))
+# Threads cover the time a request waits on SQLite, cache files or a slow
+# client: about 4 requests in flight per core across all workers, so big
+# hosts scale past the worker cap. At least 2 per worker, and no more than the
+# per-process database pool (DB_POOL_MAX_SIZE), or the extra threads would
+# only queue for a connection.
+threads = env_int(
+    'GUNICORN_THREADS',
+    max(2, min(math.ceil(cpus * 4 / workers), env_int('DB_POOL_MAX_SIZE', 8))),
+)
+
+# Import Django once in the master; workers share it copy-on-write and start
+# in milliseconds instead of re-importing everything.
+preload_app = True
+
+# Recycle workers to cap memory growth. The jitter keeps them from all
+# restarting at the same moment.
+max_requests = env_int('GUNICORN_MAX_REQUESTS', 1000)
+max_requests_jitter = env_int('GUNICORN_MAX_REQUESTS_JITTER', 100)
+
+timeout = env_int('GUNICORN_TIMEOUT', 30)
+graceful_timeout = env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+# Seconds an idle keep-alive connection is held open (gthread workers).
+keepalive = env_int('GUNICORN_KEEPALIVE', 5)
+
+# Heartbeat files on tmpfs, so a slow disk cannot make workers look hung.
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+
+def when_ready(server):
+    # Runs in the master after the preloaded app is imported and before any
+    # worker is forked.
+    if os.environ.get('GUNICORN_WARMUP', '1') != '1':
+        return
+    from core.warmup import warm_up
+
+    rendered = warm_up()
+    server.log.info('Warm-up rendered %d endpoints', rendered)
@@ -1,8 +1,27 @@
+export interface ResponsiveImageSource {
+    type: string; // MIME type, e.g. "image/avif"
+    srcset: string;
+}
+
+export interface ResponsiveImage {
+    width: number;
+    height: number;
+    sources: ResponsiveImageSource[]; // best format first, last is the JPEG/PNG fallback
+}
+
 export interface Brand {
     id: number;
     name: string;
     logo: string;
     hero_image: string;
+    logo_srcset?: ResponsiveImage | null;
+    hero_image_srcset?: ResponsiveImage | null;
+    logo_placeholder?: string; // tiny base64 data URI, "" until computed
+    logo_width?: number | null;
+    logo_height?: number | null;
+    hero_image_placeholder?: string;
+    hero_image_width?: number | null;
+    hero_image_height?: number | null;
     one_liner: string;
     description: string;
     launch_date?: string; // string because it comes as date string from JSON
@@ -16,6 +35,10 @@ export interface Founder {
     name: string;
     role: string;
     photo: string;
+    photo_srcset?: ResponsiveImage | null;
+    photo_placeholder?: string; // tiny base64 data URI, "" until computed
+    photo_width?: number | null;
+    photo_height?: number | null;
     bio: string;
     vision_quote?: string;
     linkedin_url?: string;